@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'school.middleware.RequestMetricsMiddleware',  # Opt-in, see REQUEST_METRICS_ENABLED below
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # <--- CRITICAL FOR RENDER
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -38,13 +39,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'school.middleware.ReplicaStickinessMiddleware',  # Only when a replica is configured
 ]
 
 ROOT_URLCONF = 'halo_kids.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'school.middleware.TimedDjangoTemplates',  # DjangoTemplates + render timing for /metrics/
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -64,7 +66,8 @@ WSGI_APPLICATION = 'halo_kids.wsgi.application'
 # Logic: Use Neon DB if on Render (online), otherwise use SQLite (local PC)
 if 'DATABASE_URL' in os.environ:
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
+        # Persistent connections: requests and the dashboards' query threads reuse them
+        'default': dj_database_url.parse(os.environ.get('DATABASE_URL'), conn_max_age=60, conn_health_checks=True)
     }
 else:
     DATABASES = {
@@ -74,6 +77,20 @@ else:
         }
     }
 
+# Optional read replica for reports, analytics and CSV exports (see school/db_router.py).
+# Locally, a copy of the SQLite file works: REPLICA_DATABASE_URL=sqlite:////path/to/copy.sqlite3
+if 'REPLICA_DATABASE_URL' in os.environ:
+    DATABASES['replica'] = dj_database_url.parse(os.environ.get('REPLICA_DATABASE_URL'))
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['school.db_router.ReplicaRouter']
+# After a POST, that browser's reports read from the primary for this long
+REPLICA_STICKY_SECONDS = 10
+
+# staff_dashboard and manage_funds send their independent queries through a
+# thread pool of this size per worker process (see school/concurrent_queries.py).
+# Each thread holds its own connection; 1 runs them one after another.
+DASHBOARD_QUERY_THREADS = 4
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -103,6 +120,12 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# Resized AVIF/WebP/JPEG variants written by `manage.py build_responsive_images`
+RESPONSIVE_IMAGES_ROOT = BASE_DIR / "static_build"
+RESPONSIVE_IMAGE_WIDTHS = (480, 960, 1600)
+if RESPONSIVE_IMAGES_ROOT.exists():
+    STATICFILES_DIRS.append(RESPONSIVE_IMAGES_ROOT)
+
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 # We use the "Safe" storage backend to avoid the "MissingFileError" you saw earlier.
@@ -119,4 +142,92 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ==========================================
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'smart_redirect'
-LOGOUT_REDIRECT_URL = 'home'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'home'
+
+
+# ==========================================
+# VISITOR COUNTER (see school/visitors.py)
+# ==========================================
+VISITOR_COUNTER_SHARDS = 8          # Rows the home-page hit counter is spread across
+VISITOR_COUNTER_FLUSH_EVERY = 20    # Write buffered hits after this many visits...
+VISITOR_COUNTER_FLUSH_SECONDS = 10  # ...or after this many seconds
+VISITOR_COUNTER_CACHE_SECONDS = 60  # How long the displayed total is cached
+
+
+# ==========================================
+# CACHES, SESSIONS & LOGGED-IN USERS (see school/auth.py)
+# ==========================================
+# Sessions, the logged-in User, roles and finance totals live in the 'auth'
+# cache. It must be shared by every worker process AND every instance, so
+# that logouts, password/group changes and signal invalidations are seen
+# everywhere at once. Set REDIS_URL to use Redis (sessions are then cached
+# with write-through to the database). Without it the cache is a database
+# table (run 'manage.py createcachetable', build.sh does) and sessions are
+# read from the session table directly.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+        if REDIS_URL else
+        {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'school_auth_cache',
+            'OPTIONS': {'MAX_ENTRIES': 20000},  # Room for every parent logging in on result day
+        }
+    ),
+}
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db'
+SESSION_CACHE_ALIAS = 'auth'
+
+AUTHENTICATION_BACKENDS = ['school.auth.CachedModelBackend']
+AUTH_CACHE_ALIAS = 'auth'
+AUTH_USER_CACHE_SECONDS = 300
+
+
+# ==========================================
+# CACHED USER ROLES (see school/roles.py)
+# ==========================================
+# Roles live in the cache shared by all worker processes, so signals.py's
+# invalidations reach every worker; the timeout is only a safety net.
+ROLE_CACHE_ALIAS = 'auth'
+ROLE_CACHE_SECONDS = 300
+
+# Cached finance totals (see school/finance.py) are shared by all worker
+# processes; the timeout only matters for writes that bypass signals
+FINANCE_CACHE_ALIAS = 'auth'
+FINANCE_CACHE_SECONDS = 600
+
+# Anonymous copies of landing/home/about/gallery are cached and sent with
+# Cache-Control: public for this long (see school/page_cache.py)
+PUBLIC_PAGE_CACHE_SECONDS = 300
+
+
+# ==========================================
+# BULK ADMISSIONS (see school/admissions.py)
+# ==========================================
+# Processes used to hash the DOB passwords of an imported intake (None = one per CPU)
+ADMISSION_HASH_WORKERS = None
+
+
+# ==========================================
+# BACKGROUND REPORTS (see school/report_jobs.py)
+# ==========================================
+# Full-history exports are queued and written here by 'manage.py run_report_worker'.
+# The worker and the web server must share this directory (same machine or disk).
+# Run the worker next to gunicorn: see the 'worker' process in the Procfile.
+REPORT_FILES_DIR = Path(os.environ.get('REPORT_FILES_DIR', BASE_DIR / 'report_files'))
+REPORT_WORKER_POLL_SECONDS = 5  # How often an idle worker checks the queue
+REPORT_WORKER_ALIVE_SECONDS = 60  # Without a worker heartbeat this recent, reports are streamed instead
+REPORT_JOB_STALE_SECONDS = 600  # A running job with no progress for this long is re-queued
+REPORT_RETENTION_DAYS = 7       # Finished reports (and their files) are deleted after this
+
+
+# ==========================================
+# REQUEST METRICS (see school/middleware.py)
+# ==========================================
+# Set REQUEST_METRICS=1 in the environment to record per-view query counts,
+# DB/render time and response sizes. Superusers can read them at /metrics/.
+REQUEST_METRICS_ENABLED = os.environ.get('REQUEST_METRICS') == '1'
@@ -12,6 +12,7 @@ urlpatterns = [
     # --- CHANGED: Default page is now Landing, Home is moved to '/home' ---
     path('', views.landing, name='landing'),
     path('home/', views.home, name='home'),
+    path('home/visitors/', views.visitor_count, name='visitor_count'), # Live counter for the cached home page
     
     path('about/', views.about, name='about'),
     path('gallery/', views.gallery, name='gallery'),
@@ -26,7 +27,9 @@ urlpatterns = [
     # =========================================
     path('super-admin/', views.super_dashboard, name='super_dashboard'), # Super Admin Hub
     path('staff/', views.staff_dashboard, name='staff_dashboard'),       # Teacher Zone
+    path('staff/history/<str:kind>/', views.staff_history, name='staff_history'),  # Older salary/attendance (JSON)
     path('dashboard/', views.dashboard, name='dashboard'),               # Parent/Student Zone
+    path('dashboard/api/', views.parent_dashboard_api, name='parent_dashboard_api'),  # Same data as JSON (ETag)
 
     # =========================================
     # 3. ANALYTICS & TOOLS
@@ -39,6 +42,7 @@ urlpatterns = [
     # 4. REGISTRATION (ADMISSIONS)
     # =========================================
     path('register/student/', views.admin_register, name='admin_register'),
+    path('register/student/bulk/', views.bulk_admission, name='bulk_admission'),
     path('register/staff/', views.staff_registration, name='staff_registration'),
 
     # =========================================
@@ -67,6 +71,7 @@ urlpatterns = [
     # =========================================
     path('fees/', views.fee_dashboard_hub, name='fee_dashboard_hub'),
     path('fees/student/<int:student_id>/', views.student_fee_details, name='student_fee_details'),
+    path('fees/defaulters/', views.fee_defaulters_report, name='fee_defaulters_report'),
     path('fees/add_structure/<int:student_id>/', views.add_fee_structure, name='add_fee_structure'),
     path('fees/add_payment/<int:fee_id>/', views.add_fee_payment, name='add_fee_payment'),
     
@@ -87,8 +92,18 @@ urlpatterns = [
     path('download/staff/', views.download_staff_csv, name='download_staff_csv'),
     path('download/funds/', views.download_funds_csv, name='download_funds_csv'),
     path('download/fees/', views.download_fee_data_csv, name='download_fee_data_csv'),
+    path('download/fee-defaulters/', views.download_fee_defaulters_csv, name='download_fee_defaulters_csv'),
     
     # Attendance Downloads
     path('download/attendance/', views.download_attendance_report, name='download_attendance_report'), # Smart Date/Month Download
     path('download/my-attendance/', views.download_my_child_attendance, name='download_my_child_attendance'), # For Parents
+
+    # Full-history reports, generated in the background (manage.py run_report_worker)
+    path('reports/', views.report_jobs, name='report_jobs'),
+    path('reports/<int:job_id>/download/', views.download_report_job, name='download_report_job'),
+
+    # =========================================
+    # 11. MONITORING
+    # =========================================
+    path('metrics/', views.request_metrics, name='request_metrics'), # Superuser only, text format
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Student, Staff, StudentFee, FeeTransaction, Attendance
+from .models import Student, Staff, StudentFee, FeeTransaction, Attendance, ReportJob, ArchivedYear
 
 # 1. Register Student Table
 class StudentAdmin(admin.ModelAdmin):
@@ -20,4 +20,27 @@ admin.site.register(Staff, StaffAdmin)
 # 3. Register Other Tables
 admin.site.register(StudentFee)
 admin.site.register(FeeTransaction)
-admin.site.register(Attendance)
\ No newline at end of file
+admin.site.register(Attendance)
+
+# 4. Background Reports (generated by 'manage.py run_report_worker'; downloaded from /reports/)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'rows_written', 'rows_total', 'requested_by', 'created_at', 'finished_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('file_name', 'error', 'started_at', 'finished_at')
+
+admin.site.register(ReportJob, ReportJobAdmin)
+
+# 5. Archived Academic Years (created by 'manage.py archive_academic_year'; totals are read-only)
+class ArchivedYearAdmin(admin.ModelAdmin):
+    list_display = ('academic_year', 'attendance_rows', 'staff_attendance_rows', 'fee_transactions', 'fee_collected', 'archived_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+admin.site.register(ArchivedYear, ArchivedYearAdmin)
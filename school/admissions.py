@@ -0,0 +1,194 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Student
+
+# Columns expected in the admission CSV (same names as the admin_register form)
+ADMISSION_COLUMNS = [
+    'application_number', 'student_name', 'gender', 'dob', 'aadhar_number',
+    'class_admitted', 'academic_year', 'father_name', 'father_phone',
+    'mother_name', 'mother_phone', 'address',
+]
+OPTIONAL_COLUMNS = {'aadhar_number', 'address'}
+GENDERS = {gender.lower(): gender for gender, _ in Student._meta.get_field('gender').choices}
+DOB_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y')
+
+# Below this many rows a process pool costs more than it saves
+PARALLEL_HASH_MIN_ROWS = 20
+# hash_passwords() reports progress after every this many passwords
+HASH_PROGRESS_EVERY = 50
+INSERT_BATCH_SIZE = 500
+
+
+# =========================================
+# 1. CSV VALIDATION
+# =========================================
+def parse_dob(value):
+    for fmt in DOB_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"invalid dob '{value}' (use YYYY-MM-DD)")
+
+def _clean_row(raw):
+    """ Validates one CSV row on its own. Returns (row, problems) """
+    row = {column: (raw.get(column) or '').strip() for column in ADMISSION_COLUMNS}
+    problems = [
+        f"{column} is required" for column in ADMISSION_COLUMNS
+        if column not in OPTIONAL_COLUMNS and not row[column]
+    ]
+    for column in ADMISSION_COLUMNS:
+        max_length = Student._meta.get_field(column).max_length
+        if max_length and len(row[column]) > max_length:
+            problems.append(f"{column} is longer than {max_length} characters")
+
+    if row['gender']:
+        if row['gender'].lower() in GENDERS:
+            row['gender'] = GENDERS[row['gender'].lower()]
+        else:
+            problems.append(f"gender must be one of {', '.join(GENDERS.values())}")
+    if row['mother_phone'] and not row['mother_phone'].isdigit():
+        problems.append("mother_phone must contain digits only")
+    if row['dob']:
+        try:
+            row['dob'] = parse_dob(row['dob'])
+            row['password'] = row['dob'].strftime('%d%m%Y')  # Same DDMMYYYY rule as admin_register
+        except ValueError as e:
+            problems.append(str(e))
+    return row, problems
+
+def read_admission_csv(lines):
+    """
+    Validates a whole admission CSV before anything is written.
+    Returns (rows, errors); errors is a list of (line_number, message).
+    Mother's phone is the login username, so it must be unique in the file
+    and not already taken; application numbers likewise.
+    """
+    reader = csv.DictReader(lines)
+    header = [(name or '').strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in ADMISSION_COLUMNS if column not in header and column not in OPTIONAL_COLUMNS]
+    if missing:
+        return [], [(1, f"Missing column(s): {', '.join(missing)}")]
+    reader.fieldnames = header
+
+    rows, errors = [], []
+    seen_phones, seen_applications = {}, {}
+    last_line = reader.line_num
+    for raw in reader:
+        # Report the line a row starts on (quoted addresses can span lines)
+        line, last_line = last_line + 1, reader.line_num
+        row, problems = _clean_row(raw)
+        phone, application = row['mother_phone'], row['application_number']
+        if phone and phone in seen_phones:
+            problems.append(f"mother_phone {phone} already used on line {seen_phones[phone]}")
+        if application and application in seen_applications:
+            problems.append(f"application_number {application} already used on line {seen_applications[application]}")
+        seen_phones.setdefault(phone, line)
+        seen_applications.setdefault(application, line)
+
+        if problems:
+            errors.extend((line, problem) for problem in problems)
+        else:
+            row['line'] = line
+            rows.append(row)
+
+    if not rows and not errors:
+        errors.append((1, "The file has no student rows."))
+
+    taken_phones = set(
+        User.objects.filter(username__in=[row['mother_phone'] for row in rows]).values_list('username', flat=True)
+    )
+    taken_applications = set(
+        Student.objects.filter(application_number__in=[row['application_number'] for row in rows])
+        .values_list('application_number', flat=True)
+    )
+    for row in rows:
+        if row['mother_phone'] in taken_phones:
+            errors.append((row['line'], f"Phone Number {row['mother_phone']} is already registered"))
+        if row['application_number'] in taken_applications:
+            errors.append((row['line'], f"application_number {row['application_number']} already exists"))
+    errors.sort()
+    return rows, errors
+
+
+# =========================================
+# 2. PASSWORD HASHING
+# =========================================
+def _init_hash_worker():
+    # Needed when the pool spawns fresh interpreters instead of forking
+    django.setup()
+
+def hash_passwords(raw_passwords, workers=None, progress=None):
+    """
+    PBKDF2 is deliberately slow, so a whole intake is hashed across a
+    process pool. Each password still gets its own salt. The pool forks, so
+    only call this from a single-threaded management command (the import
+    command or the report worker), never from a web request.
+    progress(hashed_so_far) is called every HASH_PROGRESS_EVERY passwords.
+    """
+    workers = workers or getattr(settings, 'ADMISSION_HASH_WORKERS', None) or os.cpu_count() or 1
+    if workers == 1 or len(raw_passwords) < PARALLEL_HASH_MIN_ROWS:
+        return _collect_hashes(map(make_password, raw_passwords), progress)
+    chunksize = max(1, min(HASH_PROGRESS_EVERY, len(raw_passwords) // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hash_worker) as pool:
+        return _collect_hashes(pool.map(make_password, raw_passwords, chunksize=chunksize), progress)
+
+def _collect_hashes(hashes, progress):
+    collected = []
+    for password_hash in hashes:
+        collected.append(password_hash)
+        if progress and len(collected) % HASH_PROGRESS_EVERY == 0:
+            progress(len(collected))
+    return collected
+
+
+# =========================================
+# 3. IMPORT
+# =========================================
+def _build_student(row):
+    fields = {column: row[column] for column in ADMISSION_COLUMNS}
+    fields['aadhar_number'] = fields['aadhar_number'] or None
+    return Student(**fields, username=row['mother_phone'], password=row['password'])
+
+def import_admissions(rows, workers=None, progress=None):
+    """ Creates the User + Student for every validated row in one transaction """
+    hashes = hash_passwords([row['password'] for row in rows], workers, progress)
+
+    with transaction.atomic():
+        # Re-check inside the transaction in case someone registered meanwhile
+        usernames = [row['mother_phone'] for row in rows]
+        taken = list(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if taken:
+            raise ValidationError(f"Already registered: {', '.join(sorted(taken))}")
+
+        User.objects.bulk_create(
+            [User(username=row['mother_phone'], password=password_hash) for row, password_hash in zip(rows, hashes)],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        students = Student.objects.bulk_create(
+            [_build_student(row) for row in rows],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+    return students
+
+def import_admission_file(path, workers=None, progress=None):
+    """
+    Validates and imports an admission CSV saved to disk (the queued
+    uploads of the bulk_admission page). Raises ValidationError listing the
+    problems if anything changed since the upload was checked.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        rows, errors = read_admission_csv(csv_file)
+    if errors:
+        raise ValidationError([f"Line {line}: {message}" for line, message in errors])
+    return import_admissions(rows, workers, progress)
@@ -0,0 +1,281 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import (
+    Count, DateField, DecimalField, ExpressionWrapper, F, Max, Q, Sum, Value,
+)
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .models import (
+    Student, StudentFee, FeeTransaction, ArchivedFeeTransaction, DailyClassAttendanceSummary,
+    StaffAttendance, Expense,
+)
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+# =========================================
+# 1. FEE ANALYTICS
+# =========================================
+# Breakdown options accepted by fee_status_summary (GET ?breakdown=...)
+FEE_BREAKDOWNS = {
+    'class': ('student__class_admitted',),
+    'year': ('student__academic_year',),
+    'class_year': ('student__academic_year', 'student__class_admitted'),
+}
+
+def fees_with_paid():
+    """ StudentFee queryset annotated with 'paid' = SUM of its payments, archived years included """
+    paid = StudentFee.paid_subquery(FeeTransaction) + StudentFee.paid_subquery(ArchivedFeeTransaction)
+    return StudentFee.objects.annotate(
+        paid=ExpressionWrapper(paid, output_field=MONEY),
+    ).annotate(
+        outstanding=ExpressionWrapper(F('total_amount') - F('paid'), output_field=MONEY),
+    )
+
+def _fee_status_aggregates():
+    return {
+        'total_invoices': Count('id'),
+        'fully_paid_count': Count('id', filter=Q(paid__gte=F('total_amount'))),
+        'partial_count': Count('id', filter=Q(paid__gt=0, paid__lt=F('total_amount'))),
+        'unpaid_count': Count('id', filter=Q(paid__lte=0, total_amount__gt=0)),
+        'total_expected': Coalesce(Sum('total_amount'), ZERO, output_field=MONEY),
+        'total_collected': Coalesce(Sum('paid'), ZERO, output_field=MONEY),
+        'total_outstanding': Coalesce(
+            Sum('outstanding', filter=Q(outstanding__gt=0)), ZERO, output_field=MONEY
+        ),
+    }
+
+def fee_status_summary(breakdown=None):
+    """
+    Paid / partial / unpaid counts and money totals in ONE grouped query.
+    Returns (totals_dict, breakdown_rows). breakdown_rows is empty unless
+    'breakdown' is one of FEE_BREAKDOWNS.
+    """
+    fees = fees_with_paid()
+    group_fields = FEE_BREAKDOWNS.get(breakdown)
+
+    if not group_fields:
+        return fees.aggregate(**_fee_status_aggregates()), []
+
+    # One GROUP BY query; school-wide totals are summed from the groups in Python
+    rows = list(
+        fees.values(*group_fields)
+        .annotate(**_fee_status_aggregates())
+        .order_by(*group_fields)
+    )
+    totals = {key: sum(row[key] for row in rows) for key in _fee_status_aggregates()}
+    for row in rows:
+        row['class_admitted'] = row.get('student__class_admitted')
+        row['academic_year'] = row.get('student__academic_year')
+    return totals, rows
+
+
+# =========================================
+# 2. ATTENDANCE ANALYTICS (read from the daily rollup)
+# =========================================
+ATTENDANCE_RANGES = ('week', 'month')
+
+def class_attendance_for_date(selected_date):
+    """
+    Class x status matrix for one day from DailyClassAttendanceSummary.
+    Every class with students is returned, even if attendance is not taken yet.
+    """
+    strength = (
+        Student.objects.values('class_admitted')
+        .annotate(total=Count('id'))
+        .order_by('class_admitted')
+        .values_list('class_admitted', 'total')
+    )
+    summaries = {
+        summary.class_name: summary
+        for summary in DailyClassAttendanceSummary.objects.filter(date=selected_date)
+    }
+
+    class_data = []
+    for class_name, total_students in strength:
+        summary = summaries.get(class_name)
+        present = summary.present if summary else 0
+        absent = summary.absent if summary else 0
+        leave = summary.leave if summary else 0
+        records_exist = (present + absent + leave) > 0
+        class_data.append({
+            'class_name': class_name,
+            'total_students': total_students,
+            'present': present,
+            'absent': absent,
+            'leave': leave,
+            'percentage': round((present / total_students) * 100, 1) if records_exist else 0,
+            'status': 'Taken' if records_exist else 'Pending',
+        })
+    return class_data
+
+def attendance_range_bounds(selected_date, range_mode):
+    """ 'week' = 7 days ending on selected_date, 'month' = its calendar month """
+    if range_mode == 'week':
+        return selected_date - timedelta(days=6), selected_date
+    last_day = calendar.monthrange(selected_date.year, selected_date.month)[1]
+    return selected_date.replace(day=1), selected_date.replace(day=last_day)
+
+def class_attendance_for_range(start_date, end_date):
+    """
+    Per-class, per-day counts and percentages between two dates (inclusive),
+    read from the rollup: O(days x classes) rows.
+    Returns (days, rows) where rows = [{'class_name', 'days': [cell, ...]}]
+    and each cell lines up with 'days' (None when attendance was not taken).
+    """
+    summaries = (
+        DailyClassAttendanceSummary.objects
+        .filter(date__range=(start_date, end_date))
+        .values_list('class_name', 'date', 'present', 'absent', 'leave', 'enrolled')
+        .order_by('class_name', 'date')
+    )
+
+    days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+    day_index = {day: i for i, day in enumerate(days)}
+    by_class = {}
+    for class_name, day, present, absent, leave, enrolled in summaries:
+        cells = by_class.setdefault(class_name, [None] * len(days))
+        cells[day_index[day]] = {
+            'present': present,
+            'absent': absent,
+            'leave': leave,
+            'enrolled': enrolled,
+            'percentage': round((present / enrolled) * 100, 1) if enrolled else 0,
+        }
+    rows = [{'class_name': name, 'days': cells} for name, cells in by_class.items()]
+    return days, rows
+
+
+# =========================================
+# 3. STAFF MONTHLY SUMMARY (staff_dashboard)
+# =========================================
+STAFF_SUMMARY_MONTHS = 12
+
+def months_back_start(today, months):
+    """ First day of the month 'months - 1' months before today's month """
+    month_index = today.year * 12 + today.month - 1 - (months - 1)
+    return today.replace(year=month_index // 12, month=month_index % 12 + 1, day=1)
+
+def staff_monthly_summary(staff_id, today, months=STAFF_SUMMARY_MONTHS):
+    """
+    Days present/absent/leave and salary paid per month for one staff member,
+    newest month first. Two GROUP BY month queries, so the cost depends on
+    the number of months, not on how many years of records exist.
+    """
+    start = months_back_start(today, months)
+    attendance = (
+        StaffAttendance.objects.filter(staff_id=staff_id, date__gte=start)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent')),
+            leave=Count('id', filter=Q(status='Leave')),
+        )
+    )
+    salary = (
+        Expense.objects.filter(staff_id=staff_id, date__gte=start)
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(salary_paid=Sum('amount'), payments=Count('id'))
+    )
+
+    by_month = {}
+    empty = {'present': 0, 'absent': 0, 'leave': 0, 'salary_paid': Decimal('0'), 'payments': 0}
+    for row in list(attendance) + list(salary):
+        by_month.setdefault(row['month'], {'month': row['month'], **empty}).update(row)
+    return sorted(by_month.values(), key=lambda row: row['month'], reverse=True)
+
+
+# =========================================
+# 4. FEE DEFAULTERS & AGEING
+# =========================================
+# Outstanding balances are aged by how long ago the fee last received a
+# payment (StudentFee.last_payment_date, kept with the other ledger totals);
+# fees that were never paid get their own bucket. Ages are clamped at 0, so
+# a payment dated in the future counts as 0 days old.
+# key -> (label, fewest days, most days or None)
+AGEING_BUCKETS = {
+    'age_0_30': ('0-30 days', 0, 30),
+    'age_31_60': ('31-60 days', 31, 60),
+    'age_61_90': ('61-90 days', 61, 90),
+    'age_over_90': ('90+ days', 91, None),
+}
+NEVER_PAID_BUCKET = 'never_paid'
+
+# Sort options for the defaulters list; each ends in a unique field for keyset pagination
+DEFAULTER_SORTS = {
+    'outstanding': ('-outstanding', 'student'),
+    'oldest_payment': ('last_payment_key', '-outstanding', 'student'),
+    'name': ('student__student_name', 'student'),
+    'class': ('student__class_admitted', '-outstanding', 'student'),
+}
+
+def _defaulter_aggregates(today):
+    owing = Q(balance__gt=0)
+    aggregates = {
+        'total_due': Coalesce(Sum('total_amount'), ZERO, output_field=MONEY),
+        'total_paid': Coalesce(Sum('amount_paid_total'), ZERO, output_field=MONEY),
+        'outstanding': Coalesce(Sum('balance', filter=owing), ZERO, output_field=MONEY),
+        'last_payment': Max('last_payment_date'),
+    }
+    for key, (label, fewest, most) in AGEING_BUCKETS.items():
+        age = Q(last_payment_date__isnull=False)
+        if fewest > 0:
+            age &= Q(last_payment_date__lte=today - timedelta(days=fewest))
+        if most is not None:
+            age &= Q(last_payment_date__gte=today - timedelta(days=most))
+        aggregates[key] = Coalesce(Sum('balance', filter=owing & age), ZERO, output_field=MONEY)
+    aggregates[NEVER_PAID_BUCKET] = Coalesce(
+        Sum('balance', filter=owing & Q(last_payment_date__isnull=True)), ZERO, output_field=MONEY,
+    )
+    return aggregates
+
+def _add_days_since_payment(row, today):
+    row['days_since_payment'] = max(0, (today - row['last_payment']).days) if row['last_payment'] else None
+    return row
+
+def fee_defaulters(today, students=None):
+    """
+    One row per student who owes money: total due, paid, outstanding, last
+    payment and outstanding per ageing bucket, from ONE grouped pass over
+    StudentFee's stored ledger totals (no per-fee SUMs over FeeTransaction).
+    Returns an unevaluated values() queryset; order it with DEFAULTER_SORTS.
+    'students' optionally limits it to a Student queryset (list filters).
+    """
+    fees = StudentFee.objects.all()
+    if students is not None:
+        fees = fees.filter(student__in=students.values('pk'))
+    return (
+        fees.values('student', 'student__student_name', 'student__class_admitted', 'student__mother_phone')
+        .annotate(**_defaulter_aggregates(today))
+        # Never-paid students sort as the oldest payments
+        .annotate(last_payment_key=Coalesce('last_payment', Value(date.min), output_field=DateField()))
+        .filter(outstanding__gt=0)
+    )
+
+def class_defaulter_summary(today, students=None):
+    """ The same figures per class, plus how many students owe; returns (totals, rows) """
+    fees = StudentFee.objects.all()
+    if students is not None:
+        fees = fees.filter(student__in=students.values('pk'))
+    aggregates = {
+        **_defaulter_aggregates(today),
+        'students_owing': Count('student', distinct=True, filter=Q(balance__gt=0)),
+    }
+    rows = [
+        _add_days_since_payment(row, today)
+        for row in fees.values('student__class_admitted').annotate(**aggregates).order_by('student__class_admitted')
+    ]
+    totals = {key: sum(row[key] for row in rows) for key in aggregates if key != 'last_payment'}
+    last_payments = [row['last_payment'] for row in rows if row['last_payment']]
+    totals['last_payment'] = max(last_payments, default=None)
+    return _add_days_since_payment(totals, today), rows
+
+def defaulter_rows(rows, today):
+    """ Adds days_since_payment to fee_defaulters() rows (lazily, for streaming) """
+    return (_add_days_since_payment(row, today) for row in rows)
+
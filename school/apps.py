@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SchoolConfig(AppConfig):
     name = 'school'
+
+    def ready(self):
+        # Registers model signal handlers (fee ledger totals, cached roles and finance figures)
+        from . import signals  # noqa: F401
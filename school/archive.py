@@ -0,0 +1,154 @@
+from datetime import date
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .exports import academic_year_of
+from .models import (
+    Attendance, StaffAttendance, FeeTransaction,
+    ArchivedYear, ArchivedAttendance, ArchivedStaffAttendance, ArchivedFeeTransaction,
+)
+
+# Rows copied (and deleted) per statement while moving a year
+ARCHIVE_BATCH_ROWS = 2000
+
+# live model -> (archive model, date field, copied fields)
+ARCHIVED_MODELS = {
+    Attendance: (ArchivedAttendance, 'date', ('student_id', 'date', 'status')),
+    StaffAttendance: (ArchivedStaffAttendance, 'date', ('staff_id', 'date', 'status')),
+    FeeTransaction: (ArchivedFeeTransaction, 'payment_date', ('student_fee_id', 'amount_paid', 'payment_date', 'remarks')),
+}
+
+
+# =========================================
+# 1. ACADEMIC YEARS
+# =========================================
+# A year runs June 1st - May 31st (same as admissions). Rows belong to the
+# year their date falls in, whatever the student's admission year. Only
+# years that ended before the previous academic year began can be archived,
+# so the dashboards' windows (year to date, last 12 months) never reach the
+# archive.
+
+def academic_year_bounds(academic_year):
+    """ '2023-24' -> (2023-06-01, 2024-05-31); ValueError if malformed """
+    first = int(academic_year[:4])
+    if academic_year != f"{first}-{(first + 1) % 100:02d}":
+        raise ValueError(f"Expected an academic year like 2023-24, got '{academic_year}'")
+    return date(first, 6, 1), date(first + 1, 5, 31)
+
+def latest_archivable_year(today):
+    """ The most recent academic year that may be archived on 'today' """
+    current_start, _ = academic_year_bounds(academic_year_of(today))
+    return academic_year_of(current_start.replace(year=current_start.year - 2))
+
+def archived_year_for(day):
+    """ The ArchivedYear a date falls in, or None while it is still in the live tables """
+    return ArchivedYear.objects.filter(start_date__lte=day, end_date__gte=day).first()
+
+def archived_years_between(start, end):
+    """ Labels of the archived years overlapping start..end """
+    return list(
+        ArchivedYear.objects.filter(start_date__lte=end, end_date__gte=start)
+        .order_by('start_date').values_list('academic_year', flat=True)
+    )
+
+def check_not_archived(day):
+    """ Raises ValidationError for dates whose records have been archived (read-only) """
+    if archived_year_for(day) is not None:
+        raise ValidationError(f"{academic_year_of(day)} has been archived; its records can no longer be changed.")
+
+def attendance_source(day):
+    """ Attendance, or ArchivedAttendance if 'day' is in an archived year """
+    return ArchivedAttendance if archived_year_for(day) is not None else Attendance
+
+
+# =========================================
+# 2. MOVING A YEAR IN / OUT OF THE ARCHIVE
+# =========================================
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _move_rows(source, target, date_field, fields, start, end):
+    """ Copies source rows dated start..end into target, then deletes them from source """
+    rows = (
+        source.objects.filter(**{f'{date_field}__range': (start, end)})
+        .order_by('pk').values_list('pk', *fields)
+        .iterator(chunk_size=ARCHIVE_BATCH_ROWS)
+    )
+    moved = 0
+    for batch in _batches(rows, ARCHIVE_BATCH_ROWS):
+        target.objects.bulk_create([target(**dict(zip(fields, row[1:]))) for row in batch])
+        # Copy first: FeeTransaction's delete signal re-sums fee totals, which
+        # must already see the archived payments
+        source.objects.filter(pk__in=[row[0] for row in batch]).delete()
+        moved += len(batch)
+    return moved
+
+def _status_counts(model, start, end):
+    return model.objects.filter(date__range=(start, end)).aggregate(
+        rows=Count('id'),
+        present=Count('id', filter=Q(status='Present')),
+        absent=Count('id', filter=Q(status='Absent')),
+        leave=Count('id', filter=Q(status='Leave')),
+    )
+
+def year_rollup(start, end):
+    """ Totals of the live rows of one year, as stored on ArchivedYear """
+    students = _status_counts(Attendance, start, end)
+    staff = _status_counts(StaffAttendance, start, end)
+    fees = FeeTransaction.objects.filter(payment_date__range=(start, end)).aggregate(
+        rows=Count('id'), collected=Sum('amount_paid'),
+    )
+    return {
+        'attendance_rows': students['rows'],
+        'present': students['present'],
+        'absent': students['absent'],
+        'leave': students['leave'],
+        'staff_attendance_rows': staff['rows'],
+        'staff_present': staff['present'],
+        'staff_absent': staff['absent'],
+        'staff_leave': staff['leave'],
+        'fee_transactions': fees['rows'],
+        'fee_collected': fees['collected'] or 0,
+    }
+
+def archive_year(academic_year, today):
+    """
+    Moves one closed academic year's attendance, staff attendance and fee
+    payments into the archive tables and records its rollup, all in one
+    transaction. Returns the new ArchivedYear.
+    """
+    start, end = academic_year_bounds(academic_year)
+    if start > academic_year_bounds(latest_archivable_year(today))[0]:
+        raise ValidationError(
+            f"{academic_year} is too recent; the latest year that can be archived is {latest_archivable_year(today)}."
+        )
+    with transaction.atomic():
+        if ArchivedYear.objects.filter(academic_year=academic_year).exists():
+            raise ValidationError(f"{academic_year} is already archived.")
+        archived = ArchivedYear.objects.create(
+            academic_year=academic_year, start_date=start, end_date=end, **year_rollup(start, end),
+        )
+        for source, (target, date_field, fields) in ARCHIVED_MODELS.items():
+            _move_rows(source, target, date_field, fields, start, end)
+    return archived
+
+def restore_year(academic_year):
+    """ Moves an archived year back into the live tables and forgets its rollup """
+    with transaction.atomic():
+        archived = ArchivedYear.objects.select_for_update().filter(academic_year=academic_year).first()
+        if archived is None:
+            raise ValidationError(f"{academic_year} is not archived.")
+        moved = {}
+        for source, (target, date_field, fields) in ARCHIVED_MODELS.items():
+            # Live rows are (re)created with bulk_create: no signals, and the
+            # fee totals already count these payments
+            moved[source.__name__] = _move_rows(
+                target, source, date_field, fields, archived.start_date, archived.end_date,
+            )
+        archived.delete()
+    return moved
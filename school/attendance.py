@@ -0,0 +1,150 @@
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from .archive import check_not_archived
+from .models import Student, Attendance, StaffAttendance, DailyClassAttendanceSummary, ArchivedYear
+
+ATTENDANCE_STATUSES = {status for status, _ in Attendance._meta.get_field('status').choices}
+
+
+# =========================================
+# 1. ROSTER VALIDATION
+# =========================================
+def parse_attendance_date(value):
+    """ 'YYYY-MM-DD' from the form, or today if left empty. Archived years are read-only. """
+    if not value:
+        return timezone.now().date()
+    try:
+        attendance_date = datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValidationError(f"Invalid attendance date: {value}")
+    check_not_archived(attendance_date)
+    return attendance_date
+
+def collect_roster_statuses(post_data, roster_ids):
+    """
+    Reads 'status_<id>' for every id on the roster and validates the whole
+    submission up front. Ids without a submitted status are skipped.
+    """
+    statuses = {}
+    invalid = []
+    for person_id in roster_ids:
+        status = post_data.get(f'status_{person_id}')
+        if not status:
+            continue
+        if status not in ATTENDANCE_STATUSES:
+            invalid.append(f"#{person_id}: {status}")
+            continue
+        statuses[person_id] = status
+
+    if invalid:
+        raise ValidationError(f"Invalid attendance status for {', '.join(invalid)}")
+    return statuses
+
+
+# =========================================
+# 2. BULK WRITERS (one upsert per roster)
+# =========================================
+def save_student_attendance(attendance_date, statuses):
+    """ Upserts {student_id: status} for one day in a single statement """
+    records = [
+        Attendance(student_id=student_id, date=attendance_date, status=status)
+        for student_id, status in statuses.items()
+    ]
+    with transaction.atomic():
+        Attendance.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['student', 'date'],
+            update_fields=['status', 'updated_at'],
+        )
+        if records:
+            class_names = Student.objects.filter(id__in=statuses).values_list('class_admitted', flat=True).distinct()
+            refresh_attendance_summary(attendance_date, attendance_date, class_names)
+    return len(records)
+
+def save_staff_attendance(attendance_date, statuses):
+    """ Upserts {staff_id: status} for one day in a single statement """
+    records = [
+        StaffAttendance(staff_id=staff_id, date=attendance_date, status=status)
+        for staff_id, status in statuses.items()
+    ]
+    with transaction.atomic():
+        StaffAttendance.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=['staff', 'date'],
+            update_fields=['status'],
+        )
+    return len(records)
+
+
+# =========================================
+# 3. DAILY CLASS ROLLUP
+# =========================================
+def refresh_attendance_summary(start_date, end_date, class_names=None):
+    """
+    Recomputes DailyClassAttendanceSummary rows between two dates (inclusive),
+    optionally only for some classes. Called with a single day and class by
+    the writers above; the management command uses it for whole ranges.
+    Enrolled counts use the current class strength. Rows are upserted, so
+    two refreshes of the same slice can run at the same time. Rows of
+    archived years are left as they are (their attendance is no longer live).
+    """
+    attendance = Attendance.objects.filter(date__range=(start_date, end_date))
+    students = Student.objects.all()
+    summaries = DailyClassAttendanceSummary.objects.filter(date__range=(start_date, end_date))
+    if class_names is not None:
+        class_names = list(class_names)
+        attendance = attendance.filter(student__class_admitted__in=class_names)
+        students = students.filter(class_admitted__in=class_names)
+        summaries = summaries.filter(class_name__in=class_names)
+
+    enrolled = dict(
+        students.values('class_admitted').annotate(total=Count('id')).values_list('class_admitted', 'total')
+    )
+    grouped = attendance.values('student__class_admitted', 'date').annotate(
+        present=Count('id', filter=Q(status='Present')),
+        absent=Count('id', filter=Q(status='Absent')),
+        leave=Count('id', filter=Q(status='Leave')),
+    ).order_by()
+    rows = [
+        DailyClassAttendanceSummary(
+            class_name=row['student__class_admitted'],
+            date=row['date'],
+            present=row['present'],
+            absent=row['absent'],
+            leave=row['leave'],
+            enrolled=enrolled.get(row['student__class_admitted'], 0),
+        )
+        for row in grouped
+    ]
+
+    archived = ArchivedYear.objects.filter(start_date__lte=end_date, end_date__gte=start_date)
+    for archived_start, archived_end in archived.values_list('start_date', 'end_date'):
+        summaries = summaries.exclude(date__range=(archived_start, archived_end))
+
+    with transaction.atomic():
+        DailyClassAttendanceSummary.objects.bulk_create(
+            rows,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['class_name', 'date'],
+            update_fields=['present', 'absent', 'leave', 'enrolled'],
+        )
+        # Slices that no longer have any attendance must not keep stale rows
+        current = {(row.class_name, row.date) for row in rows}
+        stale = [pk for pk, class_name, day in summaries.values_list('pk', 'class_name', 'date')
+                 if (class_name, day) not in current]
+        for start in range(0, len(stale), 1000):
+            DailyClassAttendanceSummary.objects.filter(pk__in=stale[start:start + 1000]).delete()
+    return len(rows)
+
+def student_attendance_span(student_id):
+    """ (first, last) date of a student's live attendance, or None if there is none """
+    bounds = Attendance.objects.filter(student_id=student_id).aggregate(first=Min('date'), last=Max('date'))
+    return (bounds['first'], bounds['last']) if bounds['first'] is not None else None
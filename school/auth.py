@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from .db_router import primary_reads
+
+# =========================================
+# CACHED AUTHENTICATED USER
+# =========================================
+# AuthenticationMiddleware calls backend.get_user() on every logged-in
+# request, which costs a User query (plus a groups query wherever the role is
+# worked out). The user is kept in the shared 'auth' cache, together with
+# their group names, and signals.py drops the entry whenever the User row or
+# its groups change.
+
+def _auth_cache():
+    return caches[getattr(settings, 'AUTH_CACHE_ALIAS', 'default')]
+
+def _cache_key(user_id):
+    return f'school:user:{user_id}'
+
+def user_group_names(user):
+    """ Group names of a user, loaded at most once per cached user object """
+    if not hasattr(user, '_school_group_names'):
+        user._school_group_names = frozenset(user.groups.values_list('name', flat=True))
+    return user._school_group_names
+
+def invalidate_cached_user(user_id):
+    if user_id is not None:
+        _auth_cache().delete(_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ ModelBackend that serves get_user() from the cache """
+
+    def get_user(self, user_id):
+        key = _cache_key(user_id)
+        user = _auth_cache().get(key)
+        if user is None:
+            with primary_reads():
+                user = super().get_user(user_id)
+                if user is None:
+                    return None
+                user_group_names(user)  # Stored with the user
+            _auth_cache().set(key, user, getattr(settings, 'AUTH_USER_CACHE_SECONDS', 300))
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,78 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+
+# =========================================
+# CONCURRENT QUERIES FOR DASHBOARD VIEWS
+# =========================================
+# Against a remote database every query is a network round trip. Views that
+# run several independent queries hand them to run_queries(), which sends
+# them through a small thread pool shared by the worker process. Each pool
+# thread has its own DB connection, so the round trips overlap and the page
+# waits for the slowest query rather than the sum of all of them. This works
+# under gunicorn's sync workers; no async server is needed.
+#
+# The pool is bounded (DASHBOARD_QUERY_THREADS), so each gunicorn worker
+# opens at most that many extra connections. Pool threads never see
+# request_started/request_finished, so every task gets the same
+# close_old_connections() clean-up Django applies around a request (which
+# honours CONN_MAX_AGE and CONN_HEALTH_CHECKS).
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _query_threads():
+    return getattr(settings, 'DASHBOARD_QUERY_THREADS', 4)
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_query_threads(), thread_name_prefix='school-query')
+        return _pool
+
+def runs_concurrently():
+    """
+    False on SQLite (a local file has no round trips to overlap) and inside
+    a transaction, whose uncommitted rows other connections can't see (e.g.
+    ATOMIC_REQUESTS or a test case).
+    """
+    default = connections['default']
+    return _query_threads() > 1 and default.vendor != 'sqlite' and not default.in_atomic_block
+
+def _run_task(query, wrappers):
+    close_old_connections()
+    try:
+        # Keep the request's execute wrappers (e.g. RequestMetricsMiddleware's query timing)
+        with ExitStack() as stack:
+            for alias, alias_wrappers in wrappers.items():
+                for wrapper in alias_wrappers:
+                    stack.enter_context(connections[alias].execute_wrapper(wrapper))
+            return query()
+    finally:
+        close_old_connections()
+
+def run_queries(**queries):
+    """
+    Runs every callable, concurrently where that helps, and returns
+    {name: result}. Callables must fully evaluate their querysets (list(),
+    aggregate(), first() ...); a lazy queryset would only be run later, in
+    the request thread. The first exception raised is re-raised here.
+    """
+    if not runs_concurrently():
+        return {name: query() for name, query in queries.items()}
+
+    wrappers = {connection.alias: list(connection.execute_wrappers) for connection in connections.all()}
+    pool = _get_pool()
+    futures = {
+        # Each task runs in a copy of the request's context (replica routing etc.)
+        name: pool.submit(contextvars.copy_context().run, _run_task, query, wrappers)
+        for name, query in queries.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
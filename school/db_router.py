@@ -0,0 +1,114 @@
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import connections
+
+REPLICA_DB = 'replica'
+# Set on every response to a write request; while present, reads stay on the primary
+STICKY_COOKIE = 'hk_primary'
+
+# True while the current request's reads may go to the replica
+_replica_reads = contextvars.ContextVar('school_replica_reads', default=False)
+
+
+# =========================================
+# READ REPLICA ROUTING
+# =========================================
+# Everything goes to 'default' unless a view opts in with @replica_reads and
+# a 'replica' database is configured (REPLICA_DATABASE_URL). Writes always go
+# to the primary, and so do the rest of a request's reads once it has written
+# anything. After a POST (or a GET to a @writes_on_get view) the
+# browser carries STICKY_COOKIE for REPLICA_STICKY_SECONDS so the user's next
+# reports include their own writes even if the replica is lagging.
+
+def replica_configured():
+    return REPLICA_DB in connections.settings
+
+def _set_replica_reads(enabled):
+    previous = _replica_reads.get()
+    _replica_reads.set(enabled)
+    return previous
+
+@contextmanager
+def primary_reads():
+    """ Forces reads in this block onto the primary (e.g. when filling shared caches) """
+    previous = _set_replica_reads(False)
+    try:
+        yield
+    finally:
+        _set_replica_reads(previous)
+
+@contextmanager
+def replica_reads_block():
+    """ Lets reads in this block use the replica, if configured (background report jobs) """
+    previous = _set_replica_reads(True)
+    try:
+        yield
+    finally:
+        _set_replica_reads(previous)
+
+def _stream_from_replica(content):
+    # Streaming exports run their queries while the response is sent,
+    # after the view (and the decorator) have already returned
+    previous = _set_replica_reads(True)
+    try:
+        yield from content
+    finally:
+        _set_replica_reads(previous)
+
+def replica_reads(view):
+    """ Lets a read-only report view query the replica (GET/HEAD, outside the sticky window) """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        use_replica = (
+            replica_configured()
+            and request.method in ('GET', 'HEAD')
+            and STICKY_COOKIE not in request.COOKIES
+        )
+        if not use_replica:
+            return view(request, *args, **kwargs)
+
+        previous = _set_replica_reads(True)
+        try:
+            response = view(request, *args, **kwargs)
+            wrote = not _replica_reads.get()  # see ReplicaRouter.db_for_write
+        finally:
+            _set_replica_reads(previous)
+        if response.streaming and not wrote:
+            response.streaming_content = _stream_from_replica(response.streaming_content)
+        return response
+    return wrapper
+
+
+def writes_on_get(view):
+    """ Marks a link-style view that writes on GET (deletes), so its response also sets STICKY_COOKIE """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request._school_wrote = True
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """ settings.DATABASE_ROUTERS entry """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Reads after a write in the same request must see it: stay on the primary
+        if _replica_reads.get():
+            _replica_reads.set(False)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        return db != REPLICA_DB
+
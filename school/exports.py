@@ -0,0 +1,232 @@
+import calendar
+import csv
+import re
+import zlib
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import FilteredRelation, Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+from .models import Student, DailyClassAttendanceSummary
+
+# Rows are buffered into chunks of this size before being sent to the client
+CSV_CHUNK_ROWS = 500
+# Querysets are fetched from the database in batches of this size
+QUERY_CHUNK_SIZE = 2000
+
+# stream_csv(compress=...): a .csv.gz download, or the CSV sent gzip-encoded
+GZIP_FILE = 'file'
+GZIP_ENCODING = 'encoding'
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+# =========================================
+# 1. STREAMING CSV HELPERS
+# =========================================
+class _LineBuffer:
+    """ File-like object for csv.writer that just collects written lines """
+    def __init__(self):
+        self.lines = []
+
+    def write(self, value):
+        self.lines.append(value)
+
+    def drain(self):
+        data = ''.join(self.lines)
+        self.lines = []
+        return data
+
+
+def _csv_chunks(header, rows, empty_message):
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.drain()
+
+    pending = 0
+    wrote_any = False
+    for row in rows:
+        writer.writerow(row)
+        wrote_any = True
+        pending += 1
+        if pending >= CSV_CHUNK_ROWS:
+            yield buffer.drain()
+            pending = 0
+
+    if not wrote_any and empty_message:
+        writer.writerow([empty_message])
+    yield buffer.drain()
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def wants_gzip(request):
+    """
+    ?gzip=1 on any export asks for a .csv.gz download (GZIP_FILE). Otherwise
+    the CSV is gzip-encoded on the wire if the client accepts it
+    (GZIP_ENCODING); browsers save it as a plain .csv.
+    """
+    if request.GET.get('gzip') in ('1', 'true', 'yes'):
+        return GZIP_FILE
+    if ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')):
+        return GZIP_ENCODING
+    return False
+
+
+def stream_csv(filename, header, rows, compress=False, empty_message=None):
+    """
+    Streams a CSV download without building it in memory.
+    'rows' should be a lazy iterable (e.g. queryset.values_list(...).iterator()).
+    'compress' is wants_gzip(request); True means GZIP_FILE.
+    """
+    chunks = _csv_chunks(header, rows, empty_message)
+    if compress == GZIP_ENCODING:
+        response = StreamingHttpResponse(_gzip_chunks(chunks), content_type='text/csv')
+        response['Content-Encoding'] = 'gzip'
+    elif compress:
+        response = StreamingHttpResponse(_gzip_chunks(chunks), content_type='application/gzip')
+        filename = f"{filename}.gz"
+    else:
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+    # The body depends on Accept-Encoding, so caches must keep the variants apart
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# =========================================
+# 2. REPORT ROWS (shared by the downloads and report_jobs.py)
+# =========================================
+ATTENDANCE_HEADER = ['Date', 'Class', 'Student Name', 'Status']
+EXPENSE_HEADER = ['Date', 'Category', 'Purpose', 'Type', 'Amount', 'Payment Mode', 'Staff Linked']
+CLASS_SUMMARY_HEADER = ['Date', 'Class', 'Present', 'Absent', 'Leave', 'Enrolled', 'Attendance %']
+
+ATTENDANCE_FIELDS = ('date', 'student__class_admitted', 'student__student_name', 'status')
+
+def attendance_rows(logs, archived=None):
+    """
+    Lazy CSV rows for an Attendance (or ArchivedAttendance) queryset. Pass an
+    ArchivedAttendance queryset as 'archived' to UNION ALL its rows in, in
+    the ordering of 'logs'.
+    """
+    rows = logs.values_list(*ATTENDANCE_FIELDS)
+    if archived is not None:
+        ordering = logs.query.order_by
+        rows = rows.order_by().union(archived.order_by().values_list(*ATTENDANCE_FIELDS), all=True)
+        rows = rows.order_by(*ordering)
+    return rows.iterator(chunk_size=QUERY_CHUNK_SIZE)
+
+def expense_rows(expenses):
+    """ Lazy CSV rows for an Expense queryset """
+    records = expenses.values_list(
+        'date', 'category', 'purpose', 'amount', 'payment_type', 'staff__full_name'
+    ).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return (
+        [exp_date, category, purpose, "Salary" if category == 'Salary' else "Expense",
+         amount, payment_type, staff_name or "-"]
+        for exp_date, category, purpose, amount, payment_type, staff_name in records
+    )
+
+def class_summary_rows(start, end):
+    """ Per-class daily counts between two dates, read from the rollup (one row per class per day) """
+    records = (
+        DailyClassAttendanceSummary.objects.filter(date__range=(start, end))
+        .order_by('date', 'class_name')
+        .values_list('date', 'class_name', 'present', 'absent', 'leave', 'enrolled')
+        .iterator(chunk_size=QUERY_CHUNK_SIZE)
+    )
+    return (
+        [day, class_name, present, absent, leave, enrolled,
+         round(present / enrolled * 100, 1) if enrolled else 0]
+        for day, class_name, present, absent, leave, enrolled in records
+    )
+
+
+# =========================================
+# 3. MONTHLY ATTENDANCE REGISTER (student x day)
+# =========================================
+# Register marks; index 0 means "not marked"
+REGISTER_MARKS = ('', 'P', 'A', 'L')
+REGISTER_CODES = {'Present': 1, 'Absent': 2, 'Leave': 3}
+
+def month_bounds(month_param):
+    """ 'YYYY-MM' -> (first day, last day); ValueError if malformed or out of range """
+    year, month = (int(part) for part in month_param.split('-'))
+    start = date(year, month, 1)
+    # monthrange, not "first of next month - 1 day", which overflows in 9999-12
+    return start, start.replace(day=calendar.monthrange(year, month)[1])
+
+def _register_section(class_name, records):
+    """
+    Pivots one class's (student_id, application no, name, date, status) records into a
+    students x school-days grid held in a single bytearray, then yields the
+    CSV rows for that class. School days are the days the class was marked.
+    """
+    students = {}
+    marks = []
+    for student_id, application_number, name, day, status in records:
+        students.setdefault(student_id, (application_number, name))
+        if day is not None:
+            marks.append((student_id, day, REGISTER_CODES.get(status, 0)))
+
+    days = sorted({day for _, day, _ in marks})
+    day_index = {day: i for i, day in enumerate(days)}
+    row_index = {student_id: i for i, student_id in enumerate(students)}
+    width = len(days)
+    grid = bytearray(len(students) * width)
+    for student_id, day, code in marks:
+        grid[row_index[student_id] * width + day_index[day]] = code
+
+    yield [f"Class: {class_name}"]
+    yield ['Application No', 'Student Name'] + [day.day for day in days] + ['Present', 'Absent', 'Leave', 'Attendance %']
+    present_per_day = [0] * width
+    for student_id, (application_number, name) in students.items():
+        cells = grid[row_index[student_id] * width:(row_index[student_id] + 1) * width]
+        present, absent, leave = cells.count(1), cells.count(2), cells.count(3)
+        for i, code in enumerate(cells):
+            if code == 1:
+                present_per_day[i] += 1
+        marked = present + absent + leave
+        percentage = round(present / marked * 100, 1) if marked else ''
+        yield [application_number, name] + [REGISTER_MARKS[code] for code in cells] + [present, absent, leave, percentage]
+    yield ['', 'Total Present'] + present_per_day
+    yield []
+
+def academic_year_of(day):
+    """ '2026-27' for any day from June 2026 to May 2027 (admissions use June 1st) """
+    first = day.year if day.month >= 6 else day.year - 1
+    return f"{first}-{(first + 1) % 100:02d}"
+
+def month_register_rows(start, end, relation='attendance'):
+    """
+    CSV rows of the attendance register for start..end, one section per
+    class. Every student of that academic year gets a row (blank if never
+    marked), as does anyone else marked during the month.
+    Built from one projected LEFT JOIN query, streamed class by class.
+    'relation' is 'archived_attendance' for months of an archived year.
+    """
+    records = (
+        Student.objects
+        .annotate(month_attendance=FilteredRelation(
+            relation, condition=Q(**{f'{relation}__date__range': (start, end)}),
+        ))
+        .filter(Q(academic_year=academic_year_of(start)) | Q(month_attendance__isnull=False))
+        .order_by('class_admitted', 'student_name', 'id')
+        .values_list(
+            'class_admitted', 'id', 'application_number', 'student_name',
+            'month_attendance__date', 'month_attendance__status',
+        )
+        .iterator(chunk_size=QUERY_CHUNK_SIZE)
+    )
+    for class_name, class_records in groupby(records, key=itemgetter(0)):
+        yield from _register_section(class_name, (record[1:] for record in class_records))
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Sum
+
+from .analytics import FEE_BREAKDOWNS, fee_status_summary
+from .db_router import primary_reads
+from .models import StudentFee, FeeTransaction, ArchivedFeeTransaction, Expense
+
+SUMMARY_CACHE_KEY = 'school:finance:summary'
+FEE_STATUS_CACHE_KEY = 'school:finance:fee_status:{}'
+
+
+# =========================================
+# CACHED SCHOOL-WIDE FINANCE FIGURES
+# =========================================
+# manage_funds and financial_analytics read these instead of re-scanning
+# StudentFee / FeeTransaction / Expense on every page view. signals.py
+# clears them whenever a fee, payment or expense is saved or deleted. They
+# live in the cache shared by all worker processes (FINANCE_CACHE_ALIAS), so
+# one worker's invalidation is seen by every other; FINANCE_CACHE_SECONDS
+# only bounds staleness for writes that bypass signals (bulk inserts). The
+# figures are always
+# computed on the primary so a lagging replica can't put stale totals back
+# into the cache right after an invalidation.
+
+def _cache():
+    return caches[getattr(settings, 'FINANCE_CACHE_ALIAS', 'default')]
+
+def _timeout():
+    return getattr(settings, 'FINANCE_CACHE_SECONDS', 600)
+
+_SUMMARY_QUERIES = {
+    'total_target': lambda: StudentFee.objects.aggregate(sum=Sum('total_amount'))['sum'] or 0,
+    'total_collected': lambda: (
+        (FeeTransaction.objects.aggregate(sum=Sum('amount_paid'))['sum'] or 0)
+        + (ArchivedFeeTransaction.objects.aggregate(sum=Sum('amount_paid'))['sum'] or 0)
+    ),
+    'total_utilized': lambda: Expense.objects.aggregate(sum=Sum('amount'))['sum'] or 0,
+}
+
+def _build_summary(totals):
+    return {**totals, 'current_available': totals['total_collected'] - totals['total_utilized']}
+
+def get_financial_summary():
+    """ Total target, collected, utilized and available balance """
+    summary = _cache().get(SUMMARY_CACHE_KEY)
+    if summary is None:
+        with primary_reads():
+            summary = _build_summary({name: query() for name, query in _SUMMARY_QUERIES.items()})
+        _cache().set(SUMMARY_CACHE_KEY, summary, _timeout())
+    return summary
+
+def get_fee_status_summary(breakdown=None):
+    """ Cached analytics.fee_status_summary() """
+    key = FEE_STATUS_CACHE_KEY.format(breakdown or 'all')
+    result = _cache().get(key)
+    if result is None:
+        with primary_reads():
+            result = fee_status_summary(breakdown)
+        _cache().set(key, result, _timeout())
+    return result
+
+def invalidate_financial_summary():
+    """ Drops every cached finance figure once the current transaction commits """
+    keys = [SUMMARY_CACHE_KEY, FEE_STATUS_CACHE_KEY.format('all')]
+    keys += [FEE_STATUS_CACHE_KEY.format(name) for name in FEE_BREAKDOWNS]
+    transaction.on_commit(lambda: _cache().delete_many(keys))
@@ -0,0 +1,75 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from school.archive import (
+    academic_year_bounds, latest_archivable_year, year_rollup, archive_year, restore_year,
+)
+from school.models import ArchivedYear
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves a closed academic year's attendance, staff attendance and fee payments "
+        "into the archive tables (or lists / restores archived years)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', nargs='?', help="Academic year to archive, e.g. 2023-24.")
+        parser.add_argument('--list', action='store_true', help="List archived years and their totals.")
+        parser.add_argument('--dry-run', action='store_true', help="Only show what would be archived.")
+        parser.add_argument('--restore', action='store_true',
+                            help="Move the archived year back into the live tables.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['list'] or not options['academic_year']:
+            self.list_years(today)
+            return
+
+        academic_year = options['academic_year']
+        try:
+            start, end = academic_year_bounds(academic_year)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        try:
+            if options['restore']:
+                moved = restore_year(academic_year)
+                summary = ", ".join(f"{rows} {name}" for name, rows in moved.items())
+                self.stdout.write(self.style.SUCCESS(f"Restored {academic_year}: {summary} row(s)."))
+                return
+            if options['dry_run']:
+                rollup = year_rollup(start, end)
+                self.stdout.write(
+                    f"{academic_year} ({start} to {end}) would move {rollup['attendance_rows']} attendance, "
+                    f"{rollup['staff_attendance_rows']} staff attendance and {rollup['fee_transactions']} "
+                    f"fee payment row(s). Nothing was changed."
+                )
+                return
+            archived = archive_year(academic_year, today)
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {academic_year}: {archived.attendance_rows} attendance, "
+            f"{archived.staff_attendance_rows} staff attendance and {archived.fee_transactions} "
+            f"fee payment row(s) in {time.perf_counter() - started:.1f}s."
+        ))
+
+    def list_years(self, today):
+        years = ArchivedYear.objects.all()
+        for year in years:
+            marked = year.present + year.absent + year.leave
+            percentage = f"{year.present / marked * 100:.1f}%" if marked else "-"
+            self.stdout.write(
+                f"{year.academic_year}: {year.attendance_rows} attendance (present {percentage}), "
+                f"{year.staff_attendance_rows} staff attendance, {year.fee_transactions} payments "
+                f"totalling {year.fee_collected}; archived {year.archived_at:%Y-%m-%d}"
+            )
+        if not years:
+            self.stdout.write("No academic years archived yet.")
+        self.stdout.write(f"Latest year that can be archived today: {latest_archivable_year(today)}")
@@ -0,0 +1,219 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from school.models import (
+    Student, Staff, StudentFee, FeeTransaction, Attendance, StaffAttendance, Expense,
+)
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    """
+    Counts queries on every database connection (primary, replica and any
+    connection opened by another thread while counting), unlike
+    CaptureQueriesContext which only sees one connection of this thread.
+    """
+    def __init__(self):
+        self.count = 0
+        self._wrapped = []
+        self._stack = ExitStack()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def _wrap(self, connection):
+        # A connection that reconnects fires connection_created again
+        if not any(wrapped is connection for wrapped in self._wrapped):
+            self._wrapped.append(connection)
+            self._stack.enter_context(connection.execute_wrapper(self))
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        self._wrap(connection)
+
+    def __enter__(self):
+        for alias in connections:
+            self._wrap(connections[alias])
+        connection_created.connect(self._on_connection_created)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._on_connection_created)
+        self._stack.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Requests every view and CSV export through the test client and reports latency "
+        "percentiles and query counts. Seed data first with 'generate_demo_data'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=10, help="Requests per URL.")
+        parser.add_argument('--output', help="Save results as JSON to this file.")
+        parser.add_argument('--compare', help="Earlier JSON results to compare against.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        clients = self.build_clients()
+        results = []
+        for view_name, url, role in self.targets():
+            client = clients.get(role)
+            if client is None:
+                self.stdout.write(f"Skipping {view_name}: no {role} account in the database.")
+                continue
+            results.append(self.measure(client, view_name, url, options['repeat']))
+
+        report = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'repeat': options['repeat'],
+            'row_counts': {
+                model.__name__: model.objects.count()
+                for model in (Student, Staff, StudentFee, FeeTransaction, Attendance, StaffAttendance, Expense)
+            },
+            'results': results,
+        }
+
+        previous = {}
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                previous = {row['view']: row for row in json.load(previous_file)['results']}
+        self.print_table(results, previous)
+
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['output']}"))
+
+    def build_clients(self):
+        clients = {'anonymous': Client()}
+        admin = User.objects.filter(is_superuser=True).first()
+        staff = Staff.objects.exclude(username=None).first()
+        parent = Student.objects.exclude(username=None).first()
+        logins = {
+            'superuser': admin,
+            'staff': User.objects.filter(username=staff.username).first() if staff else None,
+            'parent': User.objects.filter(username=parent.username).first() if parent else None,
+        }
+        for role, user in logins.items():
+            if user:
+                clients[role] = Client()
+                clients[role].force_login(user)
+        return clients
+
+    def targets(self):
+        """ (view name, url, which login to use) for every page and export """
+        student = Student.objects.order_by('id').first()
+        staff = Staff.objects.order_by('id').first()
+        fee = StudentFee.objects.order_by('id').first()
+        last_day = Attendance.objects.order_by('-date').values_list('date', flat=True).first()
+        day = last_day.isoformat() if last_day else datetime.now().date().isoformat()
+        month = day[:7]
+
+        targets = [
+            ('landing', reverse('landing'), 'anonymous'),
+            ('home', reverse('home'), 'anonymous'),
+            ('visitor_count', reverse('visitor_count'), 'anonymous'),
+            ('about', reverse('about'), 'anonymous'),
+            ('gallery', reverse('gallery'), 'anonymous'),
+            ('super_dashboard', reverse('super_dashboard'), 'superuser'),
+            ('staff_dashboard', reverse('staff_dashboard'), 'staff'),
+            ('staff_history', reverse('staff_history', args=['attendance']), 'staff'),
+            ('dashboard', reverse('dashboard'), 'parent'),
+            ('parent_dashboard_api', reverse('parent_dashboard_api'), 'parent'),
+            ('financial_analytics', reverse('financial_analytics'), 'superuser'),
+            ('financial_analytics (by class)', reverse('financial_analytics') + '?breakdown=class_year', 'superuser'),
+            ('attendance_analytics', reverse('attendance_analytics') + f'?date={day}', 'superuser'),
+            ('attendance_analytics (month)', reverse('attendance_analytics') + f'?date={day}&range=month', 'superuser'),
+            ('admissions_calculator', reverse('admissions_calculator'), 'superuser'),
+            ('manage_students', reverse('manage_students'), 'superuser'),
+            ('manage_staff', reverse('manage_staff'), 'superuser'),
+            ('mark_attendance', reverse('mark_attendance'), 'superuser'),
+            ('admin_staff_attendance', reverse('admin_staff_attendance'), 'superuser'),
+            ('fee_dashboard_hub', reverse('fee_dashboard_hub'), 'superuser'),
+            ('fee_defaulters_report', reverse('fee_defaulters_report'), 'superuser'),
+            ('manage_funds', reverse('manage_funds'), 'superuser'),
+            ('download_students_csv', reverse('download_students_csv'), 'superuser'),
+            ('download_staff_csv', reverse('download_staff_csv'), 'superuser'),
+            ('download_funds_csv (month)', reverse('download_funds_csv') + f'?mode=month&month={month}', 'superuser'),
+            ('download_fee_data_csv', reverse('download_fee_data_csv'), 'superuser'),
+            ('download_fee_defaulters_csv', reverse('download_fee_defaulters_csv'), 'superuser'),
+            ('download_attendance_report (day)', reverse('download_attendance_report') + f'?mode=date&date={day}', 'superuser'),
+            ('download_attendance_report (month)', reverse('download_attendance_report') + f'?mode=month&month={month}', 'superuser'),
+            ('download_attendance_report (register)', reverse('download_attendance_report') + f'?mode=register&month={month}', 'superuser'),
+            ('report_jobs', reverse('report_jobs'), 'superuser'),
+            ('download_my_child_attendance', reverse('download_my_child_attendance'), 'parent'),
+        ]
+        if student:
+            targets.append(('mark_attendance (class)', reverse('mark_attendance') + f'?class_selected={student.class_admitted}', 'superuser'))
+            targets.append(('student_fee_details', reverse('student_fee_details', args=[student.id]), 'superuser'))
+            targets.append(('edit_student', reverse('edit_student', args=[student.id]), 'superuser'))
+        if staff:
+            targets.append(('edit_staff', reverse('edit_staff', args=[staff.id]), 'superuser'))
+        if fee:
+            targets.append(('edit_fee_structure', reverse('edit_fee_structure', args=[fee.id]), 'superuser'))
+        return targets
+
+    def measure(self, client, view_name, url, repeat):
+        timings = []
+        queries = []
+        status = None
+        size = 0
+        for _ in range(repeat):
+            with QueryCounter() as captured:
+                start = time.perf_counter()
+                response = client.get(url)
+                # Streaming exports only do their work while being consumed
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(captured.count)
+            status = response.status_code
+            size = len(body)
+        return {
+            'view': view_name,
+            'url': url,
+            'status': status,
+            'bytes': size,
+            # Steady-state round trips; the first request may also fill caches
+            'queries': statistics.median_low(queries),
+            'cold_queries': queries[0],
+            'mean_ms': round(statistics.mean(timings), 2),
+            'p50_ms': round(_percentile(timings, 50), 2),
+            'p95_ms': round(_percentile(timings, 95), 2),
+            'p99_ms': round(_percentile(timings, 99), 2),
+        }
+
+    def print_table(self, results, previous):
+        self.stdout.write(
+            f"{'View':<38} {'Status':>6} {'Queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  "
+            f"{'vs. before':>10} {'queries':>8}"
+        )
+        for row in results:
+            change = query_change = ''
+            before = previous.get(row['view'])
+            if before and before['p50_ms']:
+                change = f"{(row['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100:+.0f}%"
+            if before:
+                query_change = f"{row['queries'] - before['queries']:+d}"
+            self.stdout.write(
+                f"{row['view']:<38} {row['status']:>6} {row['queries']:>7} "
+                f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}  {change:>10} {query_change:>8}"
+            )
@@ -0,0 +1,106 @@
+import hashlib
+import json
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow is only needed at build time
+    Image = None
+
+from school.templatetags.responsive_images import manifest_path
+
+SOURCE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+# (format name, Pillow format, file extension, save options)
+OUTPUT_FORMATS = (
+    ('avif', 'AVIF', 'avif', {'quality': 50}),
+    ('webp', 'WEBP', 'webp', {'quality': 75, 'method': 6}),
+    ('jpeg', 'JPEG', 'jpg', {'quality': 80, 'optimize': True, 'progressive': True}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates resized AVIF/WebP/JPEG variants of static/images with content-hashed names "
+        "plus a manifest for the {% responsive_image %} tag. Run before collectstatic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild even if a source image is unchanged.")
+
+    def handle(self, *args, **options):
+        if Image is None:
+            raise CommandError("Pillow is required: pip install -r requirements.txt")
+
+        source_root = Path(settings.STATICFILES_DIRS[0])
+        output_root = Path(settings.RESPONSIVE_IMAGES_ROOT)
+        output_dir = output_root / 'responsive'
+        output_dir.mkdir(parents=True, exist_ok=True)
+        widths = sorted(settings.RESPONSIVE_IMAGE_WIDTHS)
+        formats = [fmt for fmt in OUTPUT_FORMATS if fmt[0] == 'jpeg' or features.check(fmt[0])]
+
+        old_manifest = {}
+        if manifest_path().exists() and not options['force']:
+            old_manifest = json.loads(manifest_path().read_text())
+
+        manifest = {}
+        built = 0
+        for source in sorted((source_root / 'images').rglob('*')):
+            if source.suffix.lower() not in SOURCE_SUFFIXES:
+                continue
+            key = source.relative_to(source_root).as_posix()
+            digest = hashlib.sha256(source.read_bytes()).hexdigest()
+            previous = old_manifest.get(key)
+            if previous and previous['source_hash'] == digest and self._files_exist(output_root, previous):
+                manifest[key] = previous
+                continue
+
+            with Image.open(source) as image:
+                manifest[key] = self.build_variants(image, source.stem, digest, widths, formats, output_root)
+            built += 1
+
+        self.remove_stale_files(output_dir, manifest)
+        manifest_path().write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        self.stdout.write(self.style.SUCCESS(
+            f"{built} image(s) rebuilt, {len(manifest) - built} unchanged, formats: {', '.join(f[0] for f in formats)}."
+        ))
+
+    def build_variants(self, image, stem, digest, widths, formats, output_root):
+        image = image.convert('RGB')
+        original_width, original_height = image.size
+        targets = [w for w in widths if w < original_width] + [original_width]
+
+        sources = {name: [] for name, _, _, _ in formats}
+        for width in targets:
+            height = round(original_height * width / original_width)
+            resized = image if width == original_width else image.resize((width, height), Image.Resampling.LANCZOS)
+            for name, pil_format, extension, save_options in formats:
+                target = self._save(resized, pil_format, save_options, output_root, f"{stem}-{width}w", extension)
+                sources[name].append([width, target])
+
+        return {
+            'source_hash': digest,
+            'width': original_width,
+            'height': original_height,
+            'sources': sources,
+        }
+
+    def _save(self, image, pil_format, save_options, output_root, name, extension):
+        buffer = BytesIO()
+        image.save(buffer, pil_format, **save_options)
+        data = buffer.getvalue()
+        relative = f"responsive/{name}.{hashlib.sha256(data).hexdigest()[:10]}.{extension}"
+        (output_root / relative).write_bytes(data)
+        return relative
+
+    def _files_exist(self, output_root, entry):
+        return all((output_root / path).exists() for variants in entry['sources'].values() for _, path in variants)
+
+    def remove_stale_files(self, output_dir, manifest):
+        keep = {Path(path).name for entry in manifest.values() for variants in entry['sources'].values() for _, path in variants}
+        for existing in output_dir.iterdir():
+            if existing.name != 'manifest.json' and existing.name not in keep:
+                existing.unlink()
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from school.analytics import fees_with_paid
+from school.models import (
+    Student, Staff, StudentFee, FeeTransaction, Attendance, StaffAttendance,
+    Expense, DailyClassAttendanceSummary,
+)
+
+# Words that show up in query plans when an index is used (SQLite / Postgres / MySQL)
+INDEX_MARKERS = ('USING INDEX', 'USING COVERING INDEX', 'Index Scan', 'Index Only Scan', 'Bitmap Index Scan', 'key:')
+
+
+def hot_queries():
+    """ (view name, description, queryset) for every hot query path in views.py """
+    student = Student.objects.order_by('id').first()
+    staff = Staff.objects.order_by('id').first()
+    day = Attendance.objects.order_by('-date').values_list('date', flat=True).first()
+    class_name = student.class_admitted if student else 'LKG'
+    username = student.username if student and student.username else '0000000000'
+    staff_username = staff.username if staff and staff.username else '0000000000'
+    year, month = (day.year, day.month) if day else (2026, 6)
+
+    return [
+        ('dashboard', 'Parent profile by username', Student.objects.filter(username=username)),
+        ('dashboard', 'Recent attendance for child', Attendance.objects.filter(student=student).order_by('-date')[:5]),
+        ('dashboard', 'Fees for child', StudentFee.objects.filter(student=student)),
+        ('staff_dashboard', 'Class roster', Student.objects.filter(class_admitted=class_name).order_by('student_name')),
+        ('staff_dashboard', 'Staff profile by username', Staff.objects.filter(username=staff_username)),
+        ('staff_dashboard', 'Salary history', Expense.objects.filter(staff=staff).order_by('-date')),
+        ('staff_dashboard', 'Staff attendance history', StaffAttendance.objects.filter(staff=staff).order_by('-date')),
+        ('attendance_analytics', 'Rollup for one day', DailyClassAttendanceSummary.objects.filter(date=day)),
+        ('financial_analytics', 'Per-fee paid totals', fees_with_paid().values('id', 'paid')),
+        ('manage_funds', 'Recent expenses', Expense.objects.order_by('-date')[:50]),
+        ('download_funds_csv', 'Expenses for one month',
+         Expense.objects.filter(date__year=year, date__month=month).order_by('date')),
+        ('download_funds_csv', 'Salary expenses', Expense.objects.filter(category='Salary').order_by('date')),
+        ('download_fee_data_csv', 'Collection report', FeeTransaction.objects.order_by('-payment_date')[:100]),
+        ('download_attendance_report', 'Attendance for one day', Attendance.objects.filter(date=day).values('student', 'status')),
+        ('download_attendance_report', 'Attendance for one month',
+         Attendance.objects.filter(date__year=year, date__month=month).values('date', 'student', 'status')),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints the EXPLAIN plan of each hot query per view and whether it uses an index. "
+        "Run it against a database seeded with realistic volume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Also write the report to this file.")
+
+    def handle(self, *args, **options):
+        lines = [f"Query plan report ({connection.vendor})", ""]
+        without_index = 0
+        for view_name, description, queryset in hot_queries():
+            plan = queryset.explain()
+            uses_index = any(marker in plan for marker in INDEX_MARKERS)
+            if not uses_index:
+                without_index += 1
+            lines.append(f"[{view_name}] {description}: {'index' if uses_index else 'NO INDEX'}")
+            lines.extend(f"    {line}" for line in plan.splitlines())
+            lines.append("")
+        lines.append(f"{without_index} hot quer{'y' if without_index == 1 else 'ies'} without an index.")
+
+        report = "\n".join(lines)
+        self.stdout.write(report)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(report + "\n")
@@ -0,0 +1,212 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from school.attendance import refresh_attendance_summary
+from school.finance import invalidate_financial_summary
+from school.models import (
+    Student, Staff, StudentFee, FeeTransaction, Attendance, StaffAttendance, Expense,
+)
+
+CLASSES = ['Day Care', 'Play Group', 'Pre-KG', 'LKG', 'UKG']
+FIRST_NAMES = ['Aarav', 'Diya', 'Vihaan', 'Anaya', 'Arjun', 'Ishita', 'Kabir', 'Meera', 'Rohan', 'Saanvi',
+               'Aditya', 'Kavya', 'Reyansh', 'Myra', 'Krishna', 'Pari', 'Sai', 'Riya', 'Dhruv', 'Tara']
+LAST_NAMES = ['Rao', 'Shetty', 'Kumar', 'Gowda', 'Nayak', 'Hegde', 'Patil', 'Reddy', 'Bhat', 'Iyer']
+STATUS_WEIGHTS = (('Present', 88), ('Absent', 8), ('Leave', 4))
+DEMO_PREFIX = 'DEMO'
+# Real logins are phone numbers; demo logins can never collide with one
+DEMO_USERNAME_PREFIX = 'demo-'
+DEMO_PASSWORD = 'demo-pass-123'
+BATCH_SIZE = 2000
+
+
+def _school_days(start_year):
+    """ Monday-Saturday from June 1st to March 31st of an academic year """
+    day = date(start_year, 6, 1)
+    end = date(start_year + 1, 3, 31)
+    while day <= end:
+        if day.weekday() != 6:
+            yield day
+        day += timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a deterministic synthetic dataset (students, staff, attendance, fees, expenses) "
+        f"for benchmarking. Demo logins are '{DEMO_USERNAME_PREFIX}<phone>' with the password '{DEMO_PASSWORD}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=200, help="Students per academic year.")
+        parser.add_argument('--staff', type=int, default=12, help="Number of staff members.")
+        parser.add_argument('--years', type=int, default=2, help="Number of academic years of history.")
+        parser.add_argument('--first-year', type=int, default=2024, help="Start year of the oldest academic year.")
+        parser.add_argument('--seed', type=int, default=42, help="Random seed (same seed = same data).")
+        parser.add_argument('--replace', action='store_true', help="Delete previously generated demo data first.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if Student.objects.filter(application_number__startswith=DEMO_PREFIX).exists():
+            if not options['replace']:
+                raise CommandError("Demo data already exists. Use --replace to regenerate it.")
+            self.delete_demo_data()
+
+        # One hash for every demo login keeps generation fast
+        password_hash = make_password(DEMO_PASSWORD)
+        years = [options['first_year'] + i for i in range(options['years'])]
+
+        with transaction.atomic():
+            staff = self.create_staff(rng, options['staff'], password_hash)
+            students = self.create_students(rng, years, options['students'], password_hash)
+            attendance_rows = self.create_attendance(rng, students, staff, years)
+            fee_rows, payment_rows = self.create_fees(rng, students)
+            expense_rows = self.create_expenses(rng, staff, years)
+
+            StudentFee.recalculate_totals(StudentFee.objects.filter(student__in=[s.id for s in students]))
+            refresh_attendance_summary(date(years[0], 6, 1), date(years[-1] + 1, 3, 31))
+            # Bulk inserts skip the model signals that normally clear this
+            invalidate_financial_summary()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {len(students)} students, {len(staff)} staff, {attendance_rows} attendance records, "
+            f"{fee_rows} fees with {payment_rows} payments and {expense_rows} expenses "
+            f"(login password: {DEMO_PASSWORD})."
+        ))
+
+    def delete_demo_data(self):
+        usernames = list(Student.objects.filter(application_number__startswith=DEMO_PREFIX).values_list('username', flat=True))
+        usernames += list(Staff.objects.filter(address__startswith=DEMO_PREFIX).values_list('username', flat=True))
+        Expense.objects.filter(purpose__startswith=DEMO_PREFIX).delete()
+        Student.objects.filter(application_number__startswith=DEMO_PREFIX).delete()
+        Staff.objects.filter(address__startswith=DEMO_PREFIX).delete()
+        User.objects.filter(username__in=usernames).delete()
+
+    def _name(self, rng):
+        return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+    def create_staff(self, rng, count, password_hash):
+        staff_group, _ = Group.objects.get_or_create(name='Staff')
+        users = []
+        staff = []
+        for i in range(count):
+            phone = f"8{i:09d}"
+            username = f"{DEMO_USERNAME_PREFIX}{phone}"
+            users.append(User(username=username, password=password_hash))
+            staff.append(Staff(
+                full_name=self._name(rng),
+                gender=rng.choice(['Male', 'Female']),
+                phone_number=phone,
+                recruitment_date=date(2018 + rng.randint(0, 5), rng.randint(1, 12), 1),
+                address=f"{DEMO_PREFIX} staff quarters {i}",
+                dob=date(1975 + rng.randint(0, 20), rng.randint(1, 12), rng.randint(1, 28)),
+                designation='Teacher' if i else 'Principal',
+                username=username,
+            ))
+        users = User.objects.bulk_create(users)
+        staff_group.user_set.add(*users)
+        return Staff.objects.bulk_create(staff)
+
+    def create_students(self, rng, years, per_year, password_hash):
+        users = []
+        students = []
+        serial = 0
+        for year in years:
+            for _ in range(per_year):
+                phone = f"9{serial:09d}"
+                username = f"{DEMO_USERNAME_PREFIX}{phone}"
+                dob = date(year - 2 - rng.randint(0, 4), rng.randint(1, 12), rng.randint(1, 28))
+                users.append(User(username=username, password=password_hash))
+                students.append(Student(
+                    application_number=f"{DEMO_PREFIX}-{year}-{serial:05d}",
+                    student_name=self._name(rng),
+                    gender=rng.choice(['Male', 'Female']),
+                    dob=dob,
+                    class_admitted=rng.choice(CLASSES),
+                    academic_year=f"{year}-{(year + 1) % 100:02d}",
+                    father_name=self._name(rng),
+                    father_phone=f"7{serial:09d}",
+                    mother_name=self._name(rng),
+                    mother_phone=phone,
+                    address=f"{DEMO_PREFIX} street {serial}, Bengaluru",
+                    username=username,
+                    password=dob.strftime('%d%m%Y'),
+                ))
+                serial += 1
+        User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        return Student.objects.bulk_create(students, batch_size=BATCH_SIZE)
+
+    def create_attendance(self, rng, students, staff, years):
+        statuses = [status for status, _ in STATUS_WEIGHTS]
+        weights = [weight for _, weight in STATUS_WEIGHTS]
+        created = 0
+        for year in years:
+            academic_year = f"{year}-{(year + 1) % 100:02d}"
+            cohort = [s for s in students if s.academic_year == academic_year]
+            batch = []
+            for day in _school_days(year):
+                for student in cohort:
+                    batch.append(Attendance(student=student, date=day, status=rng.choices(statuses, weights)[0]))
+                for member in staff:
+                    batch.append(StaffAttendance(staff=member, date=day, status=rng.choices(statuses, weights)[0]))
+                if len(batch) >= BATCH_SIZE:
+                    created += self._flush_attendance(batch)
+                    batch = []
+            created += self._flush_attendance(batch)
+        return created
+
+    def _flush_attendance(self, batch):
+        Attendance.objects.bulk_create([r for r in batch if isinstance(r, Attendance)])
+        StaffAttendance.objects.bulk_create([r for r in batch if isinstance(r, StaffAttendance)])
+        return len(batch)
+
+    def create_fees(self, rng, students):
+        fees = []
+        for student in students:
+            year = int(student.academic_year[:4])
+            fees.append(StudentFee(student=student, fee_name=f"Tuition {student.academic_year}",
+                                   total_amount=Decimal(rng.choice([18000, 22000, 25000]))))
+            fees.append(StudentFee(student=student, fee_name=f"Books & Uniform {student.academic_year}",
+                                   total_amount=Decimal(rng.choice([3500, 4000, 4500]))))
+            if rng.random() < 0.3:
+                fees.append(StudentFee(student=student, fee_name=f"Transport {year}",
+                                       total_amount=Decimal(rng.choice([6000, 8000]))))
+        fees = StudentFee.objects.bulk_create(fees, batch_size=BATCH_SIZE)
+
+        payments = []
+        for fee in fees:
+            year = int(fee.student.academic_year[:4])
+            remaining = fee.total_amount
+            for _ in range(rng.randint(0, 4)):
+                if remaining <= 0:
+                    break
+                amount = min(remaining, Decimal(rng.choice([1000, 2500, 5000, 7500])))
+                remaining -= amount
+                paid_on = date(year, 6, 1) + timedelta(days=rng.randint(0, 300))
+                payments.append(FeeTransaction(student_fee=fee, amount_paid=amount, payment_date=paid_on,
+                                               remarks=rng.choice(['Cash', 'UPI', 'Bank Transfer'])))
+        FeeTransaction.objects.bulk_create(payments, batch_size=BATCH_SIZE)
+        return len(fees), len(payments)
+
+    def create_expenses(self, rng, staff, years):
+        expenses = []
+        categories = [value for value, _ in Expense.CATEGORY_CHOICES if value != 'Salary']
+        for year in years:
+            month_start = date(year, 6, 1)
+            for _ in range(10):
+                for member in staff:
+                    expenses.append(Expense(date=month_start.replace(day=28), purpose=f"{DEMO_PREFIX} salary",
+                                            category='Salary', amount=Decimal(rng.choice([15000, 18000, 22000])),
+                                            payment_type='Bank Transfer', staff=member))
+                for _ in range(rng.randint(3, 8)):
+                    expenses.append(Expense(date=month_start + timedelta(days=rng.randint(0, 27)),
+                                            purpose=f"{DEMO_PREFIX} {rng.choice(['chalk', 'repairs', 'printing', 'event'])}",
+                                            category=rng.choice(categories), amount=Decimal(rng.randint(200, 9000)),
+                                            payment_type=rng.choice(['Cash', 'UPI'])))
+                month_start = (month_start + timedelta(days=32)).replace(day=1)
+        Expense.objects.bulk_create(expenses, batch_size=BATCH_SIZE)
+        return len(expenses)
@@ -0,0 +1,38 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from school.admissions import ADMISSION_COLUMNS, read_admission_csv, import_admissions
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-admits students from a CSV with the columns: " + ", ".join(ADMISSION_COLUMNS) + ". "
+        "Every row is validated first; nothing is written if any row has an error."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--dry-run', action='store_true', help="Validate the file without importing it.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['csv_path'], newline='', encoding='utf-8-sig') as csv_file:
+                rows, errors = read_admission_csv(csv_file)
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Cannot read {options['csv_path']}: {e}")
+
+        for line, message in errors:
+            self.stderr.write(f"Line {line}: {message}")
+        if errors:
+            raise CommandError(f"{len(errors)} error(s) found. Nothing was imported.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{len(rows)} row(s) are valid. Dry run, nothing imported."))
+            return
+
+        try:
+            students = import_admissions(rows, workers=options['workers'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        self.stdout.write(self.style.SUCCESS(f"Admitted {len(students)} student(s)."))
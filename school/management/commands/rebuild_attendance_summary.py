@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from school.archive import archived_years_between
+from school.attendance import refresh_attendance_summary
+from school.models import Attendance
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the daily class attendance rollup for a date range (default: all recorded dates)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First date to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--end', help="Last date to rebuild (YYYY-MM-DD).")
+        parser.add_argument('--class', dest='class_names', action='append',
+                            help="Only rebuild this class (can be repeated).")
+
+    def handle(self, *args, **options):
+        bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+        start = _parse_date(options['start']) if options['start'] else bounds['first']
+        end = _parse_date(options['end']) if options['end'] else bounds['last']
+
+        if start is None or end is None:
+            self.stdout.write("No attendance recorded yet, nothing to rebuild.")
+            return
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+        archived = archived_years_between(start, end)
+        if archived:
+            # Their attendance is no longer in the live table; the rollup is kept as it was
+            raise CommandError(f"{', '.join(archived)} archived; pick dates outside archived years.")
+
+        rows = refresh_attendance_summary(start, end, options['class_names'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} class/day summary row(s) from {start} to {end}."))
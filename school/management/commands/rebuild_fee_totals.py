@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from school.models import StudentFee, FeeTransaction, ArchivedFeeTransaction
+
+
+class Command(BaseCommand):
+    help = "Rebuilds (or verifies) the stored paid/balance totals and last payment date on every StudentFee."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report fees whose stored totals disagree with their transactions.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = self.find_mismatches()
+            for fee_id, stored_paid, stored_balance, real_paid, real_balance in mismatches:
+                self.stdout.write(
+                    f"Fee #{fee_id}: stored paid {stored_paid} / balance {stored_balance}, "
+                    f"expected paid {real_paid} / balance {real_balance}"
+                )
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} fee record(s) out of sync. Run without --verify to fix.")
+            self.stdout.write(self.style.SUCCESS("All fee totals are in sync."))
+            return
+
+        with transaction.atomic():
+            updated = StudentFee.recalculate_totals(StudentFee.objects.all())
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt totals for {updated} fee record(s)."))
+
+    def find_mismatches(self):
+        paid_by_fee = {}
+        for model in (FeeTransaction, ArchivedFeeTransaction):
+            totals = model.objects.values('student_fee').annotate(total=Sum('amount_paid'))
+            for fee_id, total in totals.values_list('student_fee', 'total'):
+                paid_by_fee[fee_id] = paid_by_fee.get(fee_id, 0) + total
+        mismatches = []
+        fees = StudentFee.objects.values_list('id', 'total_amount', 'amount_paid_total', 'balance')
+        for fee_id, total_amount, stored_paid, stored_balance in fees.iterator():
+            real_paid = paid_by_fee.get(fee_id) or 0
+            real_balance = total_amount - real_paid
+            if stored_paid != real_paid or stored_balance != real_balance:
+                mismatches.append((fee_id, stored_paid, stored_balance, real_paid, real_balance))
+        return mismatches
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from school.models import ReportJob
+from school.report_jobs import (
+    claim_next_job, run_job, release_job, requeue_stale_jobs, delete_expired_reports, report_label,
+    record_worker_heartbeat,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates queued background reports (full-history CSVs) to files and runs "
+        "queued bulk admission imports. "
+        "Run alongside the web server, e.g. as a separate worker process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Work through the jobs queued right now, then exit (for cron).",
+        )
+        parser.add_argument(
+            '--poll', type=float, default=getattr(settings, 'REPORT_WORKER_POLL_SECONDS', 5),
+            help="Seconds to wait between checks of an empty queue.",
+        )
+
+    def handle(self, *args, **options):
+        delete_expired_reports()
+
+        try:
+            while True:
+                close_old_connections()
+                record_worker_heartbeat()
+                # Picks up jobs of another worker that crashed or was killed meanwhile
+                requeued = requeue_stale_jobs()
+                if requeued:
+                    self.stdout.write(f"Re-queued {requeued} job(s) left running by a stopped worker.")
+                job = claim_next_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+                self.process(job)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
+
+    def process(self, job):
+        self.stdout.write(f"Job #{job.pk}: {report_label(job.kind)}...")
+        started = time.perf_counter()
+        try:
+            run_job(job)
+        except KeyboardInterrupt:
+            release_job(job)
+            raise
+
+        job.refresh_from_db()
+        elapsed = time.perf_counter() - started
+        if job.status == ReportJob.DONE:
+            target = f"written to {job.file_name}" if job.file_name else "imported"
+            self.stdout.write(self.style.SUCCESS(
+                f"Job #{job.pk}: {job.rows_written} rows {target} in {elapsed:.1f}s."
+            ))
+        else:
+            self.stderr.write(f"Job #{job.pk} failed:\n{job.error}")
+        delete_expired_reports()
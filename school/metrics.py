@@ -0,0 +1,81 @@
+import bisect
+import threading
+
+# =========================================
+# IN-PROCESS REQUEST METRICS
+# =========================================
+# Filled by middleware.RequestMetricsMiddleware and rendered by the
+# superuser-only /metrics/ view in the Prometheus text exposition format.
+# Each worker process keeps its own numbers.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+METRICS = (
+    # (metric name, help text, buckets)
+    ('school_request_duration_seconds', "Total time spent handling the request.", DURATION_BUCKETS),
+    ('school_request_db_seconds', "Time spent in SQL queries during the request.", DURATION_BUCKETS),
+    ('school_request_render_seconds', "Time spent rendering templates during the request.", DURATION_BUCKETS),
+    ('school_request_queries', "Number of SQL queries run by the request.", QUERY_BUCKETS),
+    ('school_response_size_bytes', "Size of the response body (non-streaming responses).", SIZE_BUCKETS),
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_lock = threading.Lock()
+_histograms = {}  # (metric name, view name) -> Histogram
+
+
+def observe_request(view_name, **values):
+    """ Records one request; keyword names are metric names from METRICS """
+    with _lock:
+        for name, _, buckets in METRICS:
+            value = values.get(name)
+            if value is None:
+                continue
+            histogram = _histograms.get((name, view_name))
+            if histogram is None:
+                histogram = _histograms[(name, view_name)] = Histogram(buckets)
+            histogram.observe(value)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_exposition():
+    """ All histograms in the Prometheus text format """
+    lines = []
+    with _lock:
+        for name, help_text, buckets in METRICS:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, view_name), histogram in sorted(_histograms.items()):
+                if metric != name:
+                    continue
+                view_label = f'view="{_label(view_name)}"'
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{view_label},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{view_label}}} {histogram.total:.6f}")
+                lines.append(f"{name}_count{{{view_label}}} {histogram.count}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
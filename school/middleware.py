@@ -0,0 +1,125 @@
+import contextvars
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from .db_router import STICKY_COOKIE, replica_configured
+from .metrics import observe_request
+
+# Per-request counters; None when no request is being measured
+_current = contextvars.ContextVar('school_request_metrics', default=None)
+
+
+class TimedTemplate:
+    """ Backend template that adds its render time to the request being measured """
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        # render_to_string() inside a view that is itself rendering: time the outermost only
+        outermost = stats['render_depth'] == 0
+        stats['render_depth'] += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats['render_depth'] -= 1
+            if outermost:
+                stats['render_seconds'] += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend (settings.TEMPLATES), with every template
+    wrapped in TimedTemplate so RequestMetricsMiddleware can report render
+    time. Costs one ContextVar lookup per render when metrics are off.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+class RequestMetricsMiddleware:
+    """
+    Opt-in (settings.REQUEST_METRICS_ENABLED): records per request the URL
+    name, SQL query count, DB time, template render time and response size
+    into the histograms in metrics.py. Queries run while a streaming
+    response is being sent are not included.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_METRICS_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {'queries': 0, 'db_seconds': 0.0, 'render_seconds': 0.0, 'render_depth': 0}
+        token = _current.set(stats)
+
+        def time_query(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['db_seconds'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(time_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.url_name or match.view_name) if match else 'unresolved'
+        observe_request(
+            view_name,
+            school_request_duration_seconds=duration,
+            school_request_db_seconds=stats['db_seconds'],
+            school_request_render_seconds=stats['render_seconds'],
+            school_request_queries=stats['queries'],
+            school_response_size_bytes=None if response.streaming else len(response.content),
+        )
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Only active when a read replica is configured: after a write request
+    (POST etc., or a GET to a db_router.writes_on_get view) the browser gets db_router.STICKY_COOKIE for REPLICA_STICKY_SECONDS, and
+    @replica_reads views keep that user on the primary meanwhile
+    (read-your-writes despite replication lag).
+    """
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') or getattr(request, '_school_wrote', False):
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=getattr(settings, 'REPLICA_STICKY_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
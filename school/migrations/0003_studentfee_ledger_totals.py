@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_fee_totals(apps, schema_editor):
+    StudentFee = apps.get_model('school', 'StudentFee')
+    FeeTransaction = apps.get_model('school', 'FeeTransaction')
+    paid = Coalesce(
+        Subquery(
+            FeeTransaction.objects.filter(student_fee=OuterRef('pk'))
+            .values('student_fee')
+            .annotate(total=Sum('amount_paid'))
+            .values('total')
+        ),
+        Value(Decimal('0')),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+    StudentFee.objects.update(amount_paid_total=paid, balance=F('total_amount') - paid)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0002_visitorcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfee',
+            name='amount_paid_total',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='studentfee',
+            name='balance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.RunPython(backfill_fee_totals, migrations.RunPython.noop),
+    ]
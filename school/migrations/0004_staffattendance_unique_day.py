@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_staff_attendance(apps, schema_editor):
+    """ Keeps only the latest record where a staff member was marked twice on a day """
+    StaffAttendance = apps.get_model('school', 'StaffAttendance')
+    duplicates = (
+        StaffAttendance.objects.values('staff', 'date')
+        .annotate(records=Count('id'), keep_id=Max('id'))
+        .filter(records__gt=1)
+    )
+    for row in duplicates:
+        StaffAttendance.objects.filter(staff=row['staff'], date=row['date']).exclude(id=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0003_studentfee_ledger_totals'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_staff_attendance, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='staffattendance',
+            unique_together={('staff', 'date')},
+        ),
+    ]
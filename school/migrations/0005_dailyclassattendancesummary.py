@@ -0,0 +1,54 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_attendance_summary(apps, schema_editor):
+    Student = apps.get_model('school', 'Student')
+    Attendance = apps.get_model('school', 'Attendance')
+    DailyClassAttendanceSummary = apps.get_model('school', 'DailyClassAttendanceSummary')
+
+    enrolled = dict(
+        Student.objects.values('class_admitted').annotate(total=Count('id')).values_list('class_admitted', 'total')
+    )
+    grouped = Attendance.objects.values('student__class_admitted', 'date').annotate(
+        present=Count('id', filter=Q(status='Present')),
+        absent=Count('id', filter=Q(status='Absent')),
+        leave=Count('id', filter=Q(status='Leave')),
+    ).order_by()
+    DailyClassAttendanceSummary.objects.bulk_create(
+        [
+            DailyClassAttendanceSummary(
+                class_name=row['student__class_admitted'], date=row['date'],
+                present=row['present'], absent=row['absent'], leave=row['leave'],
+                enrolled=enrolled.get(row['student__class_admitted'], 0),
+            )
+            for row in grouped
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0004_staffattendance_unique_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyClassAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('class_name', models.CharField(max_length=50)),
+                ('date', models.DateField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('leave', models.PositiveIntegerField(default=0)),
+                ('enrolled', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('class_name', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_attendance_summary, migrations.RunPython.noop),
+    ]
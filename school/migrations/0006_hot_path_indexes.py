@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0005_dailyclassattendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status', 'student'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyclassattendancesummary',
+            index=models.Index(fields=['date'], name='attsummary_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['-date'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['category', 'date'], name='expense_category_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['staff', '-date'], name='expense_staff_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feetransaction',
+            index=models.Index(fields=['-payment_date'], name='feetxn_payment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feetransaction',
+            index=models.Index(fields=['student_fee', 'amount_paid'], name='feetxn_fee_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='staff',
+            index=models.Index(fields=['username'], name='staff_username_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['class_admitted', 'student_name'], name='student_class_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['academic_year', 'class_admitted'], name='student_year_class_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['username'], name='student_username_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0008_report_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20, unique=True)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('attendance_rows', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('leave', models.PositiveIntegerField(default=0)),
+                ('staff_attendance_rows', models.PositiveIntegerField(default=0)),
+                ('staff_present', models.PositiveIntegerField(default=0)),
+                ('staff_absent', models.PositiveIntegerField(default=0)),
+                ('staff_leave', models.PositiveIntegerField(default=0)),
+                ('fee_transactions', models.PositiveIntegerField(default=0)),
+                ('fee_collected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'ordering': ['-start_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedFeeTransaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount_paid', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_date', models.DateField()),
+                ('remarks', models.CharField(blank=True, max_length=200, null=True)),
+                ('student_fee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='school.studentfee')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedStaffAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave')], max_length=10)),
+                ('staff', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='school.staff')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave')], max_length=10)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='school.student')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'student'], name='archattendance_date_idx')],
+            },
+        ),
+    ]
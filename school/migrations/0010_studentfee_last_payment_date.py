@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_last_payment_date(apps, schema_editor):
+    StudentFee = apps.get_model('school', 'StudentFee')
+
+    def latest(model_name):
+        model = apps.get_model('school', model_name)
+        return Subquery(
+            model.objects.filter(student_fee=OuterRef('pk'))
+            .order_by('-payment_date').values('payment_date')[:1]
+        )
+
+    StudentFee.objects.update(
+        last_payment_date=Coalesce(latest('FeeTransaction'), latest('ArchivedFeeTransaction')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0009_academic_year_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentfee',
+            name='last_payment_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_payment_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('school', '0010_studentfee_last_payment_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='archivedstaffattendance',
+            index=models.Index(fields=['staff', 'date'], name='archstaffatt_staff_date_idx'),
+        ),
+    ]
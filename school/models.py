@@ -1,4 +1,7 @@
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Now
 from django.contrib.auth.models import User
 from django.utils import timezone
 
@@ -28,6 +31,15 @@ class Student(models.Model):
     username = models.CharField(max_length=100, null=True, blank=True) # Usually Mother's Phone
     password = models.CharField(max_length=100, null=True, blank=True) # Usually DOB (DDMMYYYY)
 
+    updated_at = models.DateTimeField(auto_now=True) # Feeds the parent dashboard API ETag
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['class_admitted', 'student_name'], name='student_class_name_idx'), # Class rosters
+            models.Index(fields=['academic_year', 'class_admitted'], name='student_year_class_idx'), # Year/class filters
+            models.Index(fields=['username'], name='student_username_idx'), # Parent dashboard lookup
+        ]
+
     def __str__(self):
         return self.student_name
 
@@ -48,6 +60,11 @@ class Staff(models.Model):
     designation = models.CharField(max_length=100, default="Teacher")
     username = models.CharField(max_length=100, null=True, blank=True) # Usually Phone Number
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['username'], name='staff_username_idx'), # Staff dashboard lookup
+        ]
+
     def __str__(self):
         return self.full_name
 
@@ -63,17 +80,93 @@ class StudentFee(models.Model):
     fee_name = models.CharField(max_length=100) # e.g. "Term 1 Fee"
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Stored ledger totals (kept in sync by FeeTransaction signals, see signals.py)
+    amount_paid_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    balance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_payment_date = models.DateField(null=True, blank=True) # Latest payment; ages the balance in the defaulters report
+    updated_at = models.DateTimeField(auto_now=True) # Also bumped by recalculate_totals
+
+    # Owned by recalculate_totals(); a save that leaves total_amount alone doesn't write them
+    LEDGER_FIELDS = ('amount_paid_total', 'balance', 'last_payment_date')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_total_amount = instance.__dict__.get('total_amount')
+        return instance
+
+    def _total_amount_changed(self):
+        loaded = getattr(self, '_loaded_total_amount', None)
+        return loaded is None or Decimal(str(self.total_amount)) != loaded
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding or self._total_amount_changed():
+            # Keep balance correct when the fee amount itself is edited
+            self.balance = Decimal(str(self.total_amount)) - Decimal(str(self.amount_paid_total))
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if not adding:
+                    # The in-memory paid total may be stale, re-read it from the ledger
+                    self.refresh_totals()
+        else:
+            # Same amount: no refresh, and the (possibly stale) in-memory totals aren't written back
+            if kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name not in self.LEDGER_FIELDS
+                ]
+            super().save(*args, **kwargs)
+        self._loaded_total_amount = Decimal(str(self.total_amount))
+
+    def refresh_totals(self):
+        """ Recalculates stored totals from transactions in a single UPDATE """
+        StudentFee.recalculate_totals(StudentFee.objects.filter(pk=self.pk))
+        self.refresh_from_db(fields=['amount_paid_total', 'balance', 'last_payment_date'])
+
+    @staticmethod
+    def paid_subquery(transaction_model):
+        """ SUM(amount_paid) of the fee's rows in FeeTransaction or ArchivedFeeTransaction, 0 if none """
+        return Coalesce(
+            models.Subquery(
+                transaction_model.objects.filter(student_fee=models.OuterRef('pk'))
+                .values('student_fee')
+                .annotate(total=models.Sum('amount_paid'))
+                .values('total')
+            ),
+            Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    @staticmethod
+    def last_payment_subquery(transaction_model):
+        """ Latest payment_date of the fee's rows in FeeTransaction or ArchivedFeeTransaction """
+        return models.Subquery(
+            transaction_model.objects.filter(student_fee=models.OuterRef('pk'))
+            .order_by('-payment_date').values('payment_date')[:1]
+        )
+
+    @staticmethod
+    def recalculate_totals(queryset):
+        """ Rewrites amount_paid_total/balance/last_payment_date for every fee in the queryset (archived payments included) """
+        paid = StudentFee.paid_subquery(FeeTransaction) + StudentFee.paid_subquery(ArchivedFeeTransaction)
+        # Archived years are older than anything still live
+        last_payment = Coalesce(
+            StudentFee.last_payment_subquery(FeeTransaction), StudentFee.last_payment_subquery(ArchivedFeeTransaction),
+        )
+        return queryset.update(
+            amount_paid_total=paid, balance=F('total_amount') - paid, last_payment_date=last_payment, updated_at=Now(),
+        )
+
     def get_total_paid(self):
-        # Calculate sum of all transactions for this fee
-        paid = self.feetransaction_set.aggregate(total=models.Sum('amount_paid'))['total']
-        return paid if paid else 0
+        return self.amount_paid_total
 
     def get_balance(self):
-        return self.total_amount - self.get_total_paid()
+        return self.balance
 
     def get_payment_percentage(self):
         if self.total_amount == 0: return 0
-        return (self.get_total_paid() / self.total_amount) * 100
+        return (self.amount_paid_total / self.total_amount) * 100
 
     def __str__(self):
         return f"{self.fee_name} - {self.student.student_name}"
@@ -87,6 +180,12 @@ class FeeTransaction(models.Model):
     payment_date = models.DateField()
     remarks = models.CharField(max_length=200, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-payment_date'], name='feetxn_payment_date_idx'), # Collection report
+            models.Index(fields=['student_fee', 'amount_paid'], name='feetxn_fee_amount_idx'), # Per-fee SUMs
+        ]
+
     def __str__(self):
         return f"{self.amount_paid} paid for {self.student_fee}"
 
@@ -99,9 +198,14 @@ class Attendance(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     date = models.DateField()
     status = models.CharField(max_length=10, choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave')])
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('student', 'date') # Prevent duplicate attendance for same student on same day
+        indexes = [
+            # Day/month reports and rollup refreshes (date range, then status counts per student)
+            models.Index(fields=['date', 'status', 'student'], name='attendance_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.student_name} - {self.date} - {self.status}"
@@ -116,9 +220,33 @@ class StaffAttendance(models.Model):
         ('Leave', 'Leave')
     ])
 
+    class Meta:
+        unique_together = ('staff', 'date') # One record per staff member per day (needed for bulk upserts)
+
     def __str__(self):
         return f"{self.staff.full_name} - {self.date} - {self.status}"
 
+class DailyClassAttendanceSummary(models.Model):
+    """
+    Rollup: one row per class per day, refreshed by the attendance writers
+    (see attendance.py). Rebuild with 'manage.py rebuild_attendance_summary'.
+    """
+    class_name = models.CharField(max_length=50)
+    date = models.DateField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    leave = models.PositiveIntegerField(default=0)
+    enrolled = models.PositiveIntegerField(default=0) # Class strength when the rollup was refreshed
+
+    class Meta:
+        unique_together = ('class_name', 'date')
+        indexes = [
+            models.Index(fields=['date'], name='attsummary_date_idx'), # Day view across all classes
+        ]
+
+    def __str__(self):
+        return f"{self.class_name} - {self.date} - {self.present}/{self.enrolled}"
+
 
 # =========================================
 # 5. EXPENSE MODEL (Finance)
@@ -146,6 +274,13 @@ class Expense(models.Model):
     # Optional Link to Staff (Used if category is 'Salary')
     staff = models.ForeignKey(Staff, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date'], name='expense_date_idx'), # Recent expenses, daily/monthly reports
+            models.Index(fields=['category', 'date'], name='expense_category_date_idx'), # Category reports
+            models.Index(fields=['staff', '-date'], name='expense_staff_date_idx'), # Salary history per teacher
+        ]
+
     def __str__(self):
         return f"{self.purpose} - ₹{self.amount}"
 
@@ -153,7 +288,118 @@ class Expense(models.Model):
 # 6. VISITOR COUNTER
 # =========================================
 class VisitorCount(models.Model):
+    """ One row per counter shard; the visitor total is the sum (see visitors.py) """
     count = models.IntegerField(default=0)  # <--- FIXED: Now this has 4 spaces!
 
     def __str__(self):
-        return f"Total Visitors: {self.count}"
\ No newline at end of file
+        return f"Total Visitors: {self.count}"
+
+# =========================================
+# 7. BACKGROUND REPORT JOBS
+# =========================================
+class ReportJob(models.Model):
+    """
+    A large report queued from the web and generated to a file by
+    'manage.py run_report_worker' (see report_jobs.py)
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50) # Key into report_jobs.REPORTS
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    rows_total = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    file_name = models.CharField(max_length=255, blank=True) # Relative to settings.REPORT_FILES_DIR
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True) # Worker heartbeat while running
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='reportjob_status_created_idx'), # Worker's next-job lookup
+        ]
+
+    @property
+    def progress(self):
+        """ Percentage done (0-100) """
+        if self.status == self.DONE:
+            return 100
+        if not self.rows_total:
+            return 0
+        return min(99, self.rows_written * 100 // self.rows_total)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+# =========================================
+# 8. ACADEMIC YEAR ARCHIVE
+# =========================================
+# Closed academic years are moved out of the hot tables by
+# 'manage.py archive_academic_year' (see archive.py). The archive tables keep
+# only what reports need: no timestamps and, besides the foreign keys, at
+# most one index.
+class ArchivedYear(models.Model):
+    """ An archived academic year with its totals (rollup kept for reports) """
+    academic_year = models.CharField(max_length=20, unique=True) # e.g. "2023-24"
+    start_date = models.DateField()
+    end_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    attendance_rows = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    leave = models.PositiveIntegerField(default=0)
+    staff_attendance_rows = models.PositiveIntegerField(default=0)
+    staff_present = models.PositiveIntegerField(default=0)
+    staff_absent = models.PositiveIntegerField(default=0)
+    staff_leave = models.PositiveIntegerField(default=0)
+    fee_transactions = models.PositiveIntegerField(default=0)
+    fee_collected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-start_date']
+
+    def __str__(self):
+        return f"Archived {self.academic_year}"
+
+class ArchivedAttendance(models.Model):
+    """ Student attendance of an archived academic year """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_attendance')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave')])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'student'], name='archattendance_date_idx'), # Day/month reports
+        ]
+
+class ArchivedStaffAttendance(models.Model):
+    """ Staff attendance of an archived academic year """
+    staff = models.ForeignKey(Staff, on_delete=models.CASCADE, related_name='archived_attendance')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=[('Present', 'Present'), ('Absent', 'Absent'), ('Leave', 'Leave')])
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['staff', 'date'], name='archstaffatt_staff_date_idx'), # A teacher's history
+        ]
+
+class ArchivedFeeTransaction(models.Model):
+    """ Fee payments of an archived academic year (still counted in StudentFee totals) """
+    student_fee = models.ForeignKey(StudentFee, on_delete=models.CASCADE, related_name='archived_transactions')
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_date = models.DateField()
+    remarks = models.CharField(max_length=200, null=True, blank=True)
@@ -0,0 +1,60 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag,
+)
+
+
+# =========================================
+# FULL-PAGE CACHE FOR PUBLIC PAGES
+# =========================================
+def _is_cacheable(request):
+    """ Only plain anonymous GETs without pending flash messages share a page """
+    if request.method not in ('GET', 'HEAD') or request.GET:
+        return False
+    if request.user.is_authenticated:
+        return False
+    return len(get_messages(request)) == 0
+
+
+def public_page_cache(view):
+    """
+    Serves anonymous visitors a cached copy of the page with ETag and
+    Cache-Control headers, so browsers and proxies can reuse it and repeat
+    visits get 304 Not Modified. Logged-in users always get a fresh, private page.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _is_cacheable(request):
+            response = view(request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+            return response
+
+        timeout = getattr(settings, 'PUBLIC_PAGE_CACHE_SECONDS', 300)
+        key = f'school:page:{request.path}'
+        page = cache.get(key)
+        if page is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            page = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+            }
+            cache.set(key, page, timeout)
+
+        response = get_conditional_response(request, etag=page['etag'])
+        if response is None:
+            response = HttpResponse(page['content'], content_type=page['content_type'])
+        response['ETag'] = page['etag']
+        patch_cache_control(response, public=True, max_age=timeout)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    return wrapper
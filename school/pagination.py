@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import date
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+
+
+# =========================================
+# KEYSET ("seek") PAGINATION
+# =========================================
+# Instead of OFFSET (which re-reads every earlier row), each page asks for
+# rows that sort after the last row of the previous page. The position is
+# passed around as an opaque ?after=<cursor> token.
+
+def _encode_cursor(values):
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values], default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+def _ordering_field(queryset, name):
+    """ Model field (or annotation output field) behind an ordering name such as 'student__student_name' """
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    model = queryset.model
+    *path, last = name.split('__')
+    for part in path:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(last)
+
+def _cursor_values(queryset, ordering, values):
+    """
+    Converts decoded cursor values to the types of the ordering fields.
+    Returns None (= start from the first page) if the cursor doesn't fit:
+    wrong length, nulls, lists/objects, or values of the wrong type.
+    """
+    if len(values) != len(ordering):
+        return None
+    converted = []
+    try:
+        for field, value in zip(ordering, values):
+            if not isinstance(value, (str, int, float)):
+                return None
+            value = _ordering_field(queryset, field.lstrip('-')).to_python(value)
+            if value is None:
+                return None
+            converted.append(value)
+    except (ValidationError, FieldDoesNotExist, TypeError, ValueError):
+        return None
+    return converted
+
+def _seek_filter(ordering, values):
+    """
+    Builds (a > x) OR (a = x AND b > y) OR ... for an ordering such as
+    ('class_admitted', 'student_name', 'id'); '-field' flips the comparison.
+    """
+    condition = Q()
+    equal_so_far = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+        equal_so_far &= Q(**{name: value})
+    return condition
+
+def _sort_values(item, ordering):
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(item, dict):
+        return [item[name] for name in names]
+    return [getattr(item, name) for name in names]
+
+def keyset_paginate(request, queryset, ordering, page_size=DEFAULT_PAGE_SIZE, union=(), cursor_param='after'):
+    """
+    Returns one page of 'queryset' sorted by 'ordering' (which must end in a
+    unique field such as 'id'), starting after request.GET[cursor_param].
+    Give each list on a page its own cursor_param so they page independently.
+    'union' takes more querysets with the same values() columns to UNION ALL
+    in (archive tables); the seek filter is applied to every part.
+    The result dict has 'items', 'next_url' and 'first_url' for the template,
+    plus the raw 'next_cursor' for callers that build their own URLs.
+    """
+    parts = [queryset, *union]
+    cursor = request.GET.get(cursor_param)
+    values = _decode_cursor(cursor) if cursor else None
+    if values:
+        values = _cursor_values(queryset, ordering, values)
+    if values:
+        parts = [part.filter(_seek_filter(ordering, values)) for part in parts]
+    if union:
+        queryset = parts[0].order_by().union(*(part.order_by() for part in parts[1:]), all=True)
+    else:
+        queryset = parts[0]
+    queryset = queryset.order_by(*ordering)
+
+    # One extra row tells us whether there is a next page
+    items = list(queryset[:page_size + 1])
+    has_next = len(items) > page_size
+    items = items[:page_size]
+
+    params = request.GET.copy()
+    next_url = next_cursor = None
+    if has_next:
+        next_cursor = _encode_cursor(_sort_values(items[-1], ordering))
+        params[cursor_param] = next_cursor
+        next_url = f"?{params.urlencode()}"
+    params.pop(cursor_param, None)
+    first_url = f"?{params.urlencode()}" if cursor else None
+
+    return {'items': items, 'next_url': next_url, 'first_url': first_url, 'next_cursor': next_cursor}
+
+
+# =========================================
+# LIST FILTERS
+# =========================================
+def search_students(queryset, request):
+    """ ?class=, ?year= and ?q= (name, or parent phone if digits) for student lists """
+    class_name = request.GET.get('class')
+    academic_year = request.GET.get('year')
+    query = (request.GET.get('q') or '').strip()
+
+    if class_name:
+        queryset = queryset.filter(class_admitted=class_name)
+    if academic_year:
+        queryset = queryset.filter(academic_year=academic_year)
+    if query:
+        if query.isdigit():
+            queryset = queryset.filter(Q(mother_phone__startswith=query) | Q(father_phone__startswith=query))
+        else:
+            queryset = queryset.filter(student_name__icontains=query)
+    return queryset
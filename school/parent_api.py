@@ -0,0 +1,101 @@
+import hashlib
+from datetime import date
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Student, StudentFee, Attendance
+
+RECENT_ATTENDANCE_DAYS = 5
+# Bump when the JSON layout changes so cached copies stop matching
+SUMMARY_VERSION = 1
+
+
+# =========================================
+# 1. CHANGE FINGERPRINT (cheap, for ETags)
+# =========================================
+def _child_rows(model):
+    return model.objects.filter(student=OuterRef('pk')).order_by().values('student')
+
+def summary_etag(student_id):
+    """
+    Strong ETag for child_summary(): built from the student's updated_at
+    plus row count and latest updated_at of their fees and attendance, all
+    in one indexed query. Counts catch deletes; timestamps catch edits.
+    Returns None if the student doesn't exist.
+    """
+    fingerprint = (
+        Student.objects.filter(pk=student_id)
+        .annotate(
+            fee_rows=Coalesce(Subquery(_child_rows(StudentFee).annotate(n=Count('id')).values('n')), 0,
+                              output_field=IntegerField()),
+            fee_changed=Subquery(_child_rows(StudentFee).annotate(t=Max('updated_at')).values('t')),
+            attendance_rows=Coalesce(Subquery(_child_rows(Attendance).annotate(n=Count('id')).values('n')), 0,
+                                     output_field=IntegerField()),
+            attendance_changed=Subquery(_child_rows(Attendance).annotate(t=Max('updated_at')).values('t')),
+        )
+        .values_list('updated_at', 'fee_rows', 'fee_changed', 'attendance_rows', 'attendance_changed')
+        .first()
+    )
+    if fingerprint is None:
+        return None
+    # The year-to-date window moves with the date, so today is part of the tag
+    raw = f"{SUMMARY_VERSION}:{student_id}:{timezone.localdate()}:{fingerprint}"
+    return '"%s"' % hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+# =========================================
+# 2. CHILD SUMMARY (the heavy part)
+# =========================================
+def academic_year_start(academic_year, today):
+    """ June 1st of an academic year such as '2026-27' (same reference date as admissions) """
+    try:
+        return date(int(academic_year[:4]), 6, 1)
+    except (TypeError, ValueError):
+        return date(today.year if today.month >= 6 else today.year - 1, 6, 1)
+
+def child_summary(student):
+    """ Fees with balances, latest attendance and year-to-date attendance for one student """
+    today = timezone.localdate()
+    year_start = academic_year_start(student.academic_year, today)
+
+    fees = StudentFee.objects.filter(student=student).order_by('id').values(
+        'id', 'fee_name', 'total_amount', 'amount_paid_total', 'balance',
+    )
+    recent = (
+        Attendance.objects.filter(student=student)
+        .order_by('-date')
+        .values('date', 'status')[:RECENT_ATTENDANCE_DAYS]
+    )
+    ytd = Attendance.objects.filter(student=student, date__range=(year_start, today)).aggregate(
+        marked=Count('id'),
+        present=Count('id', filter=Q(status='Present')),
+        absent=Count('id', filter=Q(status='Absent')),
+        leave=Count('id', filter=Q(status='Leave')),
+    )
+
+    return {
+        'student': {
+            'id': student.id,
+            'name': student.student_name,
+            'class': student.class_admitted,
+            'academic_year': student.academic_year,
+        },
+        'fees': [
+            {
+                'id': fee['id'],
+                'name': fee['fee_name'],
+                'total': str(fee['total_amount']),
+                'paid': str(fee['amount_paid_total']),
+                'balance': str(fee['balance']),
+            }
+            for fee in fees
+        ],
+        'recent_attendance': [{'date': row['date'].isoformat(), 'status': row['status']} for row in recent],
+        'attendance_year_to_date': {
+            'from': year_start.isoformat(),
+            **ytd,
+            'percentage': round(ytd['present'] / ytd['marked'] * 100, 1) if ytd['marked'] else None,
+        },
+    }
@@ -0,0 +1,232 @@
+import csv
+import os
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .admissions import import_admission_file
+from .db_router import replica_reads_block
+from .exports import ATTENDANCE_HEADER, EXPENSE_HEADER, attendance_rows, expense_rows
+from .models import Attendance, ArchivedAttendance, Expense, ReportJob
+
+# rows_written (and the heartbeat) are saved after every this many rows
+PROGRESS_EVERY_ROWS = 5000
+# Touched by run_report_worker while it is alive (see worker_is_running)
+WORKER_HEARTBEAT_FILE = '.worker_heartbeat'
+
+
+# =========================================
+# 1. REPORTS THAT RUN IN THE BACKGROUND
+# =========================================
+# Full-history exports take too long to stream from a web worker. The views
+# queue a ReportJob instead and 'manage.py run_report_worker' writes the CSV
+# to REPORT_FILES_DIR, where the admin downloads it from the Reports page.
+#
+# kind -> (label, download file name, header, row count, rows)
+REPORTS = {
+    'attendance_full': (
+        "Attendance - Full History", "Attendance_Full_History.csv", ATTENDANCE_HEADER,
+        lambda: Attendance.objects.count() + ArchivedAttendance.objects.count(),
+        lambda: attendance_rows(Attendance.objects.order_by('-date'), archived=ArchivedAttendance.objects.all()),
+    ),
+    'funds_full': (
+        "Financial Report - Full History", "Financial_Report_Full_History.csv", EXPENSE_HEADER,
+        lambda: Expense.objects.count(),
+        lambda: expense_rows(Expense.objects.order_by('-date')),
+    ),
+}
+
+# Uploads processed in the background: kind -> (label, function(path, progress)).
+# The web request only validates and saves the file; the slow part (hashing
+# every admission's password across a process pool) runs in the worker.
+IMPORTS = {
+    'admissions': ("Bulk Admission", lambda path, progress: import_admission_file(path, progress=progress)),
+}
+
+def report_label(kind):
+    for jobs in (REPORTS, IMPORTS):
+        if kind in jobs:
+            return jobs[kind][0]
+    return kind
+
+def report_files_dir():
+    return Path(getattr(settings, 'REPORT_FILES_DIR', settings.BASE_DIR / 'report_files'))
+
+def record_worker_heartbeat():
+    """ Called by the worker between jobs and while a job makes progress """
+    path = report_files_dir() / WORKER_HEARTBEAT_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+def worker_is_running():
+    """
+    True if a report worker has checked in within REPORT_WORKER_ALIVE_SECONDS.
+    Without one, queued jobs would never run, so the views stream instead.
+    """
+    try:
+        last_seen = (report_files_dir() / WORKER_HEARTBEAT_FILE).stat().st_mtime
+    except OSError:
+        return False
+    return time.time() - last_seen < getattr(settings, 'REPORT_WORKER_ALIVE_SECONDS', 60)
+
+def upload_file_path(job):
+    """ Where a queued import's uploaded file is kept until the worker has run it """
+    return report_files_dir() / 'uploads' / f"{job.pk}_{job.kind}.csv"
+
+def report_file_path(job):
+    """ Path of a finished job's file, or None if it is not ready (or was cleaned up) """
+    if job.status != ReportJob.DONE or not job.file_name:
+        return None
+    path = report_files_dir() / job.file_name
+    return path if path.is_file() else None
+
+
+# =========================================
+# 2. QUEUE
+# =========================================
+def enqueue_report(kind, user):
+    """
+    Queues a report and returns (job, created). If the same report is already
+    queued or running, that job is returned instead of starting another one.
+    """
+    if kind not in REPORTS:
+        raise ValueError(f"Unknown report: {kind}")
+    with transaction.atomic():
+        job = ReportJob.objects.filter(kind=kind, status__in=(ReportJob.QUEUED, ReportJob.RUNNING)).first()
+        if job is not None:
+            return job, False
+        return ReportJob.objects.create(kind=kind, requested_by=user), True
+
+def enqueue_upload(kind, user, upload, rows_total):
+    """
+    Saves an uploaded file (already validated by the view) and queues its
+    import. The file is written before the job is committed, so the worker
+    never claims a job whose upload is missing.
+    """
+    if kind not in IMPORTS:
+        raise ValueError(f"Unknown import: {kind}")
+    with transaction.atomic():
+        job = ReportJob.objects.create(kind=kind, requested_by=user, rows_total=rows_total)
+        path = upload_file_path(job)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        upload.seek(0)
+        with open(path, 'wb') as handle:
+            for chunk in upload.chunks():
+                handle.write(chunk)
+    return job
+
+def claim_next_job():
+    """
+    Marks the oldest queued job as running and returns it (None if the queue
+    is empty). The claim is a conditional UPDATE, so two workers can never
+    pick up the same job, on SQLite as well as PostgreSQL.
+    """
+    candidates = list(
+        ReportJob.objects.filter(status=ReportJob.QUEUED)
+        .order_by('created_at').values_list('pk', flat=True)[:5]
+    )
+    for pk in candidates:
+        now = timezone.now()
+        claimed = ReportJob.objects.filter(pk=pk, status=ReportJob.QUEUED).update(
+            status=ReportJob.RUNNING, started_at=now, updated_at=now,
+        )
+        if claimed:
+            return ReportJob.objects.get(pk=pk)
+    return None
+
+def release_job(job):
+    """ Puts a running job back in the queue (worker stopped part-way) """
+    ReportJob.objects.filter(pk=job.pk, status=ReportJob.RUNNING).update(
+        status=ReportJob.QUEUED, rows_written=0, started_at=None, updated_at=timezone.now(),
+    )
+
+def requeue_stale_jobs():
+    """ Re-queues running jobs whose worker stopped sending heartbeats (crashed or killed) """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_JOB_STALE_SECONDS', 600))
+    return ReportJob.objects.filter(status=ReportJob.RUNNING, updated_at__lt=cutoff).update(
+        status=ReportJob.QUEUED, rows_written=0, started_at=None, updated_at=timezone.now(),
+    )
+
+def delete_expired_reports():
+    """ Deletes finished jobs (and their files) older than REPORT_RETENTION_DAYS """
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'REPORT_RETENTION_DAYS', 7))
+    expired = ReportJob.objects.filter(status__in=(ReportJob.DONE, ReportJob.FAILED), finished_at__lt=cutoff)
+    for file_name in expired.exclude(file_name='').values_list('file_name', flat=True):
+        (report_files_dir() / file_name).unlink(missing_ok=True)
+    return expired.delete()[0]
+
+
+# =========================================
+# 3. RUNNING A JOB (worker process)
+# =========================================
+def _save_progress(job, **fields):
+    ReportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now(), **fields)
+    record_worker_heartbeat()
+
+def run_import(job):
+    """
+    Imports a queued upload and marks the job done (or failed), then
+    deletes the upload. rows_written counts hashed passwords while running
+    and admitted rows once done.
+    """
+    path = upload_file_path(job)
+    run = IMPORTS[job.kind][1]
+    try:
+        imported = run(path, lambda done: _save_progress(job, rows_written=done))
+    except ValidationError as e:
+        _save_progress(job, status=ReportJob.FAILED, error="\n".join(e.messages), finished_at=timezone.now())
+    except Exception:
+        _save_progress(job, status=ReportJob.FAILED, error=traceback.format_exc(), finished_at=timezone.now())
+    else:
+        _save_progress(job, status=ReportJob.DONE, rows_written=len(imported), finished_at=timezone.now())
+    path.unlink(missing_ok=True)
+
+def run_job(job):
+    """
+    Writes the job's CSV to REPORT_FILES_DIR and marks it done (or failed).
+    The file is written under a temporary name and renamed at the end, so a
+    download never sees a half-written report. Queued imports are handed to
+    run_import().
+    """
+    if job.kind in IMPORTS:
+        run_import(job)
+        return
+    label, download_name, header, count_rows, get_rows = REPORTS.get(job.kind, (None,) * 5)
+    if label is None:
+        _save_progress(job, status=ReportJob.FAILED, error=f"Unknown report: {job.kind}",
+                       finished_at=timezone.now())
+        return
+
+    directory = report_files_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    file_name = f"{job.pk}_{download_name}"
+    partial = directory / f"{file_name}.part"
+    written = 0
+    try:
+        with replica_reads_block():
+            _save_progress(job, rows_total=count_rows())
+            with open(partial, 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(header)
+                for row in get_rows():
+                    writer.writerow(row)
+                    written += 1
+                    if written % PROGRESS_EVERY_ROWS == 0:
+                        _save_progress(job, rows_written=written)
+                if not written:
+                    writer.writerow(["No records found."])
+        os.replace(partial, directory / file_name)
+    except Exception:
+        _save_progress(job, status=ReportJob.FAILED, error=traceback.format_exc(), finished_at=timezone.now())
+        return
+    finally:
+        partial.unlink(missing_ok=True)
+
+    _save_progress(job, status=ReportJob.DONE, file_name=file_name, rows_written=written,
+                   finished_at=timezone.now())
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from .auth import user_group_names
+from .db_router import primary_reads
+from .models import Student, Staff
+
+ROLE_SUPER_ADMIN = 'super_admin'
+ROLE_STAFF = 'staff'
+ROLE_PARENT = 'parent'
+
+
+# =========================================
+# ROLE & PROFILE RESOLUTION (cached per user)
+# =========================================
+# Works out once (per login, or after the profile changes) whether a user is
+# super admin, staff or parent and which Student/Staff rows belong to them.
+# Results are cached by username in the cache shared by all worker processes
+# (ROLE_CACHE_ALIAS); signals.py clears the entry whenever the user's profile
+# or groups change, and login always starts fresh.
+
+def _cache():
+    return caches[getattr(settings, 'ROLE_CACHE_ALIAS', 'default')]
+
+def _cache_key(username):
+    return f'school:role:{username}'
+
+def _resolve(user):
+    if user.is_superuser:
+        return {'role': ROLE_SUPER_ADMIN, 'student_ids': [], 'staff_id': None, 'student_name': None}
+
+    if 'Staff' in user_group_names(user):
+        staff_id = Staff.objects.filter(username=user.username).values_list('id', flat=True).first()
+        return {'role': ROLE_STAFF, 'student_ids': [], 'staff_id': staff_id, 'student_name': None}
+
+    children = list(
+        Student.objects.filter(username=user.username).order_by('id').values_list('id', 'student_name')
+    )
+    return {
+        'role': ROLE_PARENT,
+        'student_ids': [student_id for student_id, _ in children],
+        'staff_id': None,
+        'student_name': children[0][1] if children else None,
+    }
+
+def get_user_role(request):
+    """ Cached role info for request.user: {'role', 'student_ids', 'staff_id', 'student_name'} """
+    if hasattr(request, '_school_role'):
+        return request._school_role
+
+    key = _cache_key(request.user.username)
+    role = _cache().get(key)
+    if role is None:
+        with primary_reads():  # Never cache a lagging replica's view of a new login
+            role = _resolve(request.user)
+        _cache().set(key, role, getattr(settings, 'ROLE_CACHE_SECONDS', 300))
+    request._school_role = role
+    return role
+
+def invalidate_user_role(username):
+    """ Forget the cached role for a username (after registration, edits or deletes) """
+    if username:
+        _cache().delete(_cache_key(username))
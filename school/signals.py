@@ -0,0 +1,128 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .attendance import refresh_attendance_summary, student_attendance_span
+from .auth import invalidate_cached_user
+from .finance import invalidate_financial_summary
+from .models import Student, Staff, StudentFee, FeeTransaction, Expense
+from .roles import invalidate_user_role
+
+
+# =========================================
+# 1. FEE LEDGER TOTALS
+# =========================================
+def _refresh_fee_totals(*fee_ids):
+    """ Re-sums the transactions of the given fees into their stored totals """
+    fee_ids = {fee_id for fee_id in fee_ids if fee_id}
+    if fee_ids:
+        StudentFee.recalculate_totals(StudentFee.objects.filter(pk__in=fee_ids))
+
+@receiver(pre_save, sender=FeeTransaction)
+def remember_previous_fee(sender, instance, **kwargs):
+    """ Notes the old fee if a payment is being moved to another fee """
+    instance._previous_fee_id = None
+    if not instance._state.adding and instance.pk:
+        instance._previous_fee_id = (
+            FeeTransaction.objects.filter(pk=instance.pk)
+            .values_list('student_fee_id', flat=True)
+            .first()
+        )
+
+@receiver(post_save, sender=FeeTransaction)
+def update_fee_totals_on_save(sender, instance, **kwargs):
+    _refresh_fee_totals(instance.student_fee_id, getattr(instance, '_previous_fee_id', None))
+
+@receiver(post_delete, sender=FeeTransaction)
+def update_fee_totals_on_delete(sender, instance, **kwargs):
+    _refresh_fee_totals(instance.student_fee_id)
+
+
+# =========================================
+# 2. CACHED USER ROLES
+# =========================================
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def clear_role_on_profile_change(sender, instance, **kwargs):
+    invalidate_user_role(instance.username)
+
+@receiver(post_save, sender=User)  # e.g. promoted to superuser
+@receiver(post_delete, sender=User)
+@receiver(user_logged_in)
+def clear_role_on_user_change(sender, user=None, instance=None, **kwargs):
+    invalidate_user_role((user or instance).username)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def clear_role_on_group_change(sender, instance, action, pk_set=None, **kwargs):
+    if isinstance(instance, User):
+        invalidate_user_role(instance.username)
+        invalidate_cached_user(instance.pk)
+        return
+    # group.user_set.add(...) etc.: pk_set holds the affected user ids;
+    # group.user_set.clear() only says so before the rows are removed
+    if action == 'pre_clear':
+        users = instance.user_set.all()
+    elif pk_set and action.startswith('post_'):
+        users = User.objects.filter(pk__in=pk_set)
+    else:
+        return
+    for user_id, username in users.values_list('pk', 'username'):
+        invalidate_user_role(username)
+        invalidate_cached_user(user_id)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def clear_cached_user(sender, instance, **kwargs):
+    # Covers password changes, deactivation and last_login updates
+    invalidate_cached_user(instance.pk)
+
+
+# =========================================
+# 3. CACHED FINANCE SUMMARY
+# =========================================
+@receiver(post_save, sender=StudentFee)
+@receiver(post_delete, sender=StudentFee)
+@receiver(post_save, sender=FeeTransaction)
+@receiver(post_delete, sender=FeeTransaction)
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def clear_financial_summary(sender, **kwargs):
+    invalidate_financial_summary()
+
+
+# =========================================
+# 4. DAILY CLASS ATTENDANCE ROLLUP
+# =========================================
+# The rollup groups attendance by the student's current class, so moving a
+# student to another class (or deleting them) changes both classes' rows on
+# every day the student was marked.
+
+@receiver(pre_save, sender=Student)
+def remember_previous_class(sender, instance, **kwargs):
+    instance._previous_class = None
+    if instance.pk and not kwargs.get('raw'):
+        instance._previous_class = (
+            Student.objects.filter(pk=instance.pk).values_list('class_admitted', flat=True).first()
+        )
+
+@receiver(post_save, sender=Student)
+def refresh_summary_on_class_change(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_class', None)
+    if previous is not None and previous != instance.class_admitted:
+        span = student_attendance_span(instance.pk)
+        if span:
+            refresh_attendance_summary(*span, [previous, instance.class_admitted])
+
+@receiver(pre_delete, sender=Student)
+def remember_attendance_span(sender, instance, **kwargs):
+    # Read before the cascade deletes the student's attendance
+    instance._attendance_span = student_attendance_span(instance.pk)
+
+@receiver(post_delete, sender=Student)
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    span = getattr(instance, '_attendance_span', None)
+    if span:
+        refresh_attendance_summary(*span, [instance.class_admitted])
@@ -0,0 +1,64 @@
+import json
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+_manifest_cache = {'mtime': None, 'data': {}}
+
+# Mime types of the <source> elements, best format first
+SOURCE_TYPES = (('avif', 'image/avif'), ('webp', 'image/webp'))
+
+
+def manifest_path():
+    return Path(settings.RESPONSIVE_IMAGES_ROOT) / 'responsive' / 'manifest.json'
+
+
+def _manifest():
+    """ Loads manifest.json written by build_responsive_images (re-read if it changes) """
+    path = manifest_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return {}
+    if _manifest_cache['mtime'] != mtime:
+        _manifest_cache['data'] = json.loads(path.read_text())
+        _manifest_cache['mtime'] = mtime
+    return _manifest_cache['data']
+
+
+def _srcset(variants):
+    return ', '.join(f"{static(path)} {width}w" for width, path in variants)
+
+
+@register.simple_tag
+def responsive_image(path, alt='', sizes='100vw', lazy=True, **attrs):
+    """
+    <picture> with AVIF/WebP/JPEG srcsets for a static image, e.g.
+    {% responsive_image 'images/gallery1.jpeg' alt='Sports Day' sizes='33vw' %}
+    Falls back to a plain lazy <img> when no variants have been built.
+    """
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    loading = 'lazy' if lazy else 'eager'
+    entry = _manifest().get(path)
+    if not entry:
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async"{}>', static(path), alt, loading, extra
+        )
+
+    jpeg_variants = entry['sources']['jpeg']
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, _srcset(entry['sources'][name]), sizes)
+         for name, mime in SOURCE_TYPES if entry['sources'].get(name)),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" '
+        'loading="{}" decoding="async"{}></picture>',
+        sources, static(jpeg_variants[0][1]), _srcset(jpeg_variants), sizes,
+        entry['width'], entry['height'], alt, loading, extra,
+    )
@@ -1,3 +1,1260 @@
-from django.test import TestCase
+import csv
+import gzip
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from . import concurrent_queries, metrics, views, visitors
+from .admissions import read_admission_csv, import_admissions
+from .analytics import (
+    fee_status_summary, class_attendance_for_date, class_attendance_for_range,
+    AGEING_BUCKETS, NEVER_PAID_BUCKET, DEFAULTER_SORTS, fee_defaulters, class_defaulter_summary, defaulter_rows,
+)
+from .archive import archive_year, restore_year
+from .attendance import (
+    parse_attendance_date, collect_roster_statuses, save_student_attendance, save_staff_attendance, refresh_attendance_summary,
+)
+from .auth import CachedModelBackend, user_group_names
+from .db_router import (
+    REPLICA_DB, STICKY_COOKIE, ReplicaRouter, replica_reads, replica_reads_block, writes_on_get,
+)
+from .exports import month_bounds, stream_csv
+from .finance import SUMMARY_CACHE_KEY, get_financial_summary, get_fee_status_summary
+from .middleware import ReplicaStickinessMiddleware
+from .models import (
+    Student, Staff, StudentFee, FeeTransaction, Attendance, StaffAttendance, DailyClassAttendanceSummary,
+    Expense, ReportJob, VisitorCount, ArchivedYear, ArchivedFeeTransaction, ArchivedAttendance, ArchivedStaffAttendance,
+)
+from .pagination import keyset_paginate, _encode_cursor
+from .report_jobs import (
+    enqueue_report, enqueue_upload, claim_next_job, run_job, requeue_stale_jobs,
+    record_worker_heartbeat, report_file_path, upload_file_path,
+)
+from .roles import ROLE_PARENT, ROLE_STAFF, ROLE_SUPER_ADMIN, get_user_role
+from .views import _staff_history_page
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-auth'},
+}
+
+
+# =========================================
+# HELPERS
+# =========================================
+@override_settings(CACHES=TEST_CACHES)
+class SchoolTestCase(TestCase):
+    """ Keeps the tests away from the 'auth' cache shared with a running server """
+
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+
+def make_student(name='Asha', class_name='LKG', phone='9876500001', **fields):
+    return Student.objects.create(
+        application_number=fields.pop('application_number', f"APP-{phone}"),
+        student_name=name, gender='Female', dob=date(2021, 4, 5),
+        class_admitted=class_name, academic_year='2026-27',
+        father_name='Ravi', father_phone='9876511111', mother_name='Lata', mother_phone=phone,
+        address='Bengaluru', username=phone, password='05042021', **fields,
+    )
+
+def make_staff(name='Meena', phone='9876522222'):
+    return Staff.objects.create(
+        full_name=name, gender='Female', phone_number=phone, recruitment_date=date(2020, 6, 1),
+        address='Bengaluru', username=phone,
+    )
+
+def make_fee(student, total='1000.00', name='Term 1 Fee'):
+    return StudentFee.objects.create(student=student, fee_name=name, total_amount=Decimal(total))
+
+def pay(fee, amount, day=date(2026, 7, 10)):
+    return FeeTransaction.objects.create(student_fee=fee, amount_paid=Decimal(amount), payment_date=day)
+
+
+# =========================================
+# 1. FEE LEDGER TOTALS
+# =========================================
+class FeeLedgerTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fee = make_fee(make_student())
+
+    def test_payments_update_stored_totals(self):
+        pay(self.fee, '300')
+        pay(self.fee, '200', date(2026, 8, 1))
+        self.fee.refresh_from_db()
+        self.assertEqual(self.fee.amount_paid_total, Decimal('500'))
+        self.assertEqual(self.fee.balance, Decimal('500'))
+        self.assertEqual(self.fee.last_payment_date, date(2026, 8, 1))
+
+    def test_deleting_a_payment_restores_totals(self):
+        pay(self.fee, '300')
+        pay(self.fee, '200', date(2026, 8, 1)).delete()
+        self.fee.refresh_from_db()
+        self.assertEqual(self.fee.amount_paid_total, Decimal('300'))
+        self.assertEqual(self.fee.balance, Decimal('700'))
+        self.assertEqual(self.fee.last_payment_date, date(2026, 7, 10))
+
+    def test_moving_a_payment_refreshes_both_fees(self):
+        other = make_fee(self.fee.student, '400.00', 'Bus Fee')
+        payment = pay(self.fee, '250')
+        payment.student_fee = other
+        payment.save()
+        self.fee.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.fee.amount_paid_total, self.fee.balance), (Decimal('0'), Decimal('1000')))
+        self.assertEqual((other.amount_paid_total, other.balance), (Decimal('250'), Decimal('150')))
+
+    def test_changing_the_amount_recomputes_the_balance(self):
+        pay(self.fee, '300')
+        fee = StudentFee.objects.get(pk=self.fee.pk)
+        fee.total_amount = '1200'
+        fee.save()
+        self.assertEqual(fee.balance, Decimal('900'))
+        fee.refresh_from_db()
+        self.assertEqual(fee.balance, Decimal('900'))
+
+    def test_stale_instance_does_not_overwrite_totals(self):
+        stale = StudentFee.objects.get(pk=self.fee.pk)
+        pay(self.fee, '300')
+        stale.fee_name = 'Term 1 Tuition'
+        with self.assertNumQueries(1):
+            stale.save()
+        self.fee.refresh_from_db()
+        self.assertEqual(self.fee.fee_name, 'Term 1 Tuition')
+        self.assertEqual(self.fee.amount_paid_total, Decimal('300'))
+        self.assertEqual(self.fee.balance, Decimal('700'))
+
+
+# =========================================
+# 2. BULK ATTENDANCE WRITERS
+# =========================================
+class AttendanceWriterTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.day = date(2026, 7, 10)
+        self.students = [make_student(f"Kid {i}", phone=f"98765000{i:02d}") for i in range(3)]
+
+    def test_resubmitting_a_roster_updates_instead_of_duplicating(self):
+        save_student_attendance(self.day, {s.id: 'Present' for s in self.students})
+        save_student_attendance(self.day, {self.students[0].id: 'Absent'})
+        statuses = dict(Attendance.objects.filter(date=self.day).values_list('student_id', 'status'))
+        self.assertEqual(statuses, {
+            self.students[0].id: 'Absent', self.students[1].id: 'Present', self.students[2].id: 'Present',
+        })
+
+    def test_one_invalid_status_rejects_the_whole_roster(self):
+        post = {f'status_{s.id}': 'Present' for s in self.students}
+        post[f'status_{self.students[1].id}'] = 'Holiday'
+        with self.assertRaises(ValidationError):
+            collect_roster_statuses(post, [s.id for s in self.students])
+
+    def test_unsubmitted_ids_are_skipped(self):
+        post = {f'status_{self.students[0].id}': 'Leave'}
+        self.assertEqual(collect_roster_statuses(post, [s.id for s in self.students]), {self.students[0].id: 'Leave'})
+
+    def test_staff_roster_is_upserted(self):
+        staff = make_staff()
+        save_staff_attendance(self.day, {staff.id: 'Present'})
+        save_staff_attendance(self.day, {staff.id: 'Leave'})
+        self.assertEqual(list(StaffAttendance.objects.values_list('staff_id', 'status')), [(staff.id, 'Leave')])
+
+
+# =========================================
+# 3. DAILY CLASS ATTENDANCE ROLLUP
+# =========================================
+class AttendanceRollupTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.day = date(2026, 7, 10)
+        self.lkg = [make_student(f"LKG {i}", 'LKG', phone=f"98765100{i:02d}") for i in range(3)]
+        self.ukg = [make_student(f"UKG {i}", 'UKG', phone=f"98765200{i:02d}") for i in range(2)]
+        save_student_attendance(self.day, {self.lkg[0].id: 'Present', self.lkg[1].id: 'Absent', self.lkg[2].id: 'Leave'})
+        save_student_attendance(self.day, {self.ukg[0].id: 'Present', self.ukg[1].id: 'Present'})
+
+    def rollup(self):
+        return {
+            row[0]: row[1:] for row in DailyClassAttendanceSummary.objects.filter(date=self.day)
+            .values_list('class_name', 'present', 'absent', 'leave', 'enrolled')
+        }
+
+    def test_marking_attendance_refreshes_the_rollup(self):
+        self.assertEqual(self.rollup(), {'LKG': (1, 1, 1, 3), 'UKG': (2, 0, 0, 2)})
+
+    def test_repeated_refreshes_give_the_same_rows(self):
+        refresh_attendance_summary(self.day, self.day)
+        refresh_attendance_summary(self.day, self.day, ['LKG'])
+        self.assertEqual(self.rollup(), {'LKG': (1, 1, 1, 3), 'UKG': (2, 0, 0, 2)})
+        self.assertEqual(DailyClassAttendanceSummary.objects.count(), 2)
+
+    def test_refresh_upserts_rows_in_place(self):
+        # Rows are updated, never deleted and re-inserted, so two refreshes of
+        # the same slice can't both insert it (unique class_name + date)
+        row = DailyClassAttendanceSummary.objects.get(class_name='LKG')
+        DailyClassAttendanceSummary.objects.filter(pk=row.pk).update(present=9, enrolled=9)
+        refresh_attendance_summary(self.day, self.day, ['LKG'])
+        self.assertEqual(self.rollup()['LKG'], (1, 1, 1, 3))
+        self.assertTrue(DailyClassAttendanceSummary.objects.filter(pk=row.pk).exists())
+
+    def test_slices_without_attendance_lose_their_row(self):
+        Attendance.objects.filter(student__class_admitted='UKG').delete()
+        refresh_attendance_summary(self.day, self.day)
+        self.assertEqual(list(self.rollup()), ['LKG'])
+
+    def test_changing_class_moves_the_students_counts(self):
+        student = Student.objects.get(pk=self.lkg[0].pk)
+        student.class_admitted = 'UKG'
+        student.save()
+        self.assertEqual(self.rollup(), {'LKG': (0, 1, 1, 2), 'UKG': (3, 0, 0, 3)})
+
+    def test_deleting_a_student_refreshes_their_class(self):
+        self.lkg[1].delete()
+        self.assertEqual(self.rollup()['LKG'], (1, 0, 1, 2))
+
+
+# =========================================
+# 4. KEYSET PAGINATION
+# =========================================
+class KeysetPaginationTests(SchoolTestCase):
+    ORDERING = ('class_admitted', 'student_name', 'id')
+
+    def setUp(self):
+        super().setUp()
+        # Repeated names make the id tie-breaker matter
+        for i in range(7):
+            make_student(f"Kid {i % 3}", ['LKG', 'UKG'][i % 2], phone=f"98765300{i:02d}")
+
+    def page(self, after=None, page_size=3):
+        request = RequestFactory().get('/', {'after': after} if after else {})
+        return keyset_paginate(request, Student.objects.all(), self.ORDERING, page_size)
+
+    def test_cursors_walk_every_row_once_in_order(self):
+        seen, after = [], None
+        while True:
+            page = self.page(after)
+            seen += [student.pk for student in page['items']]
+            after = page['next_cursor']
+            if after is None:
+                break
+        expected = list(Student.objects.order_by(*self.ORDERING).values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_next_url_keeps_other_query_parameters(self):
+        request = RequestFactory().get('/', {'class': 'LKG'})
+        page = keyset_paginate(request, Student.objects.all(), self.ORDERING, 2)
+        self.assertIn('class=LKG', page['next_url'])
+        self.assertIn('after=', page['next_url'])
+
+    def test_malformed_cursors_start_from_the_first_page(self):
+        first = [student.pk for student in self.page()['items']]
+        for cursor in ('not-base64!', _encode_cursor(['LKG']), _encode_cursor([{'a': 1}, 'x', 1]),
+                       _encode_cursor(['LKG', 'Kid 1', 'abc']), _encode_cursor(['LKG', None, 3])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([student.pk for student in self.page(cursor)['items']], first)
+
+
+# =========================================
+# 5. CACHED FINANCE SUMMARY
+# =========================================
+class FinanceSummaryTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fee = make_fee(make_student(), '1000.00')
+        pay(self.fee, '400')
+        Expense.objects.create(date=date(2026, 7, 1), purpose='Chalk', category='Stationery',
+                               amount=Decimal('150'), payment_type='Cash')
+
+    def test_summary_is_cached_in_the_shared_cache(self):
+        summary = get_financial_summary()
+        self.assertEqual(summary, {
+            'total_target': Decimal('1000'), 'total_collected': Decimal('400'),
+            'total_utilized': Decimal('150'), 'current_available': Decimal('250'),
+        })
+        self.assertEqual(caches['auth'].get(SUMMARY_CACHE_KEY), summary)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_financial_summary(), summary)
+
+    def test_payments_and_expenses_invalidate_the_summary(self):
+        get_financial_summary()
+        with self.captureOnCommitCallbacks(execute=True):
+            payment = pay(self.fee, '100')
+        self.assertEqual(get_financial_summary()['total_collected'], Decimal('500'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.delete()
+            Expense.objects.all().delete()
+        summary = get_financial_summary()
+        self.assertEqual(summary['total_collected'], Decimal('400'))
+        self.assertEqual(summary['current_available'], Decimal('400'))
+
+    def test_fee_status_summary_follows_payments(self):
+        summary, _ = get_fee_status_summary()
+        self.assertEqual(summary['partial_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            pay(self.fee, '600')
+        summary, _ = get_fee_status_summary()
+        self.assertEqual((summary['partial_count'], summary['fully_paid_count']), (0, 1))
+
+
+# =========================================
+# 6. PARENT DASHBOARD API (ETag)
+# =========================================
+class ParentApiTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.student = make_student()
+        self.fee = make_fee(self.student)
+        self.client.force_login(User.objects.create_user(self.student.username, password='05042021'))
+        self.url = reverse('parent_dashboard_api')
+
+    def get_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_matching_etag_gets_304(self):
+        etag = self.get_etag()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_etag_changes_with_payments_and_attendance(self):
+        etag = self.get_etag()
+        payment = pay(self.fee, '250')
+        after_payment = self.get_etag()
+        self.assertNotEqual(after_payment, etag)
+
+        payment.delete()
+        after_delete = self.get_etag()
+        self.assertNotEqual(after_delete, after_payment)
+
+        save_student_attendance(date(2026, 7, 1), {self.student.pk: 'Present'})
+        self.assertNotEqual(self.get_etag(), after_delete)
+
+    def test_other_students_and_staff_are_refused(self):
+        other = make_student('Ravi', phone='9876500002')
+        response = self.client.get(self.url, {'student': other.pk})
+        self.assertEqual(response.status_code, 404)
+
+        staff = make_staff()
+        user = User.objects.create_user(staff.username)
+        user.groups.add(Group.objects.get_or_create(name='Staff')[0])
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+# =========================================
+# 7. BACKGROUND REPORT JOBS
+# =========================================
+class ReportJobTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        files_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(files_dir.cleanup)
+        report_settings = self.settings(REPORT_FILES_DIR=Path(files_dir.name))
+        report_settings.enable()
+        self.addCleanup(report_settings.disable)
+        self.admin = User.objects.create_superuser('admin', password='secret')
+        for day in (1, 2, 3):
+            Expense.objects.create(date=date(2026, 7, day), purpose=f"Chalk {day}", category='Stationery',
+                                   amount=Decimal('10'), payment_type='Cash')
+
+    def test_same_report_is_queued_once_and_claimed_once(self):
+        job, created = enqueue_report('funds_full', self.admin)
+        self.assertTrue(created)
+        self.assertEqual(enqueue_report('funds_full', self.admin), (job, False))
+
+        self.assertEqual(claim_next_job(), job)
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(enqueue_report('funds_full', self.admin), (job, False))
+
+    def test_worker_writes_the_report_file(self):
+        job, _ = enqueue_report('funds_full', self.admin)
+        run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_total, job.rows_written), (ReportJob.DONE, 3, 3))
+        lines = report_file_path(job).read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), 4)  # header + one row per expense
+
+    def test_stale_running_jobs_are_requeued(self):
+        job, _ = enqueue_report('funds_full', self.admin)
+        claim_next_job()
+        self.assertEqual(requeue_stale_jobs(), 0)
+        ReportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        self.assertEqual(claim_next_job(), job)
+
+    def test_full_history_streams_without_a_worker(self):
+        self.client.force_login(self.admin)
+        url = reverse('download_funds_csv')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 4)
+        self.assertFalse(ReportJob.objects.exists())
+
+        record_worker_heartbeat()
+        self.assertRedirects(self.client.get(url), reverse('report_jobs'))
+        self.assertEqual(ReportJob.objects.get().kind, 'funds_full')
+
+    def test_full_history_is_open_to_any_login(self):
+        self.client.force_login(User.objects.create_user('office'))
+        url = reverse('download_attendance_report')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        record_worker_heartbeat()
+        self.assertRedirects(self.client.get(url), reverse('report_jobs'))
+        job = ReportJob.objects.get()
+        self.assertEqual(job.kind, 'attendance_full')
+        run_job(claim_next_job())
+        response = self.client.get(reverse('download_report_job', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content).splitlines()[0], b'Date,Class,Student Name,Status')
+
+    def test_queued_admissions_are_imported_by_the_worker(self):
+        upload = SimpleUploadedFile('admissions.csv', (
+            "application_number,student_name,gender,dob,class_admitted,academic_year,"
+            "father_name,father_phone,mother_name,mother_phone\n"
+            "APP-1,Asha,Female,2021-04-05,LKG,2026-27,Ravi,9876511111,Lata,9876500001\n"
+            "APP-2,Kiran,Male,05-06-2021,LKG,2026-27,Mohan,9876511112,Sita,9876500002\n"
+        ).encode())
+        job = enqueue_upload('admissions', self.admin, upload, rows_total=2)
+        self.assertTrue(upload_file_path(job).is_file())
+
+        run_job(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ReportJob.DONE, 2))
+        self.assertFalse(upload_file_path(job).exists())
+        self.assertTrue(User.objects.get(username='9876500002').check_password('05062021'))
+        self.assertEqual(Student.objects.get(username='9876500001').student_name, 'Asha')
+
+
+# =========================================
+# 8. ACADEMIC YEAR ARCHIVE
+# =========================================
+class ArchiveTests(SchoolTestCase):
+    TODAY = date(2026, 10, 18)  # 2024-25 is the latest year that can be archived
+
+    def setUp(self):
+        super().setUp()
+        self.student = make_student()
+        self.staff = make_staff()
+        self.fee = make_fee(self.student)
+        pay(self.fee, '300', date(2023, 7, 10))
+        pay(self.fee, '200', date(2026, 7, 10))
+        save_student_attendance(date(2023, 7, 3), {self.student.pk: 'Present'})
+        save_student_attendance(date(2026, 7, 1), {self.student.pk: 'Absent'})
+        for day, status in ((date(2023, 7, 3), 'Present'), (date(2023, 7, 4), 'Leave'), (date(2026, 7, 1), 'Present')):
+            save_staff_attendance(day, {self.staff.pk: status})
+
+    def ledger(self):
+        self.fee.refresh_from_db()
+        caches['auth'].clear()
+        return (self.fee.amount_paid_total, self.fee.balance, self.fee.last_payment_date, get_financial_summary())
+
+    def staff_history(self):
+        seen, after = [], None
+        while True:
+            request = RequestFactory().get('/', {'attendance_after': after} if after else {})
+            page = _staff_history_page(request, 'attendance', self.staff.pk, 2)
+            seen += [(row['date'], row['status']) for row in page['items']]
+            after = page['next_cursor']
+            if after is None:
+                return seen
+
+    def test_archive_then_restore_keeps_totals_and_history(self):
+        ledger, history = self.ledger(), self.staff_history()
+        self.assertEqual(ledger[:2], (Decimal('500'), Decimal('500')))
+        self.assertEqual(len(history), 3)
+
+        archived = archive_year('2023-24', self.TODAY)
+        self.assertEqual((archived.attendance_rows, archived.present), (1, 1))
+        self.assertEqual((archived.staff_attendance_rows, archived.fee_transactions), (2, 1))
+        self.assertEqual(archived.fee_collected, Decimal('300'))
+        self.assertEqual(FeeTransaction.objects.count(), 1)
+        self.assertEqual(ArchivedFeeTransaction.objects.count(), 1)
+        self.assertEqual(ArchivedAttendance.objects.count(), 1)
+        self.assertEqual(ArchivedStaffAttendance.objects.count(), 2)
+        self.assertEqual(self.ledger(), ledger)
+        self.assertEqual(self.staff_history(), history)
+
+        restore_year('2023-24')
+        self.assertFalse(ArchivedYear.objects.exists())
+        self.assertEqual(FeeTransaction.objects.count(), 2)
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(StaffAttendance.objects.count(), 3)
+        self.assertEqual(self.ledger(), ledger)
+        self.assertEqual(self.staff_history(), history)
+
+    def test_deleting_a_live_payment_keeps_archived_ones_counted(self):
+        archive_year('2023-24', self.TODAY)
+        FeeTransaction.objects.get().delete()
+        self.fee.refresh_from_db()
+        self.assertEqual(self.fee.amount_paid_total, Decimal('300'))
+        self.assertEqual(self.fee.last_payment_date, date(2023, 7, 10))
+
+    def test_archived_years_are_read_only(self):
+        archive_year('2023-24', self.TODAY)
+        with self.assertRaises(ValidationError):
+            parse_attendance_date('2023-07-03')
+        self.assertEqual(parse_attendance_date('2026-07-01'), date(2026, 7, 1))
+        with self.assertRaises(ValidationError):
+            archive_year('2023-24', self.TODAY)
+        with self.assertRaises(ValidationError):
+            archive_year('2025-26', self.TODAY)
+        with self.assertRaises(ValidationError):
+            restore_year('2022-23')
+
+
+# =========================================
+# 9. FEE DEFAULTERS & AGEING
+# =========================================
+class DefaulterTests(SchoolTestCase):
+    TODAY = date(2026, 10, 18)
+    BUCKETS = list(AGEING_BUCKETS) + [NEVER_PAID_BUCKET]
+
+    def setUp(self):
+        super().setUp()
+        asha, ravi = make_student('Asha', 'LKG', '9876500001'), make_student('Ravi', 'LKG', '9876500002')
+        kiran, lata = make_student('Kiran', 'UKG', '9876500003'), make_student('Lata', 'UKG', '9876500004')
+        paid_up = make_student('Mohan', 'UKG', '9876500005')
+        pay(make_fee(asha, '1000'), '200', date(2026, 10, 10))                  # 800 at 8 days
+        pay(make_fee(asha, '300', 'Transport Fee'), '0.01', date(2026, 5, 1))   # 299.99 at 170 days
+        pay(make_fee(ravi, '1000'), '100', date(2026, 8, 1))                    # 900 at 78 days
+        make_fee(kiran, '500')                                                  # never paid
+        pay(make_fee(lata, '600'), '100', date(2026, 11, 1))                    # future-dated: 0 days
+        pay(make_fee(paid_up, '400'), '400', date(2026, 1, 1))
+
+    def test_buckets_add_up_to_outstanding(self):
+        totals, rows = class_defaulter_summary(self.TODAY)
+        self.assertEqual(totals['outstanding'], Decimal('2999.99'))
+        self.assertEqual(totals['students_owing'], 4)
+        self.assertEqual({key: totals[key] for key in self.BUCKETS}, {
+            'age_0_30': Decimal('1300'), 'age_31_60': Decimal('0'), 'age_61_90': Decimal('900'),
+            'age_over_90': Decimal('299.99'), 'never_paid': Decimal('500'),
+        })
+        for row in rows:
+            self.assertEqual(sum(row[key] for key in self.BUCKETS), row['outstanding'])
+        self.assertEqual(totals['days_since_payment'], 0)
+
+    def test_only_students_who_owe_are_listed(self):
+        rows = list(defaulter_rows(fee_defaulters(self.TODAY).order_by(*DEFAULTER_SORTS['outstanding']), self.TODAY))
+        self.assertEqual([row['student__student_name'] for row in rows], ['Asha', 'Ravi', 'Kiran', 'Lata'])
+        for row in rows:
+            self.assertEqual(sum(row[key] for key in self.BUCKETS), row['outstanding'])
+        self.assertEqual({row['student__student_name']: row['days_since_payment'] for row in rows},
+                         {'Asha': 8, 'Ravi': 78, 'Kiran': None, 'Lata': 0})
+
+    def test_oldest_payment_sort_puts_never_paid_first(self):
+        rows = fee_defaulters(self.TODAY).order_by(*DEFAULTER_SORTS['oldest_payment'])
+        self.assertEqual([row['student__student_name'] for row in rows], ['Kiran', 'Ravi', 'Asha', 'Lata'])
+
+
+# =========================================
+# 10. FEE STATUS ANALYTICS
+# =========================================
+class FeeStatusSummaryTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        asha, ravi = make_student('Asha', 'LKG', '9876500001'), make_student('Ravi', 'UKG', '9876500002')
+        pay(make_fee(asha, '1000'), '1000')                   # fully paid
+        pay(make_fee(asha, '500', 'Books'), '600')            # overpaid
+        pay(make_fee(ravi, '1000'), '250')                    # partial
+        pay(make_fee(ravi, '800', 'Transport Fee'), '100')
+        make_fee(ravi, '300', 'Uniform')                      # unpaid
+
+    def per_fee_counts(self):
+        """ What the old per-invoice loop worked out, one fee at a time """
+        counts = {'total_invoices': 0, 'fully_paid_count': 0, 'partial_count': 0, 'unpaid_count': 0}
+        for fee in StudentFee.objects.all():
+            paid = sum(t.amount_paid for t in FeeTransaction.objects.filter(student_fee=fee))
+            counts['total_invoices'] += 1
+            if paid >= fee.total_amount:
+                counts['fully_paid_count'] += 1
+            elif paid > 0:
+                counts['partial_count'] += 1
+            else:
+                counts['unpaid_count'] += 1
+        return counts
+
+    def test_grouped_counts_match_the_per_fee_loop(self):
+        totals, rows = fee_status_summary()
+        self.assertEqual(rows, [])
+        self.assertEqual({key: totals[key] for key in self.per_fee_counts()}, self.per_fee_counts())
+        self.assertEqual(self.per_fee_counts(),
+                         {'total_invoices': 5, 'fully_paid_count': 2, 'partial_count': 2, 'unpaid_count': 1})
+        self.assertEqual(totals['total_expected'], Decimal('3600'))
+        self.assertEqual(totals['total_collected'], Decimal('1950'))
+        self.assertEqual(totals['total_outstanding'], Decimal('1750'))  # overpayment is not netted off
+
+    def test_breakdown_rows_add_up_to_the_totals(self):
+        totals, _ = fee_status_summary()
+        by_class, rows = fee_status_summary('class')
+        self.assertEqual(by_class, totals)
+        self.assertEqual([(row['class_admitted'], row['fully_paid_count'], row['partial_count'], row['unpaid_count'])
+                          for row in rows], [('LKG', 2, 0, 0), ('UKG', 0, 2, 1)])
+
+
+# =========================================
+# 11. CLASS ATTENDANCE ANALYTICS
+# =========================================
+class ClassAttendanceTests(SchoolTestCase):
+    DAY = date(2026, 7, 1)
+
+    def setUp(self):
+        super().setUp()
+        lkg = [make_student(f"Kid {i}", 'LKG', f"98765000{i:02d}") for i in range(3)]
+        ukg = [make_student(f"Kid {i}", 'UKG', f"98765001{i:02d}") for i in range(2)]
+        make_student('Nia', 'Nursery', '9876500200')  # attendance not taken
+        save_student_attendance(self.DAY, {lkg[0].pk: 'Present', lkg[1].pk: 'Absent', lkg[2].pk: 'Leave'})
+        save_student_attendance(self.DAY, {ukg[0].pk: 'Present', ukg[1].pk: 'Present'})
+        save_student_attendance(self.DAY + timedelta(days=1), {lkg[0].pk: 'Absent'})
+
+    def per_class_counts(self, day):
+        """ What the old view counted, one class and status at a time """
+        counts = {}
+        for class_name in Student.objects.values_list('class_admitted', flat=True).distinct():
+            logs = Attendance.objects.filter(student__class_admitted=class_name, date=day)
+            counts[class_name] = tuple(logs.filter(status=status).count() for status in ('Present', 'Absent', 'Leave'))
+        return counts
+
+    def test_day_matrix_matches_per_class_counts(self):
+        class_data = class_attendance_for_date(self.DAY)
+        self.assertEqual({row['class_name']: (row['present'], row['absent'], row['leave']) for row in class_data},
+                         self.per_class_counts(self.DAY))
+        by_class = {row['class_name']: row for row in class_data}
+        self.assertEqual((by_class['LKG']['percentage'], by_class['LKG']['status']), (33.3, 'Taken'))
+        self.assertEqual((by_class['UKG']['percentage'], by_class['UKG']['total_students']), (100.0, 2))
+        self.assertEqual((by_class['Nursery']['percentage'], by_class['Nursery']['status']), (0, 'Pending'))
+
+    def test_range_cells_line_up_with_days(self):
+        days, rows = class_attendance_for_range(self.DAY, self.DAY + timedelta(days=2))
+        self.assertEqual(len(days), 3)
+        cells = {row['class_name']: row['days'] for row in rows}
+        self.assertEqual(set(cells), {'LKG', 'UKG'})
+        for offset, day in enumerate(days[:2]):
+            for class_name, (present, absent, leave) in self.per_class_counts(day).items():
+                cell = cells.get(class_name, [None] * 3)[offset]
+                if present + absent + leave:
+                    self.assertEqual((cell['present'], cell['absent'], cell['leave']), (present, absent, leave))
+        self.assertIsNone(cells['UKG'][1])
+        self.assertIsNone(cells['LKG'][2])
+        self.assertEqual(cells['LKG'][1]['enrolled'], 3)
+
+
+# =========================================
+# 12. STREAMING CSV EXPORTS
+# =========================================
+class StreamCsvTests(SchoolTestCase):
+    HEADER = ['ID', 'Name', 'Class', 'Parent Phone', 'DOB', 'Gender', 'Address']
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            make_student(f"Kid {i}", phone=f"98765000{i:02d}")
+        self.client.force_login(User.objects.create_user('office'))
+        self.url = reverse('download_students_csv')
+
+    def lines(self, body):
+        return body.decode('utf-8').splitlines()
+
+    def test_rows_are_streamed_in_chunks(self):
+        rows = ([i, f"Kid {i}"] for i in range(5))
+        with mock.patch('school.exports.CSV_CHUNK_ROWS', 2):
+            response = stream_csv('kids.csv', ['ID', 'Name'], rows)
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 4)  # header, 2 + 2 rows, the last row
+        self.assertEqual(self.lines(b''.join(chunks))[-1], '4,Kid 4')
+        empty = stream_csv('kids.csv', ['ID'], iter(()), empty_message="No records found.")
+        self.assertEqual(self.lines(b''.join(empty.streaming_content)), ['ID', 'No records found.'])
+
+    def test_plain_csv_without_accept_encoding(self):
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('filename="student_list.csv"', response['Content-Disposition'])
+        lines = self.lines(b''.join(response.streaming_content))
+        self.assertEqual(lines[0], ','.join(self.HEADER))
+        self.assertEqual(len(lines), 6)
+
+    def test_gzip_encoded_when_the_client_accepts_it(self):
+        plain = b''.join(self.client.get(self.url).streaming_content)
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+        self.assertEqual((response['Content-Type'], response['Content-Encoding']), ('text/csv', 'gzip'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('filename="student_list.csv"', response['Content-Disposition'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    def test_gzip_file_on_request(self):
+        response = self.client.get(self.url, {'gzip': '1'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn('filename="student_list.csv.gz"', response['Content-Disposition'])
+        self.assertEqual(len(self.lines(gzip.decompress(b''.join(response.streaming_content)))), 6)
+        self.assertEqual(stream_csv('a.csv', ['A'], iter(()), compress=True)['Content-Type'], 'application/gzip')
+
+
+# =========================================
+# 13. REQUEST METRICS
+# =========================================
+@override_settings(REQUEST_METRICS_ENABLED=True)
+class RequestMetricsTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.admin = User.objects.create_superuser('admin', password='secret')
+
+    def exposition(self):
+        response = self.client.get(reverse('request_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode().splitlines()
+
+    def test_requests_are_recorded_per_url_name(self):
+        make_student()
+        self.client.force_login(self.admin)
+        self.client.get(reverse('manage_students'))
+        self.client.get(reverse('manage_students'))
+        lines = self.exposition()
+        self.assertIn('# TYPE school_request_queries histogram', lines)
+        for name in ('duration_seconds', 'db_seconds', 'render_seconds', 'queries'):
+            self.assertIn(f'school_request_{name}_count{{view="manage_students"}} 2', lines)
+        render_sum = next(line for line in lines if line.startswith('school_request_render_seconds_sum'))
+        self.assertGreater(float(render_sum.split()[-1]), 0)
+        queries_sum = next(line for line in lines if line.startswith('school_request_queries_sum'))
+        self.assertGreater(float(queries_sum.split()[-1]), 0)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.observe_request('home', school_request_queries=3, school_response_size_bytes=None)
+        metrics.observe_request('home', school_request_queries=40)
+        lines = metrics.render_exposition().splitlines()
+        self.assertIn('school_request_queries_bucket{view="home",le="2"} 0', lines)
+        self.assertIn('school_request_queries_bucket{view="home",le="5"} 1', lines)
+        self.assertIn('school_request_queries_bucket{view="home",le="+Inf"} 2', lines)
+        self.assertIn('school_request_queries_sum{view="home"} 43.000000', lines)
+        self.assertFalse(any(line.startswith('school_response_size_bytes_count') for line in lines))
+
+    def test_metrics_are_for_superusers_only(self):
+        self.client.force_login(User.objects.create_user('office'))
+        self.assertEqual(self.client.get(reverse('request_metrics')).status_code, 403)
+
+    @override_settings(REQUEST_METRICS_ENABLED=False)
+    def test_nothing_is_recorded_when_disabled(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('manage_students'))
+        self.assertNotIn('view="manage_students"', metrics.render_exposition())
+
+
+# =========================================
+# 14. VISITOR COUNTER
+# =========================================
+@override_settings(VISITOR_COUNTER_FLUSH_EVERY=1000, VISITOR_COUNTER_FLUSH_SECONDS=3600)
+class VisitorCounterTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        visitors.flush_visits()  # Drop hits buffered by earlier tests
+        VisitorCount.objects.all().delete()
+        # Flush leftovers inside the test transaction, not into the real database at exit
+        self.addCleanup(visitors.flush_visits)
+        caches['default'].clear()
+
+    def test_buffered_hits_are_flushed_into_the_shards(self):
+        for _ in range(5):
+            visitors.record_visit()
+        self.assertFalse(VisitorCount.objects.exists())
+        self.assertEqual(visitors.visitor_total(), 5)  # unflushed hits are shown too
+
+        visitors.flush_visits()
+        for _ in range(3):
+            visitors.record_visit()
+        visitors.flush_visits()
+        self.assertEqual(sum(VisitorCount.objects.values_list('count', flat=True)), 8)
+        self.assertEqual(visitors.visitor_total(), 8)
+        caches['default'].clear()
+        self.assertEqual(visitors.visitor_total(), 8)
+
+    def test_a_missing_shard_is_created_once(self):
+        with mock.patch('school.visitors.random.randint', return_value=3):
+            visitors.record_visit()
+            visitors.flush_visits()
+            visitors.record_visit()
+            visitors.flush_visits()
+        self.assertEqual(list(VisitorCount.objects.values_list('id', 'count')), [(3, 2)])
+
+    def test_losing_the_race_to_create_a_shard_still_counts(self):
+        # Another worker creates shard 2 between our UPDATE (0 rows) and our INSERT
+        VisitorCount.objects.create(id=2, count=4)
+        update, missed = QuerySet.update, []
+
+        def first_update_misses(queryset, **fields):
+            if not missed:
+                missed.append(True)
+                return 0
+            return update(queryset, **fields)
+
+        with mock.patch('school.visitors.random.randint', return_value=2), \
+                mock.patch.object(QuerySet, 'update', autospec=True, side_effect=first_update_misses):
+            for _ in range(3):
+                visitors.record_visit()
+            visitors.flush_visits()
+        self.assertEqual(list(VisitorCount.objects.values_list('id', 'count')), [(2, 7)])
+
+    def test_only_posts_count_a_visit(self):
+        url = reverse('visitor_count')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        self.assertEqual(visitors.visitor_total(), 0)
+
+        response = self.client.post(url)
+        self.assertEqual(response.json(), {'visitors': 1})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+
+# =========================================
+# 15. PUBLIC PAGE CACHE
+# =========================================
+class PublicPageCacheTests(SchoolTestCase):
+    KEY = 'school:page:/about/'
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('about')
+        render_patch = mock.patch('school.views.render', wraps=views.render)
+        self.render = render_patch.start()
+        self.addCleanup(render_patch.stop)
+
+    def test_anonymous_gets_share_one_cached_page(self):
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('public', second['Cache-Control'])
+        self.assertIn('max-age=', second['Cache-Control'])
+        self.assertIn('Cookie', second['Vary'])
+        self.assertEqual(caches['default'].get(self.KEY)['content'], first.content)
+
+    def test_matching_etag_gets_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_logged_in_users_never_use_the_cache(self):
+        caches['default'].set(self.KEY, {'content': b'someone else', 'content_type': 'text/html', 'etag': '"x"'})
+        self.client.force_login(User.objects.create_user('9876500001'))
+        response = self.client.get(self.url)
+        self.assertNotEqual(response.content, b'someone else')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn('ETag', response)
+
+        caches['default'].clear()
+        self.client.get(self.url)
+        self.assertIsNone(caches['default'].get(self.KEY))
+        self.assertEqual(self.render.call_count, 2)
+
+    def test_posts_and_query_strings_bypass_the_cache(self):
+        caches['default'].set(self.KEY, {'content': b'cached', 'content_type': 'text/html', 'etag': '"x"'})
+        self.assertNotEqual(self.client.post(self.url).content, b'cached')
+        self.assertNotEqual(self.client.get(self.url, {'utm': 'sms'}).content, b'cached')
+        self.assertEqual(self.render.call_count, 2)
+
+
+# =========================================
+# 16. BULK ADMISSION IMPORT
+# =========================================
+class AdmissionImportTests(SchoolTestCase):
+    HEADER = ("application_number,student_name,gender,dob,class_admitted,academic_year,"
+              "father_name,father_phone,mother_name,mother_phone")
+
+    def read(self, *lines, header=HEADER):
+        return read_admission_csv([header, *lines])
+
+    def row(self, application, phone, dob='2021-04-05', gender='Female'):
+        return f"{application},Asha,{gender},{dob},LKG,2026-27,Ravi,9876511111,Lata,{phone}"
+
+    def test_valid_rows_are_cleaned(self):
+        rows, errors = self.read(self.row('APP-1', '9876500001', dob='05/06/2021', gender='female'))
+        self.assertEqual(errors, [])
+        self.assertEqual((rows[0]['dob'], rows[0]['gender'], rows[0]['password']),
+                         (date(2021, 6, 5), 'Female', '05062021'))
+
+    def test_missing_columns_are_reported_before_any_row(self):
+        rows, errors = self.read(self.row('APP-1', '9876500001'), header=self.HEADER.replace(',dob', ''))
+        self.assertEqual((rows, errors), ([], [(1, "Missing column(s): dob")]))
+        self.assertEqual(read_admission_csv([self.HEADER]), ([], [(1, "The file has no student rows.")]))
+
+    def test_bad_values_are_reported_by_line(self):
+        rows, errors = self.read(
+            self.row('APP-1', '9876500001'),
+            self.row('APP-2', '98765-0002', dob='2021-13-40', gender='Other'),
+        )
+        self.assertEqual([row['application_number'] for row in rows], ['APP-1'])
+        self.assertEqual([line for line, _ in errors], [3, 3, 3])
+        messages = " | ".join(message for _, message in errors)
+        self.assertIn("invalid dob '2021-13-40'", messages)
+        self.assertIn("gender must be one of", messages)
+        self.assertIn("mother_phone must contain digits only", messages)
+
+    def test_duplicate_phones_in_the_file_and_the_database(self):
+        User.objects.create_user('9876500003')
+        _, errors = self.read(
+            self.row('APP-1', '9876500001'), self.row('APP-2', '9876500001'), self.row('APP-3', '9876500003'),
+        )
+        self.assertEqual(errors, [
+            (3, "mother_phone 9876500001 already used on line 2"),
+            (4, "Phone Number 9876500003 is already registered"),
+        ])
+
+    def test_import_is_all_or_nothing_when_a_phone_was_taken_meanwhile(self):
+        rows, errors = self.read(self.row('APP-1', '9876500001'), self.row('APP-2', '9876500002'))
+        self.assertEqual(errors, [])
+        User.objects.create_user('9876500002')  # registered after the file was checked
+        with self.assertRaisesMessage(ValidationError, "Already registered: 9876500002"):
+            import_admissions(rows, workers=1)
+        self.assertFalse(Student.objects.exists())
+        self.assertEqual(User.objects.count(), 1)
+
+        User.objects.all().delete()
+        students = import_admissions(rows, workers=1)
+        self.assertEqual(len(students), 2)
+        self.assertTrue(User.objects.get(username='9876500001').check_password('05042021'))
+
+
+# =========================================
+# 17. CACHED USERS & ROLES
+# =========================================
+class CachedUserTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = CachedModelBackend()
+        self.user = User.objects.create_user('9876522222', password='secret')
+        self.staff_group = Group.objects.create(name='Staff')
+
+    def role(self, user=None):
+        request = RequestFactory().get('/')
+        request.user = user or self.backend.get_user(self.user.pk)
+        return get_user_role(request)['role']
+
+    def test_user_and_groups_are_served_from_the_cache(self):
+        self.user.groups.add(self.staff_group)
+        user = self.backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            cached = self.backend.get_user(self.user.pk)
+            self.assertEqual(cached, user)
+            self.assertEqual(user_group_names(cached), {'Staff'})
+
+    def test_saving_the_user_drops_the_cached_copy(self):
+        self.assertFalse(self.backend.get_user(self.user.pk).is_superuser)
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertTrue(self.backend.get_user(self.user.pk).is_superuser)
+
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertTrue(self.backend.get_user(self.user.pk).check_password('changed'))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+        self.user.delete()
+        self.assertIsNone(self.backend.get_user(self.user.pk))
+
+    def test_group_changes_from_the_user_side(self):
+        self.assertEqual(self.role(), ROLE_PARENT)
+        self.user.groups.add(self.staff_group)
+        self.assertEqual(user_group_names(self.backend.get_user(self.user.pk)), {'Staff'})
+        self.assertEqual(self.role(), ROLE_STAFF)
+        self.user.groups.clear()
+        self.assertEqual(self.role(), ROLE_PARENT)
+
+    def test_group_changes_from_the_group_side(self):
+        other = User.objects.create_user('9876522223')
+        self.assertEqual((self.role(), self.role(self.backend.get_user(other.pk))), (ROLE_PARENT, ROLE_PARENT))
+        self.staff_group.user_set.add(self.user, other)
+        self.assertEqual((self.role(), self.role(self.backend.get_user(other.pk))), (ROLE_STAFF, ROLE_STAFF))
+
+        self.staff_group.user_set.remove(other)
+        self.assertEqual(self.role(self.backend.get_user(other.pk)), ROLE_PARENT)
+        self.staff_group.user_set.clear()
+        self.assertEqual(self.role(), ROLE_PARENT)
+
+    def test_promotion_to_superuser_reaches_the_cached_role(self):
+        self.assertEqual(self.role(), ROLE_PARENT)
+        self.user.is_superuser = True
+        self.user.save()
+        self.assertEqual(self.role(), ROLE_SUPER_ADMIN)
+
+
+# =========================================
+# 18. READ REPLICA ROUTING
+# =========================================
+class ReplicaRoutingTests(SchoolTestCase):
+    """ No replica exists here; the routing decisions are checked without running the queries """
+
+    def setUp(self):
+        super().setUp()
+        configured = mock.patch('school.db_router.replica_configured', return_value=True)
+        configured.start()
+        self.addCleanup(configured.stop)
+        self.factory = RequestFactory()
+
+    def read_db(self):
+        return Student.objects.all().db
+
+    def reads_in(self, request, write=False):
+        seen = {}
+
+        @replica_reads
+        def report(request):
+            seen['before'] = self.read_db()
+            if write:
+                make_student()
+            seen['after'] = self.read_db()
+            return HttpResponse()
+
+        report(request)
+        return seen
+
+    def test_report_reads_go_to_the_replica(self):
+        self.assertEqual(self.reads_in(self.factory.get('/')), {'before': REPLICA_DB, 'after': REPLICA_DB})
+        self.assertEqual(self.read_db(), 'default')  # only inside the view
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        self.assertEqual(self.reads_in(self.factory.get('/'), write=True), {'before': REPLICA_DB, 'after': 'default'})
+        with replica_reads_block():
+            self.assertEqual(self.read_db(), REPLICA_DB)
+            make_student('Ravi', phone='9876500002')
+            self.assertEqual(self.read_db(), 'default')
+
+    def test_posts_and_sticky_requests_use_the_primary(self):
+        self.assertEqual(set(self.reads_in(self.factory.post('/')).values()), {'default'})
+        sticky = self.factory.get('/')
+        sticky.COOKIES[STICKY_COOKIE] = '1'
+        self.assertEqual(set(self.reads_in(sticky).values()), {'default'})
+
+    def test_streamed_rows_are_read_from_the_replica(self):
+        @replica_reads
+        def export(request):
+            return StreamingHttpResponse(self.read_db() for _ in range(2))
+
+        response = export(self.factory.get('/'))
+        self.assertEqual(self.read_db(), 'default')
+        self.assertEqual(b''.join(response.streaming_content), f"{REPLICA_DB}{REPLICA_DB}".encode())
+
+    def test_writes_never_go_to_the_replica(self):
+        router = ReplicaRouter()
+        with replica_reads_block():
+            self.assertEqual(router.db_for_read(Student), REPLICA_DB)
+            self.assertEqual(router.db_for_write(Student), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA_DB, 'school'))
+        self.assertTrue(router.allow_migrate('default', 'school'))
+
+    def test_write_requests_set_the_sticky_cookie(self):
+        with mock.patch('school.middleware.replica_configured', return_value=True):
+            middleware = ReplicaStickinessMiddleware(writes_on_get(lambda request: HttpResponse()))
+            plain = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+        self.assertIn(STICKY_COOKIE, plain(self.factory.post('/')).cookies)
+        self.assertNotIn(STICKY_COOKIE, plain(self.factory.get('/')).cookies)
+        self.assertIn(STICKY_COOKIE, middleware(self.factory.get('/')).cookies)  # GET delete links
+
+
+# =========================================
+# 19. CONCURRENT DASHBOARD QUERIES
+# =========================================
+class ConcurrentQueryTests(SchoolTestCase):
+
+    def concurrently(self):
+        return mock.patch.object(concurrent_queries, 'runs_concurrently', return_value=True)
+
+    def test_queries_overlap_in_the_pool(self):
+        # Each query waits for the other: only finishes if both run at once
+        barrier = threading.Barrier(2, timeout=5)
+
+        def query(name):
+            barrier.wait()
+            return name, threading.current_thread().name
+
+        with self.concurrently():
+            results = concurrent_queries.run_queries(a=lambda: query('a'), b=lambda: query('b'))
+        self.assertEqual([results['a'][0], results['b'][0]], ['a', 'b'])
+        self.assertTrue(all(thread.startswith('school-query') for _, thread in results.values()))
+
+    def test_tasks_keep_the_request_context(self):
+        def seen():
+            return Student.objects.all().db, len(connections['default'].execute_wrappers)
+
+        def wrapper(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        with self.concurrently(), mock.patch('school.db_router.replica_configured', return_value=True), \
+                replica_reads_block(), connections['default'].execute_wrapper(wrapper):
+            self.assertEqual(concurrent_queries.run_queries(seen=seen)['seen'], (REPLICA_DB, 1))
+
+    def test_errors_are_raised_in_the_request(self):
+        with self.concurrently(), self.assertRaises(ZeroDivisionError):
+            concurrent_queries.run_queries(ok=lambda: 1, broken=lambda: 1 / 0)
+
+    def test_runs_in_the_request_thread_inside_a_transaction_or_on_sqlite(self):
+        self.assertFalse(concurrent_queries.runs_concurrently())
+        results = concurrent_queries.run_queries(thread=lambda: threading.current_thread())
+        self.assertIs(results['thread'], threading.current_thread())
+
+    def test_manage_funds_renders_every_query_result(self):
+        make_staff()
+        Expense.objects.create(date=date(2026, 7, 1), purpose='Chalk', category='Stationery',
+                               amount=Decimal('150'), payment_type='Cash')
+        self.client.force_login(User.objects.create_superuser('admin'))
+        response = self.client.get(reverse('manage_funds'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([e.purpose for e in response.context['recent_expenses']], ['Chalk'])
+        self.assertEqual(response.context['total_utilized'], Decimal('150'))
+        self.assertEqual([s.full_name for s in response.context['staff_members']], ['Meena'])
+
+
+# =========================================
+# 20. STAFF DASHBOARD HISTORY
+# =========================================
+class StaffHistoryTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.staff = make_staff()
+        for day in range(1, 26):
+            save_staff_attendance(date(2026, 7, day), {self.staff.pk: 'Present' if day % 5 else 'Leave'})
+        for month in range(1, 13):
+            Expense.objects.create(date=date(2026, month, 28), purpose=f"Salary {month}", category='Salary',
+                                   amount=Decimal('20000'), payment_type='Bank Transfer', staff=self.staff)
+        user = User.objects.create_user(self.staff.username)
+        user.groups.add(Group.objects.get_or_create(name='Staff')[0])
+        self.client.force_login(user)
+
+    def history(self, kind, url=None):
+        """ Every row of one list, following next_url from the dashboard's 'Load older' link """
+        response = self.client.get(reverse('staff_dashboard'))
+        rows = [item.purpose if kind == 'salary' else item['date'].isoformat()
+                for item in response.context[f'my_{kind}_history']]
+        url = response.context[f'older_{kind}_url']
+        while url:
+            page = self.client.get(url).json()
+            rows += [row['purpose'] if kind == 'salary' else row['date'] for row in page['rows']]
+            url = page['next_url']
+        return rows
+
+    def test_dashboard_shows_a_recent_window_and_monthly_totals(self):
+        response = self.client.get(reverse('staff_dashboard'))
+        context = response.context
+        self.assertEqual(len(context['my_salary_history']), 10)
+        self.assertEqual(context['my_salary_history'][0].purpose, 'Salary 12')
+        self.assertEqual(context['my_attendance_history'][0]['date'], date(2026, 7, 25))
+        self.assertIn('salary_after=', context['older_salary_url'])
+        self.assertIn('attendance_after=', context['older_attendance_url'])
+        july = next(row for row in context['monthly_summary'] if row['month'] == date(2026, 7, 1))
+        self.assertEqual((july['present'], july['leave'], july['salary_paid']), (20, 5, Decimal('20000')))
+
+    def test_load_older_walks_each_list_once(self):
+        self.assertEqual(self.history('salary'), [f"Salary {month}" for month in range(12, 0, -1)])
+        attendance = self.history('attendance')
+        self.assertEqual(len(attendance), 25)
+        self.assertEqual(len(set(attendance)), 25)
+
+    def test_each_list_has_its_own_cursor(self):
+        first = self.client.get(reverse('staff_dashboard')).context
+        salary_cursor = parse_qs(urlsplit(first['older_salary_url']).query)['salary_after'][0]
+        paged = self.client.get(reverse('staff_dashboard'), {'salary_after': salary_cursor}).context
+        self.assertEqual(paged['my_salary_history'][0].purpose, 'Salary 2')
+        self.assertEqual(paged['my_attendance_history'], first['my_attendance_history'])
+
+        older = self.client.get(reverse('staff_history', args=['attendance']), {'salary_after': salary_cursor})
+        self.assertEqual(older.json()['rows'][0]['date'], date_format(date(2026, 7, 25)))
+
+    def test_history_is_for_staff_only(self):
+        self.assertEqual(self.client.get(reverse('staff_history', args=['payslips'])).status_code, 403)
+        self.client.force_login(User.objects.create_user('9876500001'))
+        self.assertEqual(self.client.get(reverse('staff_history', args=['salary'])).status_code, 403)
+
+
+# =========================================
+# 21. MONTHLY ATTENDANCE REGISTER
+# =========================================
+class AttendanceRegisterTests(SchoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        asha, ravi = make_student('Asha', 'LKG', '9876500001'), make_student('Ravi', 'LKG', '9876500002')
+        make_student('Kiran', 'LKG', '9876500003')  # never marked: blank row
+        lata = make_student('Lata', 'UKG', '9876500004')
+        july = lambda day: date(2026, 7, day)
+        save_student_attendance(date(2026, 6, 30), {asha.pk: 'Present'})  # previous month
+        save_student_attendance(july(1), {asha.pk: 'Present', ravi.pk: 'Absent'})
+        save_student_attendance(july(2), {asha.pk: 'Leave', lata.pk: 'Present'})  # Ravi not marked
+        save_student_attendance(july(3), {asha.pk: 'Present', ravi.pk: 'Present'})
+        save_student_attendance(july(3), {asha.pk: 'Absent'})  # corrected: the later mark wins
+        save_student_attendance(date(2026, 8, 1), {ravi.pk: 'Present'})  # next month
+        self.client.force_login(User.objects.create_user('office'))
+
+    def register(self, month):
+        response = self.client.get(reverse('download_attendance_report'), {'mode': 'register', 'month': month})
+        self.assertEqual(response.status_code, 200)
+        return list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_register_pivots_students_by_school_day(self):
+        self.assertEqual(self.register('2026-07'), [
+            ['Attendance Register', 'July 2026'],
+            ['Class: LKG'],
+            ['Application No', 'Student Name', '1', '2', '3', 'Present', 'Absent', 'Leave', 'Attendance %'],
+            ['APP-9876500001', 'Asha', 'P', 'L', 'A', '1', '1', '1', '33.3'],
+            ['APP-9876500003', 'Kiran', '', '', '', '0', '0', '0', ''],
+            ['APP-9876500002', 'Ravi', 'A', '', 'P', '1', '1', '0', '50.0'],
+            ['', 'Total Present', '1', '0', '1'],
+            [],
+            ['Class: UKG'],
+            ['Application No', 'Student Name', '2', 'Present', 'Absent', 'Leave', 'Attendance %'],
+            ['APP-9876500004', 'Lata', 'P', '1', '0', '0', '100.0'],
+            ['', 'Total Present', '1'],
+            [],
+        ])
+
+    def test_month_edges(self):
+        june = self.register('2026-06')
+        self.assertIn(['APP-9876500001', 'Asha', 'P', '1', '0', '0', '100.0'], june)
+        self.assertEqual(june[2][2:3], ['30'])
+        self.assertEqual(month_bounds('2026-02'), (date(2026, 2, 1), date(2026, 2, 28)))
+        self.assertEqual(month_bounds('2028-02'), (date(2028, 2, 1), date(2028, 2, 29)))
+        self.assertEqual(month_bounds('9999-12'), (date(9999, 12, 1), date(9999, 12, 31)))
+        for bad in ('2026-13', '2026', 'July'):
+            with self.assertRaises(ValueError):
+                month_bounds(bad)
+        response = self.client.get(reverse('download_attendance_report'), {'mode': 'register', 'month': '2026-13'})
+        self.assertEqual(response.status_code, 400)
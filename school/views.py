@@ -1,37 +1,75 @@
-import csv
 from datetime import datetime, date
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.urls import reverse
+from django.utils.formats import date_format
+from django.utils.http import urlencode
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User, Group
-from django.db.models import Sum
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import VisitorCount
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from .visitors import record_visit, visitor_total
+from .page_cache import public_page_cache
+from .metrics import render_exposition
+from .roles import ROLE_SUPER_ADMIN, ROLE_STAFF, ROLE_PARENT, get_user_role
+from .pagination import keyset_paginate, search_students
+from .parent_api import summary_etag, child_summary
+from .exports import (
+    QUERY_CHUNK_SIZE, stream_csv, wants_gzip, month_bounds, month_register_rows,
+    ATTENDANCE_HEADER, EXPENSE_HEADER, CLASS_SUMMARY_HEADER, attendance_rows, expense_rows, class_summary_rows,
+)
+from .report_jobs import (
+    REPORTS, enqueue_report, enqueue_upload, report_file_path, report_label, worker_is_running,
+)
+from .archive import attendance_source
+from .attendance import (
+    parse_attendance_date, collect_roster_statuses, save_student_attendance, save_staff_attendance,
+)
+from .admissions import ADMISSION_COLUMNS, read_admission_csv
+from .db_router import replica_reads, writes_on_get
+from .concurrent_queries import run_queries
+from .finance import get_financial_summary, get_fee_status_summary
+from .analytics import (
+    FEE_BREAKDOWNS, AGEING_BUCKETS, DEFAULTER_SORTS, fee_defaulters, class_defaulter_summary, defaulter_rows,
+    ATTENDANCE_RANGES, attendance_range_bounds, class_attendance_for_date, class_attendance_for_range,
+    STAFF_SUMMARY_MONTHS, staff_monthly_summary,
+)
 
 # Import all models
 from .models import (
     Student, Staff, StudentFee, FeeTransaction, 
-    Attendance, StaffAttendance, Expense
+    Attendance, StaffAttendance, Expense, ReportJob,
+    ArchivedAttendance, ArchivedStaffAttendance, ArchivedFeeTransaction,
 )
 
 # =========================================
 # 1. PUBLIC PAGES
 # =========================================
+@public_page_cache
 def home(request):
-    # 1. Get the counter (or create one if it's new)
-    counter, created = VisitorCount.objects.get_or_create(id=1)
-    
-    # 2. Add 1 to the count
-    counter.count += 1
-    counter.save()
-
-    # 3. Send the number to the HTML page
-    return render(request, 'home.html', {'visitors': counter.count})
-
+    # The visitor number is loaded separately (visitor_count) so this page can be cached
+    return render(request, 'home.html')
+
+@csrf_exempt  # The cached home page is shared, so it has no CSRF token; a forged POST only counts a visit
+@require_POST  # Prefetchers, crawlers and caches only ever GET it
+@never_cache
+def visitor_count(request):
+    """ Counts a home page visit and returns the total (POSTed by home.html's script) """
+    record_visit()
+    return JsonResponse({'visitors': visitor_total()})
+
+@public_page_cache
 def about(request):
     return render(request, 'about.html')
 
+@public_page_cache
 def gallery(request):
     return render(request, 'gallery.html')
 
@@ -42,10 +80,10 @@ def gallery(request):
 @login_required
 def smart_redirect(request):
     """ Redirects users to their specific dashboard based on role """
-    user = request.user
-    if user.is_superuser:
+    role = get_user_role(request)['role']
+    if role == ROLE_SUPER_ADMIN:
         return redirect('super_dashboard')
-    elif user.groups.filter(name='Staff').exists():
+    elif role == ROLE_STAFF:
         return redirect('staff_dashboard')
     else:
         return redirect('dashboard')
@@ -61,13 +99,17 @@ def super_dashboard(request):
 @login_required
 def dashboard(request):
     """ Student / Parent Dashboard """
-    if request.user.is_superuser:
+    role = get_user_role(request)
+    if role['role'] == ROLE_SUPER_ADMIN:
         return redirect('super_dashboard')
-    elif request.user.groups.filter(name='Staff').exists():
+    elif role['role'] == ROLE_STAFF:
         return redirect('staff_dashboard')
 
+    if not role['student_ids']:
+        return render(request, 'dashboard.html', {'error': 'No student profile found for this account.'})
+
     try:
-        student_profile = Student.objects.get(username=request.user.username)
+        student_profile = Student.objects.get(id=role['student_ids'][0])
         fees = StudentFee.objects.filter(student=student_profile)
         attendance = Attendance.objects.filter(student=student_profile).order_by('-date')[:5]
 
@@ -80,54 +122,138 @@ def dashboard(request):
     except Student.DoesNotExist:
         return render(request, 'dashboard.html', {'error': 'No student profile found for this account.'})
 
+@require_safe
+@login_required
+def parent_dashboard_api(request):
+    """
+    JSON summary of the parent's child (fees, recent and year-to-date attendance).
+    Sends a strong ETag; a matching If-None-Match gets 304 without building the summary.
+    """
+    role = get_user_role(request)
+    if role['role'] != ROLE_PARENT or not role['student_ids']:
+        return JsonResponse({'error': 'No student profile found for this account.'}, status=403)
+
+    student_id = role['student_ids'][0]
+    requested = request.GET.get('student')
+    if requested:
+        if not requested.isdigit() or int(requested) not in role['student_ids']:
+            return JsonResponse({'error': 'Unknown student.'}, status=404)
+        student_id = int(requested)
+
+    etag = summary_etag(student_id)
+    if etag is None:
+        return JsonResponse({'error': 'Unknown student.'}, status=404)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(child_summary(Student.objects.get(pk=student_id)))
+    response['ETag'] = etag
+    # Browsers may keep it but must revalidate every time
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+def _mark_class_attendance(request):
+    """ POST half of staff_dashboard (sync: messages and the attendance upsert) """
+    selected_class_post = request.POST.get('class_selected')
+    try:
+        attendance_date = parse_attendance_date(request.POST.get('attendance_date'))
+        roster = Student.objects.filter(class_admitted=selected_class_post).values_list('id', flat=True)
+        statuses = collect_roster_statuses(request.POST, roster)
+        save_student_attendance(attendance_date, statuses)
+        messages.success(request, "Attendance marked!")
+    except ValidationError as e:
+        messages.error(request, f"Error: {e.message}")
+    return redirect('staff_dashboard')
+
+STAFF_RECENT_ROWS = 10          # Records shown on the dashboard itself
+STAFF_HISTORY_PAGE_SIZE = 30    # Records per "Load older" request
+HISTORY_ORDERING = ('-date', '-id')
+# Each history list pages with its own cursor, so one never moves the other
+HISTORY_CURSORS = {'salary': 'salary_after', 'attendance': 'attendance_after'}
+
+def _staff_history_page(request, kind, staff_id, page_size):
+    cursor_param = HISTORY_CURSORS[kind]
+    if kind == 'salary':
+        salary = Expense.objects.filter(staff_id=staff_id).only('id', 'date', 'purpose', 'amount')
+        return keyset_paginate(request, salary, HISTORY_ORDERING, page_size, cursor_param=cursor_param)
+    # Archived academic years are part of a teacher's history too
+    fields = ('id', 'date', 'status')
+    return keyset_paginate(
+        request, StaffAttendance.objects.filter(staff_id=staff_id).values(*fields), HISTORY_ORDERING, page_size,
+        union=[ArchivedStaffAttendance.objects.filter(staff_id=staff_id).values(*fields)], cursor_param=cursor_param,
+    )
+
+def _older_history_url(kind, page):
+    if not page['next_cursor']:
+        return None
+    return reverse('staff_history', args=[kind]) + '?' + urlencode({HISTORY_CURSORS[kind]: page['next_cursor']})
+
 @login_required
 def staff_dashboard(request):
     """ Teacher Dashboard """
-    # 1. Fetch Classes for Attendance Dropdown
-    classes = Student.objects.values_list('class_admitted', flat=True).distinct()
-    
-    # 2. Logic for Marking Student Attendance
-    selected_class = request.GET.get('class_selected')
-    students = []
-    if selected_class:
-        students = Student.objects.filter(class_admitted=selected_class).order_by('student_name')
-
     if request.method == 'POST':
-        attendance_date = request.POST.get('attendance_date')
-        selected_class_post = request.POST.get('class_selected')
-        if not attendance_date: attendance_date = timezone.now().date()
-        
-        students_to_mark = Student.objects.filter(class_admitted=selected_class_post)
-        for student in students_to_mark:
-            status = request.POST.get(f'status_{student.id}')
-            if status:
-                Attendance.objects.update_or_create(student=student, date=attendance_date, defaults={'status': status})
-        messages.success(request, "Attendance marked!")
-        return redirect('staff_dashboard')
+        return _mark_class_attendance(request)
 
-    # 3. Fetch My Personal Data
-    my_salary_history = []
-    my_attendance_history = []
-    current_staff = None
+    selected_class = request.GET.get('class_selected')
+    staff_id = get_user_role(request)['staff_id']
+    today = timezone.now().date()
 
-    try:
-        current_staff = Staff.objects.get(username=request.user.username)
-        my_salary_history = Expense.objects.filter(staff=current_staff).order_by('-date')
-        my_attendance_history = StaffAttendance.objects.filter(staff=current_staff).order_by('-date')
-    except Staff.DoesNotExist:
-        pass 
+    # The independent queries run at once (see concurrent_queries.py)
+    queries = {
+        # 1. Classes for the attendance dropdown
+        'classes': lambda: list(Student.objects.values_list('class_admitted', flat=True).distinct()),
+    }
+    if selected_class:
+        # 2. Roster for marking student attendance
+        queries['students'] = lambda: list(
+            Student.objects.filter(class_admitted=selected_class).order_by('student_name')
+        )
+    if staff_id:
+        # 3. My personal data: the latest few records plus per-month totals
+        #    (older records load on demand from staff_history)
+        queries.update({
+            'current_staff': lambda: Staff.objects.filter(id=staff_id).first(),
+            'salary_page': lambda: _staff_history_page(request, 'salary', staff_id, STAFF_RECENT_ROWS),
+            'attendance_page': lambda: _staff_history_page(request, 'attendance', staff_id, STAFF_RECENT_ROWS),
+            'monthly_summary': lambda: staff_monthly_summary(staff_id, today),
+        })
+    results = run_queries(**queries)
+    current_staff = results.get('current_staff')
 
     context = {
-        'classes': classes,
-        'students': students,
+        'classes': results['classes'],
+        'students': results.get('students', []),
         'selected_class': selected_class,
-        'today_date': timezone.now().date(),
+        'today_date': today,
         'current_staff': current_staff,
-        'my_salary_history': my_salary_history,
-        'my_attendance_history': my_attendance_history
+        'summary_months': STAFF_SUMMARY_MONTHS,
     }
+    if current_staff:
+        salary_page, attendance_page = results['salary_page'], results['attendance_page']
+        context.update({
+            'my_salary_history': salary_page['items'],
+            'older_salary_url': _older_history_url('salary', salary_page),
+            'my_attendance_history': attendance_page['items'],
+            'older_attendance_url': _older_history_url('attendance', attendance_page),
+            'monthly_summary': results['monthly_summary'],
+        })
     return render(request, 'staff_dashboard.html', context)
 
+@login_required
+def staff_history(request, kind):
+    """ Older salary / attendance records of the logged-in teacher, one page at a time (JSON) """
+    staff_id = get_user_role(request)['staff_id']
+    if not staff_id or kind not in HISTORY_CURSORS:
+        return HttpResponseForbidden("Staff access required.")
+
+    page = _staff_history_page(request, kind, staff_id, STAFF_HISTORY_PAGE_SIZE)
+    if kind == 'salary':
+        rows = [{'date': date_format(e.date), 'purpose': e.purpose, 'amount': str(e.amount)} for e in page['items']]
+    else:
+        rows = [{'date': date_format(a['date']), 'status': a['status']} for a in page['items']]
+    return JsonResponse({'rows': rows, 'next_url': _older_history_url(kind, page)})
+
 
 # =========================================
 # 4. REGISTRATION (ADMISSIONS)
@@ -175,6 +301,33 @@ def admin_register(request):
             
     return render(request, 'admin_register.html')
 
+@login_required
+def bulk_admission(request):
+    """ Admit a whole intake from a CSV (same fields and login rules as admin_register) """
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Superuser access required.")
+
+    errors = []
+    if request.method == 'POST':
+        upload = request.FILES.get('csv_file')
+        if not upload:
+            messages.error(request, "Please choose a CSV file.")
+            return redirect('bulk_admission')
+        try:
+            lines = (line.decode('utf-8-sig') for line in upload)
+            rows, errors = read_admission_csv(lines)
+            if not errors:
+                # Hashing every password is slow: the report worker imports the file
+                enqueue_upload('admissions', request.user, upload, len(rows))
+                messages.success(request, f"{len(rows)} students validated and queued for admission. Password for each login is the student's DOB (DDMMYYYY).")
+                if not worker_is_running():
+                    messages.warning(request, "The report worker is not running; the import starts as soon as it is.")
+                return redirect('report_jobs')
+        except UnicodeDecodeError:
+            messages.error(request, "The file must be a UTF-8 CSV.")
+
+    return render(request, 'bulk_admission.html', {'columns': ADMISSION_COLUMNS, 'errors': errors})
+
 @login_required
 def staff_registration(request):
     """ Register Staff: Username = Phone, Password = DOB """
@@ -300,15 +453,34 @@ def admissions_calculator(request):
 # =========================================
 # 6. MANAGEMENT & ACTIONS (Edit/Delete)
 # =========================================
+def student_filter_options(request):
+    """ Dropdown values and current selections for the student list filters """
+    return {
+        'class_options': Student.objects.order_by('class_admitted').values_list('class_admitted', flat=True).distinct(),
+        'year_options': Student.objects.order_by('academic_year').values_list('academic_year', flat=True).distinct(),
+        'selected_class': request.GET.get('class', ''),
+        'selected_year': request.GET.get('year', ''),
+        'query': request.GET.get('q', ''),
+    }
+
 @login_required
 def manage_students(request):
-    student_list = Student.objects.all().order_by('-id')
-    return render(request, 'manage_students.html', {'student_list': student_list})
+    students = search_students(Student.objects.only('id', 'student_name', 'class_admitted', 'father_name'), request)
+    page = keyset_paginate(request, students, ('-id',))
+    return render(request, 'manage_students.html', {
+        'student_list': page['items'],
+        'page': page,
+        **student_filter_options(request),
+    })
 
 @login_required
 def manage_staff(request):
-    staff_list = Staff.objects.all().order_by('-id')
-    return render(request, 'manage_staff.html', {'staff_list': staff_list})
+    staff_list = Staff.objects.only('id', 'full_name', 'phone_number', 'gender', 'recruitment_date')
+    query = (request.GET.get('q') or '').strip()
+    if query:
+        staff_list = staff_list.filter(Q(full_name__icontains=query) | Q(phone_number__startswith=query))
+    page = keyset_paginate(request, staff_list, ('-id',))
+    return render(request, 'manage_staff.html', {'staff_list': page['items'], 'page': page, 'query': query})
 
 @login_required
 def edit_student(request, student_id):
@@ -327,6 +499,7 @@ def edit_student(request, student_id):
     return render(request, 'edit_student.html', {'student': student})
 
 @login_required
+@writes_on_get
 def delete_student(request, student_id):
     try:
         student = get_object_or_404(Student, id=student_id)
@@ -358,6 +531,7 @@ def edit_staff(request, staff_id):
     return render(request, 'edit_staff.html', {'staff': staff})
 
 @login_required
+@writes_on_get
 def delete_staff(request, staff_id):
     try:
         staff = get_object_or_404(Staff, id=staff_id)
@@ -381,18 +555,15 @@ def mark_attendance(request):
         students = Student.objects.filter(class_admitted=selected_class).order_by('student_name')
 
     if request.method == 'POST':
-        attendance_date = request.POST.get('attendance_date')
         selected_class = request.POST.get('class_selected')
-        students_to_mark = Student.objects.filter(class_admitted=selected_class)
-        
-        for student in students_to_mark:
-            status = request.POST.get(f'status_{student.id}') 
-            if status:
-                Attendance.objects.update_or_create(
-                    student=student,
-                    date=attendance_date,
-                    defaults={'status': status}
-                )
+        try:
+            attendance_date = parse_attendance_date(request.POST.get('attendance_date'))
+            roster = Student.objects.filter(class_admitted=selected_class).values_list('id', flat=True)
+            statuses = collect_roster_statuses(request.POST, roster)
+            save_student_attendance(attendance_date, statuses)
+        except ValidationError as e:
+            messages.error(request, f"Error: {e.message}")
+            return redirect('mark_attendance')
         messages.success(request, f"Attendance marked for {selected_class} on {attendance_date}")
         return redirect('attendance_analytics')
 
@@ -407,15 +578,13 @@ def mark_attendance(request):
 def admin_staff_attendance(request):
     staff_list = Staff.objects.all().order_by('full_name')
     if request.method == 'POST':
-        attendance_date = request.POST.get('attendance_date') or timezone.now().date()
-        for staff in staff_list:
-            status = request.POST.get(f'status_{staff.id}')
-            if status:
-                StaffAttendance.objects.update_or_create(
-                    staff=staff,
-                    date=attendance_date,
-                    defaults={'status': status}
-                )
+        try:
+            attendance_date = parse_attendance_date(request.POST.get('attendance_date'))
+            statuses = collect_roster_statuses(request.POST, staff_list.values_list('id', flat=True))
+            save_staff_attendance(attendance_date, statuses)
+        except ValidationError as e:
+            messages.error(request, f"Error: {e.message}")
+            return redirect('admin_staff_attendance')
         messages.success(request, f"Staff Attendance marked successfully for {attendance_date}!")
         return redirect('super_dashboard')
 
@@ -425,6 +594,7 @@ def admin_staff_attendance(request):
     })
 
 @login_required
+@replica_reads
 def attendance_analytics(request):
     selected_date_str = request.GET.get('date')
     if selected_date_str:
@@ -432,45 +602,32 @@ def attendance_analytics(request):
     else:
         selected_date = timezone.now().date()
 
-    classes = Student.objects.values_list('class_admitted', flat=True).distinct()
-    class_data = []
-    total_school_students = 0
-    total_present_count = 0
-
-    for class_name in classes:
-        students_in_class = Student.objects.filter(class_admitted=class_name)
-        total_students = students_in_class.count()
-
-        if total_students > 0:
-            present = Attendance.objects.filter(student__in=students_in_class, date=selected_date, status='Present').count()
-            absent = Attendance.objects.filter(student__in=students_in_class, date=selected_date, status='Absent').count()
-            leave = Attendance.objects.filter(student__in=students_in_class, date=selected_date, status='Leave').count()
-
-            records_exist = (present + absent + leave) > 0
-            percentage = round((present / total_students) * 100, 1) if records_exist else 0
-
-            total_school_students += total_students
-            total_present_count += present
-
-            class_data.append({
-                'class_name': class_name,
-                'total_students': total_students,
-                'present': present,
-                'absent': absent,
-                'leave': leave,
-                'percentage': percentage,
-                'status': 'Taken' if records_exist else 'Pending'
-            })
+    # Class x status matrix for the day, read from the daily rollup
+    class_data = class_attendance_for_date(selected_date)
+    total_school_students = sum(row['total_students'] for row in class_data)
+    total_present_count = sum(row['present'] for row in class_data)
 
     school_percentage = round((total_present_count / total_school_students) * 100, 1) if total_school_students > 0 else 0
 
+    # Optional week/month trend (per class, per day) from the same rollup
+    range_mode = request.GET.get('range')
+    range_days, range_rows = [], []
+    if range_mode in ATTENDANCE_RANGES:
+        range_start, range_end = attendance_range_bounds(selected_date, range_mode)
+        range_days, range_rows = class_attendance_for_range(range_start, range_end)
+    else:
+        range_mode = None
+
     context = {
         'selected_date': selected_date,
         'class_data': class_data,
         'school_percentage': school_percentage,
         'total_school_students': total_school_students,
         'present_today': total_present_count,
-        'absent_today': total_school_students - total_present_count
+        'absent_today': total_school_students - total_present_count,
+        'range_mode': range_mode,
+        'range_days': range_days,
+        'range_rows': range_rows,
     }
     return render(request, 'attendance_analytics.html', context)
 
@@ -478,44 +635,59 @@ def attendance_analytics(request):
 # =========================================
 # 8. FINANCIAL MODULE (Funds & Fees)
 # =========================================
+def _record_expense(request):
+    """ POST half of manage_funds """
+    staff_id = request.POST.get('staff_id') 
+    selected_staff = Staff.objects.get(id=staff_id) if staff_id else None
+
+    Expense.objects.create(
+        date=request.POST.get('date'),
+        purpose=request.POST.get('purpose'),
+        category=request.POST.get('category'),
+        amount=request.POST.get('amount'),
+        payment_type=request.POST.get('payment_type'),
+        added_by=request.user,
+        staff=selected_staff
+    )
+    messages.success(request, "Expense/Salary recorded successfully!")
+    return redirect('manage_funds')
+
 @login_required
 def manage_funds(request):
-    staff_members = Staff.objects.all()
-
     if request.method == 'POST':
-        staff_id = request.POST.get('staff_id') 
-        selected_staff = Staff.objects.get(id=staff_id) if staff_id else None
-
-        Expense.objects.create(
-            date=request.POST.get('date'),
-            purpose=request.POST.get('purpose'),
-            category=request.POST.get('category'),
-            amount=request.POST.get('amount'),
-            payment_type=request.POST.get('payment_type'),
-            added_by=request.user,
-            staff=selected_staff
-        )
-        messages.success(request, "Expense/Salary recorded successfully!")
-        return redirect('manage_funds')
-
-    total_target = StudentFee.objects.aggregate(sum=Sum('total_amount'))['sum'] or 0
-    total_collected = FeeTransaction.objects.aggregate(sum=Sum('amount_paid'))['sum'] or 0
-    total_utilized = Expense.objects.aggregate(sum=Sum('amount'))['sum'] or 0
-    current_available = total_collected - total_utilized
-    recent_expenses = Expense.objects.all().order_by('-date')
+        return _record_expense(request)
+
+    expenses = Expense.objects.select_related('staff').only(
+        'id', 'date', 'purpose', 'category', 'amount', 'staff__full_name'
+    )
+    selected_category = request.GET.get('category')
+    if selected_category:
+        expenses = expenses.filter(category=selected_category)
+
+    # The independent queries run at once (see concurrent_queries.py)
+    results = run_queries(
+        summary=get_financial_summary,
+        expense_page=lambda: keyset_paginate(request, expenses, ('-date', '-id')),
+        staff_members=lambda: list(Staff.objects.all()),
+    )
+    summary, expense_page = results['summary'], results['expense_page']
 
     context = {
-        'total_target': total_target,
-        'total_collected': total_collected,
-        'total_utilized': total_utilized,
-        'current_available': current_available,
-        'recent_expenses': recent_expenses,
+        'total_target': summary['total_target'],
+        'total_collected': summary['total_collected'],
+        'total_utilized': summary['total_utilized'],
+        'current_available': summary['current_available'],
+        'recent_expenses': expense_page['items'],
+        'page': expense_page,
+        'expense_categories': Expense.CATEGORY_CHOICES,
+        'selected_category': selected_category,
         'today_date': timezone.now().date(),
-        'staff_members': staff_members
+        'staff_members': results['staff_members'],
     }
     return render(request, 'manage_funds.html', context)
 
 @login_required
+@writes_on_get
 def delete_expense(request, expense_id):
     expense = get_object_or_404(Expense, id=expense_id)
     expense.delete()
@@ -524,25 +696,30 @@ def delete_expense(request, expense_id):
 
 @login_required
 def financial_analytics(request):
-    total_expected = StudentFee.objects.aggregate(sum=Sum('total_amount'))['sum'] or 0
-    total_collected = FeeTransaction.objects.aggregate(sum=Sum('amount_paid'))['sum'] or 0
+    # Paid / partial / unpaid counts and totals come from one grouped query (cached,
+    # always computed on the primary: see finance.py)
+    breakdown = request.GET.get('breakdown')
+    if breakdown not in FEE_BREAKDOWNS: breakdown = None
+    summary, breakdown_rows = get_fee_status_summary(breakdown)
+
+    total_expected = summary['total_expected']
+    total_collected = summary['total_collected']
     total_pending = total_expected - total_collected
 
     collection_percentage = round((total_collected / total_expected) * 100, 1) if total_expected > 0 else 0
 
-    all_fees = StudentFee.objects.all()
-    total_invoices = all_fees.count()
-    fully_paid_count = sum(1 for fee in all_fees if fee.get_balance() <= 0)
-    unpaid_count = total_invoices - fully_paid_count
-
     context = {
         'total_expected': total_expected,
         'total_collected': total_collected,
         'total_pending': total_pending,
+        'total_outstanding': summary['total_outstanding'],
         'collection_percentage': collection_percentage,
-        'total_invoices': total_invoices,
-        'fully_paid_count': fully_paid_count,
-        'unpaid_count': unpaid_count,
+        'total_invoices': summary['total_invoices'],
+        'fully_paid_count': summary['fully_paid_count'],
+        'partial_count': summary['partial_count'],
+        'unpaid_count': summary['unpaid_count'],
+        'breakdown': breakdown,
+        'breakdown_rows': breakdown_rows,
     }
     return render(request, 'financial_analytics.html', context)
 
@@ -552,13 +729,57 @@ def financial_analytics(request):
 # =========================================
 @login_required
 def fee_dashboard_hub(request):
-    students = Student.objects.all().order_by('class_admitted', 'student_name')
-    return render(request, 'fees/fee_hub.html', {'students': students})
+    students = search_students(Student.objects.only('id', 'student_name', 'class_admitted', 'mother_phone'), request)
+    page = keyset_paginate(request, students, ('class_admitted', 'student_name', 'id'))
+    return render(request, 'fees/fee_hub.html', {
+        'students': page['items'],
+        'page': page,
+        **student_filter_options(request),
+    })
+
+def _defaulters_for(request):
+    """ Filtered, sorted defaulters queryset plus the chosen sort key """
+    sort = request.GET.get('sort')
+    if sort not in DEFAULTER_SORTS: sort = 'outstanding'
+    students = search_students(Student.objects.all(), request)
+    return fee_defaulters(timezone.localdate(), students), sort
+
+@login_required
+@replica_reads
+def fee_defaulters_report(request):
+    """ Who owes what, per student and per class, with balances aged by last payment """
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Superuser access required.")
+    today = timezone.localdate()
+    defaulters, sort = _defaulters_for(request)
+    page = keyset_paginate(request, defaulters, DEFAULTER_SORTS[sort])
+    totals, class_rows = class_defaulter_summary(today, search_students(Student.objects.all(), request))
+
+    # Changing the sort starts again from the first page
+    params = request.GET.copy()
+    params.pop('after', None)
+    sort_urls = {}
+    for key in DEFAULTER_SORTS:
+        params['sort'] = key
+        sort_urls[key] = f"?{params.urlencode()}"
+    params['sort'] = sort
+
+    return render(request, 'fees/defaulters.html', {
+        'defaulters': list(defaulter_rows(page['items'], today)),
+        'page': page,
+        'totals': totals,
+        'class_rows': class_rows,
+        'buckets': [(key, label) for key, (label, _, _) in AGEING_BUCKETS.items()],
+        'sort': sort,
+        'sort_urls': sort_urls,
+        'csv_query': params.urlencode(), # Same filters and order, every page
+        **student_filter_options(request),
+    })
 
 @login_required
 def student_fee_details(request, student_id):
     student = get_object_or_404(Student, id=student_id)
-    fees = StudentFee.objects.filter(student=student)
+    fees = StudentFee.objects.filter(student=student).prefetch_related('feetransaction_set', 'archived_transactions')
     return render(request, 'fees/student_fee_details.html', {'student': student, 'fees': fees})
 
 @login_required
@@ -577,12 +798,14 @@ def add_fee_structure(request, student_id):
 def add_fee_payment(request, fee_id):
     if request.method == "POST":
         fee_record = get_object_or_404(StudentFee, id=fee_id)
-        FeeTransaction.objects.create(
-            student_fee=fee_record,
-            amount_paid=request.POST.get('amount_paid'),
-            payment_date=request.POST.get('payment_date'),
-            remarks=request.POST.get('remarks')
-        )
+        # Payment row and the fee's stored totals are written together
+        with transaction.atomic():
+            FeeTransaction.objects.create(
+                student_fee=fee_record,
+                amount_paid=request.POST.get('amount_paid'),
+                payment_date=request.POST.get('payment_date'),
+                remarks=request.POST.get('remarks')
+            )
         messages.success(request, "Payment Recorded Successfully!")
         return redirect('student_fee_details', student_id=fee_record.student.id)
 
@@ -598,6 +821,7 @@ def edit_fee_structure(request, fee_id):
     return render(request, 'fees/edit_fee.html', {'fee': fee})
 
 @login_required
+@writes_on_get
 def delete_fee_structure(request, fee_id):
     fee = get_object_or_404(StudentFee, id=fee_id)
     student_id = fee.student.id
@@ -610,39 +834,35 @@ def delete_fee_structure(request, fee_id):
 # 10. DOWNLOADS & CSV REPORTS
 # =========================================
 @login_required
+@replica_reads
 def download_students_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="student_list.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['ID', 'Name', 'Class', 'Parent Phone', 'DOB', 'Gender', 'Address'])
-    for student in Student.objects.all():
-        writer.writerow([
-            student.application_number, student.student_name, student.class_admitted,
-            student.mother_phone, student.dob, student.gender, student.address
-        ])
-    return response
+    rows = Student.objects.order_by('id').values_list(
+        'application_number', 'student_name', 'class_admitted',
+        'mother_phone', 'dob', 'gender', 'address'
+    ).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return stream_csv(
+        "student_list.csv",
+        ['ID', 'Name', 'Class', 'Parent Phone', 'DOB', 'Gender', 'Address'],
+        rows, compress=wants_gzip(request)
+    )
 
 @login_required
+@replica_reads
 def download_staff_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="staff_list.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Name', 'Designation', 'Phone', 'Recruited On', 'Gender'])
-    for staff in Staff.objects.all():
-        writer.writerow([
-            staff.full_name, staff.designation, staff.phone_number,
-            staff.recruitment_date, staff.gender
-        ])
-    return response
+    rows = Staff.objects.order_by('id').values_list(
+        'full_name', 'designation', 'phone_number', 'recruitment_date', 'gender'
+    ).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return stream_csv(
+        "staff_list.csv",
+        ['Name', 'Designation', 'Phone', 'Recruited On', 'Gender'],
+        rows, compress=wants_gzip(request)
+    )
 
 @login_required
+@replica_reads
 def download_funds_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Category', 'Purpose', 'Type', 'Amount', 'Payment Mode', 'Staff Linked'])
-
     mode = request.GET.get('mode')
-    expenses = []
+    expenses = Expense.objects.none()
     filename = "Financial_Report.csv"
 
     if mode == 'date':
@@ -651,100 +871,199 @@ def download_funds_csv(request):
             expenses = Expense.objects.filter(date=date_param).order_by('category')
             filename = f"Financial_Report_Daily_{date_param}.csv"
     elif mode == 'month':
-        month_param = request.GET.get('month')
-        if month_param:
-            year, month = month_param.split('-')
-            expenses = Expense.objects.filter(date__year=year, date__month=month).order_by('date')
-            filename = f"Financial_Report_Monthly_{month_param}.csv"
-    else:
-        expenses = Expense.objects.all().order_by('-date')
-        filename = "Financial_Report_Full_History.csv"
-
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    if expenses:
-        for expense in expenses:
-            type_label = "Salary" if expense.category == 'Salary' else "Expense"
-            staff_name = expense.staff.full_name if expense.staff else "-"
-            writer.writerow([
-                expense.date, expense.category, expense.purpose, type_label,
-                expense.amount, expense.payment_type, staff_name
-            ])
+        try:
+            start, end = month_bounds(request.GET.get('month') or '')
+        except ValueError:
+            return HttpResponse("Pick a month (YYYY-MM).", status=400)
+        expenses = Expense.objects.filter(date__range=(start, end)).order_by('date')
+        filename = f"Financial_Report_Monthly_{start:%Y-%m}.csv"
     else:
-        writer.writerow(["No records found."])
-    return response
+        # Too big to stream from a web worker; generated by run_report_worker
+        return _queue_report(request, 'funds_full')
+
+    return stream_csv(
+        filename, EXPENSE_HEADER, expense_rows(expenses),
+        compress=wants_gzip(request), empty_message="No records found."
+    )
 
 @login_required
+@replica_reads
 def download_fee_data_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="fee_collection_report.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Student Name', 'Fee Type', 'Amount Paid', 'Mode/Remarks'])
-    for txn in FeeTransaction.objects.all().order_by('-payment_date'):
-        writer.writerow([
-            txn.payment_date, txn.student_fee.student.student_name,
-            txn.student_fee.fee_name, txn.amount_paid, txn.remarks
-        ])
-    return response
+    fields = ('payment_date', 'student_fee__student__student_name', 'student_fee__fee_name', 'amount_paid', 'remarks')
+    # Every payment ever made, archived academic years included
+    rows = FeeTransaction.objects.values_list(*fields).union(
+        ArchivedFeeTransaction.objects.values_list(*fields), all=True,
+    ).order_by('-payment_date').iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return stream_csv(
+        "fee_collection_report.csv",
+        ['Date', 'Student Name', 'Fee Type', 'Amount Paid', 'Mode/Remarks'],
+        rows, compress=wants_gzip(request)
+    )
 
 @login_required
-def download_attendance_report(request):
-    response = HttpResponse(content_type='text/csv')
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Class', 'Student Name', 'Status'])
+@replica_reads
+def download_fee_defaulters_csv(request):
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Superuser access required.")
+    today = timezone.localdate()
+    defaulters, sort = _defaulters_for(request)
+    records = defaulters.order_by(*DEFAULTER_SORTS[sort]).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    rows = (
+        [row['student__student_name'], row['student__class_admitted'], row['student__mother_phone'],
+         row['total_due'], row['total_paid'], row['outstanding'],
+         row['last_payment'] or "Never", '' if row['days_since_payment'] is None else row['days_since_payment']]
+        + [row[key] for key in AGEING_BUCKETS] + [row['never_paid']]
+        for row in defaulter_rows(records, today)
+    )
+    return stream_csv(
+        f"Fee_Defaulters_{today}.csv",
+        ['Student Name', 'Class', 'Parent Phone', 'Total Due', 'Paid', 'Outstanding',
+         'Last Payment', 'Days Since Payment']
+        + [f"Outstanding {label}" for label, _, _ in AGEING_BUCKETS.values()] + ['Outstanding Never Paid'],
+        rows, compress=wants_gzip(request), empty_message="No outstanding fees.",
+    )
 
+@login_required
+@replica_reads
+def download_attendance_report(request):
     mode = request.GET.get('mode')
-    logs = []
+    logs = Attendance.objects.none()
     filename = "attendance_report.csv"
 
     if mode == 'date':
         date_param = request.GET.get('date')
         if date_param:
-            logs = Attendance.objects.filter(date=date_param).order_by('student__class_admitted', 'student__student_name')
+            logs = attendance_source(date_param).objects.filter(date=date_param).order_by(
+                'student__class_admitted', 'student__student_name'
+            )
             filename = f"Attendance_Daily_{date_param}.csv"
+    elif mode == 'register':
+        # One row per student, one column per school day, section per class
+        try:
+            start, end = month_bounds(request.GET.get('month') or '')
+        except ValueError:
+            return HttpResponse("Pick a month (YYYY-MM).", status=400)
+        relation = 'archived_attendance' if attendance_source(start) is ArchivedAttendance else 'attendance'
+        return stream_csv(
+            f"Attendance_Register_{start:%Y-%m}.csv",
+            ['Attendance Register', f"{start:%B %Y}"],
+            month_register_rows(start, end, relation), compress=wants_gzip(request), empty_message="No records found.",
+        )
+    elif mode == 'summary':
+        # Class-by-day totals straight from the rollup (archived years included)
+        try:
+            start, end = month_bounds(request.GET.get('month') or '')
+        except ValueError:
+            return HttpResponse("Pick a month (YYYY-MM).", status=400)
+        return stream_csv(
+            f"Attendance_Class_Summary_{start:%Y-%m}.csv", CLASS_SUMMARY_HEADER, class_summary_rows(start, end),
+            compress=wants_gzip(request), empty_message="No records found.",
+        )
     elif mode == 'month':
-        month_param = request.GET.get('month')
-        if month_param:
-            year, month = month_param.split('-')
-            logs = Attendance.objects.filter(date__year=year, date__month=month).order_by('date', 'student__class_admitted')
-            filename = f"Attendance_Monthly_{month_param}.csv"
+        try:
+            start, end = month_bounds(request.GET.get('month') or '')
+        except ValueError:
+            return HttpResponse("Pick a month (YYYY-MM).", status=400)
+        logs = attendance_source(start).objects.filter(date__range=(start, end)).order_by(
+            'date', 'student__class_admitted'
+        )
+        filename = f"Attendance_Monthly_{start:%Y-%m}.csv"
     else:
-        logs = Attendance.objects.all().order_by('-date')
+        # Too big to stream from a web worker; generated by run_report_worker
+        return _queue_report(request, 'attendance_full')
 
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-    if logs:
-        for log in logs:
-            writer.writerow([log.date, log.student.class_admitted, log.student.student_name, log.status])
-    else:
-        writer.writerow(["No records found."])
-    return response
+    return stream_csv(
+        filename, ATTENDANCE_HEADER, attendance_rows(logs),
+        compress=wants_gzip(request), empty_message="No records found."
+    )
 
 @login_required
+@replica_reads
 def download_all_attendance_csv(request):
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="school_attendance_report.csv"'
-    writer = csv.writer(response)
-    writer.writerow(['Date', 'Class', 'Student Name', 'Status'])
-    logs = Attendance.objects.all().order_by('-date', 'student__class_admitted', 'student__student_name')
-    for log in logs:
-        writer.writerow([log.date, log.student.class_admitted, log.student.student_name, log.status])
-    return response
+    rows = Attendance.objects.order_by(
+        '-date', 'student__class_admitted', 'student__student_name'
+    ).values_list(
+        'date', 'student__class_admitted', 'student__student_name', 'status'
+    ).iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return stream_csv(
+        "school_attendance_report.csv",
+        ['Date', 'Class', 'Student Name', 'Status'],
+        rows, compress=wants_gzip(request)
+    )
 
 @login_required
+@replica_reads
 def download_my_child_attendance(request):
-    try:
-        student = Student.objects.get(username=request.user.username)
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{student.student_name}_attendance.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Date', 'Status'])
-        logs = Attendance.objects.filter(student=student).order_by('-date')
-        for log in logs:
-            writer.writerow([log.date, log.status])
-        return response
-    except:
+    role = get_user_role(request)
+    if not role['student_ids']:
         return redirect('dashboard')
+
+    student_id = role['student_ids'][0]
+    rows = Attendance.objects.filter(student_id=student_id).values_list('date', 'status').union(
+        ArchivedAttendance.objects.filter(student_id=student_id).values_list('date', 'status'), all=True,
+    ).order_by('-date').iterator(chunk_size=QUERY_CHUNK_SIZE)
+    return stream_csv(
+        f"{role['student_name']}_attendance.csv",
+        ['Date', 'Status'],
+        rows, compress=wants_gzip(request)
+    )
     
+def _queue_report(request, kind):
+    if not worker_is_running():
+        # Nobody would pick the job up: stream the report as before
+        _, download_name, header, _, get_rows = REPORTS[kind]
+        return stream_csv(download_name, header, get_rows(), compress=wants_gzip(request),
+                          empty_message="No records found.")
+    job, created = enqueue_report(kind, request.user)
+    if created:
+        messages.success(request, f"{report_label(kind)} has been queued. It will be ready to download here shortly.")
+    else:
+        messages.info(request, f"{report_label(kind)} is already being prepared.")
+    return redirect('report_jobs')
+
+@login_required
+def report_jobs(request):
+    """ Background reports: queue one (POST) and download finished files """
+    if request.method == 'POST':
+        kind = request.POST.get('kind')
+        if kind not in REPORTS:
+            messages.error(request, "Unknown report.")
+            return redirect('report_jobs')
+        return _queue_report(request, kind)
+
+    jobs = ReportJob.objects.select_related('requested_by')
+    if not request.user.is_superuser:
+        # Admission imports stay with the office; reports are open to every login
+        jobs = jobs.filter(kind__in=REPORTS)
+    jobs = list(jobs[:50])
+    for job in jobs:
+        job.label = report_label(job.kind)
+    return render(request, 'report_jobs.html', {
+        'jobs': jobs,
+        'reports': [(kind, report[0]) for kind, report in REPORTS.items()],
+        'pending': any(job.status in (ReportJob.QUEUED, ReportJob.RUNNING) for job in jobs),
+    })
+
+@login_required
+def download_report_job(request, job_id):
+    job = get_object_or_404(ReportJob, id=job_id, kind__in=REPORTS)
+    path = report_file_path(job)
+    if path is None:
+        raise Http404("This report is not ready or has expired.")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=REPORTS[job.kind][1],
+                        content_type='text/csv')
+
+@public_page_cache
 def landing(request):
-    return render(request, 'landing.html')
\ No newline at end of file
+    return render(request, 'landing.html')
+
+
+# =========================================
+# 11. MONITORING
+# =========================================
+@login_required
+def request_metrics(request):
+    """ Per-view request histograms (Prometheus text format), superusers only """
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Superuser access required.")
+    return HttpResponse(render_exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,77 @@
+import atexit
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import VisitorCount
+
+VISITOR_TOTAL_CACHE_KEY = 'school:visitor_total'
+
+# Hits are counted in memory and written to the database in batches.
+# Each flush adds to one randomly chosen VisitorCount row ("shard"), so
+# concurrent workers rarely wait on the same row. The total is their sum.
+_lock = threading.Lock()
+_pending = 0
+_last_flush = time.monotonic()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# =========================================
+# 1. WRITING VISITS
+# =========================================
+def record_visit():
+    """ Counts one page view; flushes to the DB every N hits or T seconds """
+    global _pending
+    with _lock:
+        _pending += 1
+        due = (
+            _pending >= _setting('VISITOR_COUNTER_FLUSH_EVERY', 20)
+            or time.monotonic() - _last_flush >= _setting('VISITOR_COUNTER_FLUSH_SECONDS', 10)
+        )
+    if due:
+        flush_visits()
+
+def flush_visits():
+    """ Adds the buffered hits to a random shard with one atomic UPDATE """
+    global _pending, _last_flush
+    with _lock:
+        hits, _pending = _pending, 0
+        _last_flush = time.monotonic()
+    if not hits:
+        return
+
+    shard = random.randint(1, _setting('VISITOR_COUNTER_SHARDS', 8))
+    if not VisitorCount.objects.filter(id=shard).update(count=F('count') + hits):
+        try:
+            with transaction.atomic():
+                VisitorCount.objects.create(id=shard, count=hits)
+        except IntegrityError:
+            # Another worker created this shard first
+            VisitorCount.objects.filter(id=shard).update(count=F('count') + hits)
+
+    try:
+        cache.incr(VISITOR_TOTAL_CACHE_KEY, hits)
+    except ValueError:
+        pass  # Not cached yet, next read will sum the shards
+
+atexit.register(flush_visits)
+
+
+# =========================================
+# 2. READING THE TOTAL
+# =========================================
+def visitor_total():
+    """ Total visitors from cache (sum of shards on a miss) plus unflushed hits """
+    total = cache.get(VISITOR_TOTAL_CACHE_KEY)
+    if total is None:
+        total = VisitorCount.objects.aggregate(total=Sum('count'))['total'] or 0
+        cache.set(VISITOR_TOTAL_CACHE_KEY, total, _setting('VISITOR_COUNTER_CACHE_SECONDS', 60))
+    return total + _pending